@@ -0,0 +1,63 @@
+"""
+Activity Monitor lens settings and session event builders.
+Shared by the quickstart, rtsp_relay.py and the job runner; kept out of
+quickstart.py so they import it under a name no other app uses.
+"""
+
+# ---------- Defaults ----------
+DEFAULT_LENS_ID = "lns-fd669361822b07e2-bc718aa3fdf0b3b7"
+DEFAULT_INSTRUCTION = "Answer the following question about the video in less than 15 words:"
+MULTI_FOCUS_INSTRUCTION = (
+    "Answer each of the following numbered questions about the video in less than 15 words. "
+    "Write one line per question, starting with its number:"
+)
+DEFAULT_MAX_RUN_SEC = 600.0
+DEFAULT_MAX_NEW_TOKENS = 256
+DEFAULT_STEP_SIZE = 60
+DEFAULT_WINDOW_SIZE = 60
+
+# ---------- Event builders ----------
+def build_input_event(args: dict) -> dict:
+    if args["input_type"] == "rtsp":
+        return {
+            "type": "input_stream.set",
+            "event_data": {
+                "stream_type": "rtsp_video_reader",
+                "stream_config": {
+                    "rtsp_url": args["rtsp_url"],
+                    "target_image_size": [360, 640],
+                    "target_frame_rate_hz": 1.0,
+                }
+            }
+        }
+    else:
+        return {
+            "type": "input_stream.set",
+            "event_data": {
+                "stream_type": "video_file_reader",
+                "stream_config": {
+                    "file_id": args["video_file_id"],
+                    "step_size": args["step_size"],
+                    "window_size": args["window_size"],
+                }
+            }
+        }
+
+def build_focus_event(args: dict) -> dict:
+    return {
+        "type": "session.modify",
+        "event_data": {
+            "focus": args["focus"],
+            "max_new_tokens": args["max_new_tokens"],
+            "instruction": args["instruction"]
+        }
+    }
+
+def build_output_event() -> dict:
+    return {
+        "type": "output_stream.set",
+        "event_data": {
+            "stream_type": "server_side_events_writer",
+            "stream_config": {},
+        }
+    }
@@ -0,0 +1,155 @@
+"""
+Change-gated frame submission for the Activity Monitor.
+Compares each frame with the last submitted one on a small block-averaged
+grayscale copy and only lets frames through while the scene is changing.
+Static scenes drop to one heartbeat frame every `idle_interval_sec`, and any
+change snaps straight back to the full rate.
+
+Used by rtsp_relay.py (--gate). Replay a recording to see the savings:
+    python motion_gate.py recording.mp4 --fps 1
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+# ---------- Defaults ----------
+BLOCK = 8                  # pixels averaged per side: 640x360 -> 80x45
+PIXEL_DELTA = 12.0         # grey-level change for a block to count as changed
+AREA_THRESHOLD = 0.01      # fraction of changed blocks that counts as activity
+HOLD_SEC = 10.0            # keep the full rate this long after the last change
+IDLE_INTERVAL_SEC = 30.0   # heartbeat frame while nothing changes
+
+
+def downsample(frame: np.ndarray, block: int = BLOCK) -> np.ndarray:
+    """Block-average a BGR/grey frame into a small float32 grey image."""
+    h, w = frame.shape[0] // block * block, frame.shape[1] // block * block
+    grey = frame[:h, :w].mean(axis=2, dtype=np.float32) if frame.ndim == 3 else frame[:h, :w].astype(np.float32)
+    return grey.reshape(h // block, block, w // block, block).mean(axis=(1, 3))
+
+
+class ChangeGate:
+    """Decides per frame whether it is worth an inference call."""
+
+    def __init__(self, pixel_delta: float = PIXEL_DELTA, area_threshold: float = AREA_THRESHOLD,
+                 hold_sec: float = HOLD_SEC, idle_interval_sec: float = IDLE_INTERVAL_SEC, block: int = BLOCK):
+        self.pixel_delta = pixel_delta
+        self.area_threshold = area_threshold
+        self.hold_sec = hold_sec
+        self.idle_interval_sec = idle_interval_sec
+        self.block = block
+        self.reference = None
+        self.last_sent = None
+        self.active_until = 0.0
+        self.last_score = 0.0
+        self.seen = 0
+        self.sent = 0
+
+    def change_score(self, small: np.ndarray) -> float:
+        """Fraction of blocks that differ from the last submitted frame."""
+        if self.reference is None or self.reference.shape != small.shape:
+            return 1.0
+        return float(np.count_nonzero(np.abs(small - self.reference) > self.pixel_delta)) / small.size
+
+    def should_send(self, frame: np.ndarray, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        small = downsample(frame, self.block)
+        self.seen += 1
+        self.last_score = self.change_score(small)
+        if self.last_score >= self.area_threshold:
+            self.active_until = now + self.hold_sec
+        send = (now < self.active_until
+                or self.last_sent is None
+                or now - self.last_sent >= self.idle_interval_sec)
+        if send:
+            self.reference = small
+            self.last_sent = now
+            self.sent += 1
+        return send
+
+    def report(self) -> str:
+        saved = 1 - self.sent / self.seen if self.seen else 0.0
+        return f"{self.sent}/{self.seen} frames submitted ({100 * saved:.0f}% of inference calls saved)"
+
+
+# ---------- Replay ----------
+def replay(path: str, fps: float, gate: ChangeGate, target_size: tuple[int, int] = (360, 640)) -> dict:
+    """Run the gate over a recording sampled at `fps`, using video time instead of wall time.
+
+    Added latency is measured against a gate-free sensitive detector (half the area
+    threshold): for every frame where that detector sees a change and the gate holds
+    the frame back, the delay until the gate next submits a frame is recorded.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video: {path}")
+    src_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    stride = max(1, round(src_fps / fps))
+    height, width = target_size
+
+    start = time.perf_counter()
+    gate_sec = 0.0
+    prev_small = None
+    pending_since = None
+    delays = []
+    index = 0
+    while cap.grab():
+        if index % stride == 0:
+            ok, frame = cap.retrieve()
+            if not ok:
+                break
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            t = index / src_fps
+            t0 = time.perf_counter()
+            sent = gate.should_send(frame, now=t)
+            gate_sec += time.perf_counter() - t0
+
+            small = downsample(frame, gate.block)
+            changed = (prev_small is not None and
+                       np.count_nonzero(np.abs(small - prev_small) > gate.pixel_delta) / small.size
+                       >= gate.area_threshold / 2)
+            prev_small = small
+            if sent:
+                if pending_since is not None:
+                    delays.append(t - pending_since)
+                    pending_since = None
+            elif changed and pending_since is None:
+                pending_since = t
+        index += 1
+    cap.release()
+
+    return {
+        "frames": gate.seen,
+        "submitted": gate.sent,
+        "saved_pct": 100 * (1 - gate.sent / gate.seen) if gate.seen else 0.0,
+        "missed_changes": len(delays) + (pending_since is not None),
+        "max_added_latency_sec": max(delays, default=0.0),
+        "mean_added_latency_sec": sum(delays) / len(delays) if delays else 0.0,
+        "gate_ms_per_frame": 1000 * gate_sec / gate.seen if gate.seen else 0.0,
+        "elapsed_sec": time.perf_counter() - start,
+    }
+
+
+# ---------- Main ----------
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recording through the change gate.")
+    parser.add_argument("video")
+    parser.add_argument("--fps", type=float, default=1.0, help="submission rate without the gate")
+    parser.add_argument("--pixel-delta", type=float, default=PIXEL_DELTA)
+    parser.add_argument("--area-threshold", type=float, default=AREA_THRESHOLD)
+    parser.add_argument("--hold", type=float, default=HOLD_SEC)
+    parser.add_argument("--idle-interval", type=float, default=IDLE_INTERVAL_SEC)
+    opts = parser.parse_args()
+
+    gate = ChangeGate(opts.pixel_delta, opts.area_threshold, opts.hold, opts.idle_interval)
+    stats = replay(opts.video, opts.fps, gate)
+    print(f"Inference calls: {stats['frames']} -> {stats['submitted']} ({stats['saved_pct']:.0f}% saved)")
+    print(f"Changes held back: {stats['missed_changes']}, added latency "
+          f"mean {stats['mean_added_latency_sec']:.1f}s / max {stats['max_added_latency_sec']:.1f}s")
+    print(f"Gate cost: {stats['gate_ms_per_frame']:.2f} ms/frame (replay took {stats['elapsed_sec']:.1f}s)")
+
+if __name__ == "__main__":
+    main()
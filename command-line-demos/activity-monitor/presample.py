@@ -0,0 +1,149 @@
+"""
+Local video pre-sampling for the Activity Monitor.
+Decodes a video once, keeps only the frames the video_file_reader window/step
+config will analyse, downscales them to the RTSP target size and re-encodes a
+much smaller file for upload. Decoding is split across CPU cores.
+
+Requires OpenCV: pip install opencv-python
+
+Usage (compare sizes without uploading):
+    python presample.py video.mp4 --window-size 1 --step-size 60
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# ---------- Defaults ----------
+TARGET_IMAGE_SIZE = (360, 640)  # (height, width), same as the RTSP input stream
+FOURCC = "mp4v"
+SEEK_MIN_GAP = 120  # frames; shorter gaps are skipped with grab() instead of a keyframe seek
+
+
+def kept_frame_ranges(frame_count: int, window_size: int, step_size: int) -> list[tuple[int, int]]:
+    """Half-open frame ranges covered by the reader's windows."""
+    if window_size >= step_size:
+        return [(0, frame_count)]
+    return [(start, min(start + window_size, frame_count)) for start in range(0, frame_count, step_size)]
+
+
+def _encode_segment(src_path: str, ranges: list[tuple[int, int]], fps: float, out_path: str) -> int:
+    """Worker: decode the given frame ranges, downscale and write them to `out_path`."""
+    import cv2
+
+    height, width = TARGET_IMAGE_SIZE
+    cap = cv2.VideoCapture(src_path)
+    writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*FOURCC), fps, (width, height))
+    written = 0
+    pos = None
+    try:
+        for start, end in ranges:
+            if pos is None or start - pos > SEEK_MIN_GAP or start < pos:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            else:
+                while pos < start and cap.grab():
+                    pos += 1
+            pos = start
+            while pos < end:
+                ok, frame = cap.read()
+                if not ok:
+                    return written
+                writer.write(cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA))
+                written += 1
+                pos += 1
+        return written
+    finally:
+        cap.release()
+        writer.release()
+
+
+def presample_video(src_path: str, window_size: int, step_size: int, workers: int | None = None) -> dict:
+    """Write a pre-sampled copy of `src_path` and return its path, new window/step and stats.
+
+    When window_size < step_size only the first `window_size` frames of every step are kept,
+    so the new file is read with step_size == window_size. The frame rate is scaled so the
+    output keeps the original duration.
+    """
+    import cv2
+
+    start = time.monotonic()
+    cap = cv2.VideoCapture(src_path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video: {src_path}")
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+
+    ranges = kept_frame_ranges(frame_count, window_size, step_size)
+    if window_size < step_size:
+        out_fps = fps * window_size / step_size
+        new_window, new_step = window_size, window_size
+    else:
+        out_fps = fps
+        new_window, new_step = window_size, step_size
+
+    # Split the kept ranges into one contiguous, ordered chunk per worker
+    workers = workers or os.cpu_count() or 1
+    if len(ranges) == 1:
+        (a, b), = ranges
+        bounds = [a + (b - a) * i // workers for i in range(workers + 1)]
+        ranges = [(lo, hi) for lo, hi in zip(bounds, bounds[1:]) if hi > lo]
+    per_worker = -(-len(ranges) // workers)
+    chunks = [ranges[i:i + per_worker] for i in range(0, len(ranges), per_worker)]
+
+    tmp_dir = tempfile.mkdtemp(prefix="presample-")
+    segment_paths = [os.path.join(tmp_dir, f"part{i:03d}.mp4") for i in range(len(chunks))]
+    # spawn: safe when called from the app's background upload thread
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        frames = list(pool.map(_encode_segment, [src_path] * len(chunks), chunks,
+                               [out_fps] * len(chunks), segment_paths))
+
+    # Concatenate the (already small) segments in order
+    height, width = TARGET_IMAGE_SIZE
+    out_path = os.path.join(tmp_dir, f"{os.path.splitext(os.path.basename(src_path))[0]}_presampled.mp4")
+    writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*FOURCC), out_fps, (width, height))
+    for seg in segment_paths:
+        cap = cv2.VideoCapture(seg)
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            writer.write(frame)
+        cap.release()
+        os.unlink(seg)
+    writer.release()
+
+    return {
+        "path": out_path,
+        "window_size": new_window,
+        "step_size": new_step,
+        "frames_in": frame_count,
+        "frames_out": sum(frames),
+        "bytes_in": os.path.getsize(src_path),
+        "bytes_out": os.path.getsize(out_path),
+        "elapsed_sec": time.monotonic() - start,
+    }
+
+
+# ---------- Main ----------
+def main():
+    parser = argparse.ArgumentParser(description="Pre-sample a video for the Activity Monitor lens.")
+    parser.add_argument("video")
+    parser.add_argument("--window-size", type=int, default=60)
+    parser.add_argument("--step-size", type=int, default=60)
+    parser.add_argument("--workers", type=int)
+    opts = parser.parse_args()
+
+    stats = presample_video(opts.video, opts.window_size, opts.step_size, opts.workers)
+    print(f"Frames: {stats['frames_in']} -> {stats['frames_out']}")
+    print(f"Size:   {stats['bytes_in'] / 1e6:.1f} MB -> {stats['bytes_out'] / 1e6:.1f} MB "
+          f"({100 * stats['bytes_out'] / max(stats['bytes_in'], 1):.1f}%)")
+    print(f"Time:   {stats['elapsed_sec']:.1f}s")
+    print(f"Read with window_size={stats['window_size']} step_size={stats['step_size']}")
+    print(f"Output: {stats['path']}")
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,32 @@ Activity Monitor Quickstart
 Interactive activity monitoring using Newton's Activity Monitor Lens for video or RTSP analysis
 """
 
-import logging
 import os
-import signal
 import sys
-from archetypeai.api_client import ArchetypeAI
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))  # shared helpers
+
+import startup_profile  # first, so its clock starts at launch
+
+import logging
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from activity_lens import (
+    DEFAULT_INSTRUCTION, DEFAULT_LENS_ID, DEFAULT_MAX_NEW_TOKENS, DEFAULT_MAX_RUN_SEC, DEFAULT_STEP_SIZE,
+    DEFAULT_WINDOW_SIZE, MULTI_FOCUS_INSTRUCTION, build_focus_event, build_input_event, build_output_event,
+)
+from client_pool import get_client
+from multi_focus import FOCUS_SEPARATOR, build_multi_focus, demux_response, split_focuses
+from presample import presample_video
+from sse_supervisor import SupervisedSSE
+from timeline import DEDUP_WINDOW, ResultDeduper
+from video_upload import upload_video
+
+if TYPE_CHECKING:
+    from archetypeai.api_client import ArchetypeAI
 
 logging.basicConfig(level=logging.ERROR, format="%(asctime)s [%(levelname)s] %(message)s")
 
@@ -23,18 +44,11 @@ BANNER = r"""
 def colorize_text(text: str, red: int = 164, green: int = 186, blue: int = 250) -> str:
     return f"\033[38;2;{red};{green};{blue}m{text}\033[0m"
 
-# ---------- Setup ----------
-DEFAULT_LENS_ID = "lns-fd669361822b07e2-bc718aa3fdf0b3b7"
-DEFAULT_INSTRUCTION = "Answer the following question about the video in less than 15 words:"
-DEFAULT_MAX_RUN_SEC = 600.0
-DEFAULT_MAX_NEW_TOKENS = 256
-DEFAULT_STEP_SIZE = 60
-DEFAULT_WINDOW_SIZE = 60
-
 # ---------- Interactive inputs ----------
 def get_user_inputs() -> dict:
     print(colorize_text(BANNER))
     print("\n=== Activity Monitor ===\n")
+    startup_profile.mark("first prompt")
 
     api_key = os.getenv("ATAI_API_KEY", "").strip() or input("Enter your ArchetypeAI API key: ").strip()
     if not api_key:
@@ -47,12 +61,14 @@ def get_user_inputs() -> dict:
 
     video_file_path = None
     rtsp_url = None
+    presample = False
     if input_type == "video":
         while True:
             p = input("Enter path to video file: ").strip().strip("'\"")
             if os.path.exists(p):
                 video_file_path = p; break
             print(f"Error: '{p}' not found.")
+        presample = input("Pre-sample and downscale locally before upload? (y/N): ").strip().lower() == "y"
     else:
         while True:
             u = input("Enter RTSP URL: ").strip()
@@ -60,8 +76,11 @@ def get_user_inputs() -> dict:
                 rtsp_url = u; break
             print("Please enter a valid rtsp:// or rtsps:// URL.")
 
-    focus = input("\nWhat would you like to know about the video? ").strip() or "Describe the video."
-    instruction = DEFAULT_INSTRUCTION
+    print(f"\nSeparate several questions with '{FOCUS_SEPARATOR}' to ask them all in one session.")
+    focuses = split_focuses(input("What would you like to know about the video? ")) or ["Describe the video."]
+    focus = build_multi_focus(focuses)
+    instruction = DEFAULT_INSTRUCTION if len(focuses) == 1 else MULTI_FOCUS_INSTRUCTION
+    timeline_path = input("Timeline file for state changes (blank to skip): ").strip().strip("'\"") or None
 
     return {
         "api_key": api_key,
@@ -69,123 +88,153 @@ def get_user_inputs() -> dict:
         "video_file_path": video_file_path,
         "rtsp_url": rtsp_url,
         "focus": focus,
+        "focuses": focuses,
         "instruction": instruction,
-        "max_run_time_sec": DEFAULT_MAX_RUN_SEC,
+        "max_run_time_sec": -1.0 if input_type == "rtsp" else DEFAULT_MAX_RUN_SEC,  # cameras run until Ctrl+C
         "max_new_tokens": DEFAULT_MAX_NEW_TOKENS,
         "lens_id": DEFAULT_LENS_ID,
         "video_file_id": None,          # filled later if video
+        "video_upload": None,           # background upload future
+        "presample": presample,
+        "timeline_path": timeline_path,
+        "dedup_window": DEDUP_WINDOW,
         "step_size": DEFAULT_STEP_SIZE,
         "window_size": DEFAULT_WINDOW_SIZE,
     }
 
-# ---------- Event builders ----------
-def build_input_event(args: dict) -> dict:
-    if args["input_type"] == "rtsp":
-        return {
-            "type": "input_stream.set",
-            "event_data": {
-                "stream_type": "rtsp_video_reader",
-                "stream_config": {
-                    "rtsp_url": args["rtsp_url"],
-                    "target_image_size": [360, 640],
-                    "target_frame_rate_hz": 1.0,
-                }
-            }
-        }
-    else:
-        return {
-            "type": "input_stream.set",
-            "event_data": {
-                "stream_type": "video_file_reader",
-                "stream_config": {
-                    "file_id": args["video_file_id"],
-                    "step_size": args["step_size"],
-                    "window_size": args["window_size"],
-                }
-            }
-        }
-
-def build_focus_event(args: dict) -> dict:
-    return {
-        "type": "session.modify",
-        "event_data": {
-            "focus": args["focus"],
-            "max_new_tokens": args["max_new_tokens"],
-            "instruction": args["instruction"]
-        }
-    }
+# ---------- Video upload ----------
+def prepare_video(client: "ArchetypeAI", args: dict) -> str:
+    """Optionally pre-sample the video, then upload it; returns the file_id."""
+    if not args["presample"]:
+        return upload_video(client, args["video_file_path"])
 
-def build_output_event() -> dict:
-    return {
-        "type": "output_stream.set",
-        "event_data": {
-            "stream_type": "server_side_events_writer",
-            "stream_config": {},
-        }
-    }
+    try:
+        stats = presample_video(args["video_file_path"], args["window_size"], args["step_size"])
+    except Exception as e:
+        logging.warning(f"Pre-sampling failed ({e}); uploading the original video.")
+        return upload_video(client, args["video_file_path"])
+    print(f"Pre-sampled {stats['frames_in']} -> {stats['frames_out']} frames, "
+          f"{stats['bytes_in'] / 1e6:.1f} -> {stats['bytes_out'] / 1e6:.1f} MB in {stats['elapsed_sec']:.1f}s")
+    args["window_size"], args["step_size"] = stats["window_size"], stats["step_size"]
+
+    start = time.monotonic()
+    try:
+        file_id = upload_video(client, stats["path"])
+    finally:
+        os.unlink(stats["path"])
+        os.rmdir(os.path.dirname(stats["path"]))
+    upload_sec = time.monotonic() - start
+    rate = stats["bytes_out"] / max(upload_sec, 1e-6)
+    print(f"End-to-end {stats['elapsed_sec'] + upload_sec:.1f}s vs ~{stats['bytes_in'] / rate:.1f}s "
+          f"to upload the original at the same bandwidth")
+    return file_id
+
+# ---------- Output ----------
+def _as_time(ts) -> float:
+    try:
+        return float(ts)
+    except (TypeError, ValueError):
+        return time.time()
+
+def report_change(deduper: ResultDeduper, ts, text: str, label: str = "") -> None:
+    """Print a response only when it changes the state, with how long the last state lasted."""
+    now = _as_time(ts)
+    if not deduper.add(now, text):
+        return
+    prev = deduper.finished
+    lasted = f"  (previous state lasted {now - prev['start']:.0f}s, {prev['count']} results)" if prev else ""
+    print(f"{ts}{label}: {text}{lasted}")
 
 # ---------- Session ----------
-def session_fn(session_id: str, session_endpoint: str, client: ArchetypeAI, args: dict) -> None:
+def configure_session(client: "ArchetypeAI", session_id: str, args: dict) -> None:
+    client.lens.sessions.process_event(session_id, build_input_event(args))
+    client.lens.sessions.process_event(session_id, build_focus_event(args))
+    client.lens.sessions.process_event(session_id, build_output_event())
+
+def session_fn(session_id: str, session_endpoint: str, client: "ArchetypeAI", args: dict) -> None:
     print(f"Session created: {session_id}")
 
-    # If using a video file, upload it now (after session start)
-    if args["input_type"] == "video" and args.get("video_file_path"):
-        print(f"Uploading video: {args['video_file_path']}")
+    # If using a video file, wait for the upload started alongside session creation
+    if args["input_type"] == "video" and args.get("video_upload"):
         try:
-            resp = client.files.local.upload(args["video_file_path"])
-            args["video_file_id"] = resp.get("file_id")
-            if not args["video_file_id"]:
-                print("Error: no file_id returned."); return
+            args["video_file_id"] = args["video_upload"].result()
         except Exception as e:
             print(f"Error: Failed to upload video: {e}")
             return
 
     # Configure streams and focus
-    client.lens.sessions.process_event(session_id, build_input_event(args))
-    client.lens.sessions.process_event(session_id, build_focus_event(args))
-    client.lens.sessions.process_event(session_id, build_output_event())
-
-    # SSE reader
-    sse_reader = client.lens.sessions.create_sse_consumer(session_id, max_read_time_sec=args["max_run_time_sec"])
-
-    print(f"\nMonitoring started — looking for: '{args['focus']}'")
-    print("Press Ctrl+C to stop\n")
+    configure_session(client, session_id, args)
 
     stop = {"flag": False}
     def _sigint(_s, _f): stop["flag"] = True
     signal.signal(signal.SIGINT, _sigint)
 
+    # SSE reader: reconnects dropped streams and renews the session if it dies server-side
+    sse_reader = SupervisedSSE(client, session_id, lens_id=args["lens_id"],
+                               setup=lambda new_id: configure_session(client, new_id, args),
+                               max_read_time_sec=args["max_run_time_sec"], stop=lambda: stop["flag"])
+
+    focuses = args["focuses"]
+    print(f"\nMonitoring started — looking for: {', '.join(repr(f) for f in focuses)}")
+    print("Press Ctrl+C to stop\n")
+
+    # Only state changes are printed; repeats extend the current run
+    multi = len(focuses) > 1
+    dedupers = [ResultDeduper(args["dedup_window"], timeline_path=args["timeline_path"], label=f if multi else None)
+                for f in focuses]
+    results, missing = 0, 0
     try:
-        for event in sse_reader.read(block=True):
-            if stop["flag"]:
-                break
+        for event in sse_reader.events():
             if isinstance(event, dict) and event.get("type") == "inference.result":
                 ed = event.get("event_data", {})
                 resp = ed.get("response") or []
                 ts = ed.get("query_metadata", {}).get("sensor_timestamp", "N/A")
                 if resp and isinstance(resp, list):
-                    print(f"{ts}: {resp[0]}")
+                    results += 1
+                    answers = demux_response(resp[0], len(focuses))
+                    missing += len(focuses) - len(answers)
+                    for i, f in enumerate(focuses, 1):
+                        if i in answers:
+                            report_change(dedupers[i - 1], ts, answers[i], f" [{f}]" if multi else "")
     finally:
         sse_reader.close()
         print("Stopped.")
+        print(f"Stream: {sse_reader.report()}")
+        for d in dedupers:
+            d.close()
+            print(f"{d.label or 'Output'}: {d.report()}")
+        if args["timeline_path"]:
+            print(f"Timeline written to {args['timeline_path']}")
+        if len(focuses) > 1 and results:
+            print(f"{len(focuses)} questions answered by 1 session in {results} inference calls "
+                  f"(separate sessions: {len(focuses)} × {results} = {len(focuses) * results}); "
+                  f"{missing} answers missing from responses.")
 
 # ---------- Main ----------
 def main():
+    startup_profile.preload("archetypeai.api_client")  # loads in the background behind the prompts
     args = get_user_inputs()
-    client = ArchetypeAI(args["api_key"], api_endpoint=ArchetypeAI.get_default_endpoint())
+
+    client = get_client(args["api_key"])
+    startup_profile.mark("client loaded")
+    startup_profile.report()
 
     print("\n--- Configuration Summary ---")
     print(f"Input:  {args['input_type'].upper()}")
     if args['input_type'] == 'rtsp':
         print(f"RTSP:   {args['rtsp_url']}")
     else:
-        print(f"Video:  {args['video_file_path']}")
-    print(f"Focus:  {args['focus']}")
+        print(f"Video:  {args['video_file_path']}" + (" (pre-sampled)" if args["presample"] else ""))
+    print(f"Focus:  {'; '.join(args['focuses'])}")
 
     input("\nPress Enter to start monitoring...")
 
-    # Start session;
-    client.lens.create_and_run_session(args["lens_id"], session_fn, auto_destroy=True, client=client, args=args)
+    # Upload in the background while the session is being created
+    with ThreadPoolExecutor(max_workers=1) as uploader:
+        if args["input_type"] == "video":
+            print(f"Uploading video: {args['video_file_path']}")
+            args["video_upload"] = uploader.submit(prepare_video, client, args)
+        client.lens.create_and_run_session(args["lens_id"], session_fn, auto_destroy=True, client=client, args=args)
     print("Session finished.")
 
 if __name__ == "__main__":
@@ -0,0 +1,300 @@
+"""
+Local RTSP relay for the Activity Monitor.
+Pulls each camera once, shapes frame rate and size, and fans the frames out to
+several consumers (Lens sessions, one per focus). Each consumer holds only the
+newest frame, so a slow consumer drops stale frames instead of building up latency.
+With --gate, frames of a static scene are held back (see motion_gate.py).
+
+EXPERIMENTAL: --focus sends each frame over the session socket as a base64 image
+"model.query" event. That event schema is a guess and is not a documented Lens API,
+so sessions may reject it or return nothing; the dry run without --focus only
+measures the relay.
+
+Requires OpenCV: pip install opencv-python
+
+Usage:
+    # dry run: measure fan-out with 3 local consumers on a file or camera
+    python rtsp_relay.py recording.mp4 --consumers 3 --seconds 30
+    # one camera pull, one Lens session per focus
+    python rtsp_relay.py rtsp://camera.local:554/stream --focus "person near forklift" --focus "smoke"
+"""
+
+import argparse
+import base64
+import logging
+import os
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))  # shared helpers
+
+from activity_lens import DEFAULT_INSTRUCTION, DEFAULT_LENS_ID, DEFAULT_MAX_NEW_TOKENS, build_focus_event
+from motion_gate import ChangeGate
+from client_pool import get_client
+from presample import TARGET_IMAGE_SIZE
+
+if TYPE_CHECKING:
+    from archetypeai.api_client import ArchetypeAI
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# ---------- Defaults ----------
+DEFAULT_TARGET_FPS = 1.0
+DEFAULT_TARGET_SIZE = TARGET_IMAGE_SIZE  # (height, width), same as the Lens RTSP reader
+JPEG_QUALITY = 85
+RECONNECT_SEC = 2.0
+
+
+class Subscription:
+    """Single-slot mailbox: always holds the newest frame, counts the ones overwritten."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.delivered = 0
+        self.dropped = 0
+        self._frame = None
+        self._cond = threading.Condition()
+        self.closed = False
+
+    def publish(self, frame, ts: float) -> None:
+        with self._cond:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = (ts, frame)
+            self._cond.notify()
+
+    def get(self, timeout: float | None = None):
+        """Return (timestamp, frame) or None on timeout/close."""
+        with self._cond:
+            if self._frame is None and not self.closed:
+                self._cond.wait(timeout)
+            item, self._frame = self._frame, None
+        if item is not None:
+            self.delivered += 1
+        return item
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class FrameRelay:
+    """Pulls one source and publishes shaped frames to every subscription."""
+
+    def __init__(self, source: str, target_fps: float = DEFAULT_TARGET_FPS,
+                 target_size: tuple[int, int] = DEFAULT_TARGET_SIZE, gate: ChangeGate | None = None):
+        self.source = source
+        self.target_fps = target_fps
+        self.target_size = target_size
+        self.gate = gate
+        self.subscriptions: list[Subscription] = []
+        self.frames_pulled = 0
+        self.frames_published = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def subscribe(self, name: str) -> Subscription:
+        sub = Subscription(name)
+        with self._lock:
+            self.subscriptions.append(sub)
+        return sub
+
+    def start(self) -> "FrameRelay":
+        self._thread.start()
+        return self
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait for the pull loop to end (a file source ends on its own); True once it has."""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.join(timeout=5)
+        for sub in self.subscriptions:
+            sub.close()
+
+    def _run(self) -> None:
+        import cv2
+
+        height, width = self.target_size
+        is_file = os.path.exists(self.source)
+        interval = 1.0 / self.target_fps if self.target_fps > 0 else 0.0
+        while not self._stop.is_set():
+            cap = cv2.VideoCapture(self.source)
+            self.connections += 1
+            if not cap.isOpened():
+                logging.error(f"Relay: cannot open {self.source}; retrying")
+                time.sleep(RECONNECT_SEC); continue
+            # Files are paced at their native rate so they behave like a live camera
+            frame_period = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30.0) if is_file else 0.0
+            next_publish = 0.0
+            try:
+                while not self._stop.is_set():
+                    started = time.monotonic()
+                    # grab() every frame so the RTSP buffer never lags; decode only what is published
+                    if not cap.grab():
+                        break
+                    self.frames_pulled += 1
+                    now = time.monotonic()
+                    if now >= next_publish:
+                        ok, frame = cap.retrieve()
+                        if ok:
+                            next_publish = now + interval
+                            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+                            if self.gate is None or self.gate.should_send(frame, now):
+                                with self._lock:
+                                    subs = list(self.subscriptions)
+                                for sub in subs:
+                                    sub.publish(frame, time.time())
+                                self.frames_published += 1
+                    if frame_period:
+                        time.sleep(max(0.0, frame_period - (time.monotonic() - started)))
+            finally:
+                cap.release()
+            if is_file:
+                break
+            time.sleep(RECONNECT_SEC)
+
+    def report(self) -> str:
+        lines = [f"{self.source}: {self.connections} upstream connection(s), "
+                 f"{self.frames_pulled} frames pulled, {self.frames_published} published"]
+        if self.gate:
+            lines.append(f"  change gate: {self.gate.report()}")
+        for sub in self.subscriptions:
+            lines.append(f"  {sub.name}: {sub.delivered} delivered, {sub.dropped} dropped (stale)")
+        return "\n".join(lines)
+
+
+_relays: dict[tuple, FrameRelay] = {}
+_relays_lock = threading.Lock()
+
+def get_relay(source: str, target_fps: float = DEFAULT_TARGET_FPS,
+              target_size: tuple[int, int] = DEFAULT_TARGET_SIZE, gate: bool = False) -> FrameRelay:
+    """Return the running relay for a source, starting it on first use (one pull per camera)."""
+    key = (source, target_fps, tuple(target_size), gate)
+    with _relays_lock:
+        if key not in _relays:
+            _relays[key] = FrameRelay(source, target_fps, target_size, ChangeGate() if gate else None).start()
+        return _relays[key]
+
+
+# ---------- Lens consumer ----------
+def build_image_query_event(jpeg_bytes: bytes) -> dict:
+    """EXPERIMENTAL: this query event is not documented for the activity lens and may be
+    rejected; the rtsp_video_reader input stream in quickstart.py is the supported path."""
+    return {
+        "type": "model.query",
+        "event_data": {
+            "data": [{"type": "base64_img", "base64_img": base64.b64encode(jpeg_bytes).decode()}],
+        }
+    }
+
+def run_socket_session(lens, lens_id: str, session_fn, **session_kwargs):
+    """client.lens.create_and_run_session for sessions that share a client.
+
+    Its auto_destroy calls sessions.close(), which closes every socket in the session socket
+    cache (a class attribute, so shared by all clients in the process), breaking the other
+    focus sessions. Here only this session is destroyed; main() calls sessions.close() once
+    every focus session has ended.
+    """
+    session_id, session_endpoint = lens.create_session(lens_id)
+    try:
+        return session_fn(session_id, session_endpoint, **session_kwargs)
+    finally:
+        try:
+            lens.sessions.destroy(session_id)
+        except Exception as e:
+            logging.error(f"Failed to destroy session {session_id}: {e}")
+
+def forward_to_lens(client: "ArchetypeAI", lens_id: str, sub: Subscription, args: dict, stop: threading.Event) -> None:
+    """EXPERIMENTAL: run one Lens session fed by a relay subscription over the session socket
+    (see build_image_query_event), printing each response."""
+    import cv2
+
+    def session_fn(session_id, session_endpoint, client, args):
+        client.lens.sessions.process_event(session_id, build_focus_event(args))
+        if not client.lens.sessions.connect(session_id, session_endpoint):
+            logging.error(f"[{sub.name}] could not open the session socket"); return
+        while not stop.is_set():
+            item = sub.get(timeout=1.0)
+            if item is None:
+                if sub.closed:
+                    return
+                continue
+            ts, frame = item
+            ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+            if not ok:
+                continue
+            response = client.lens.sessions.write(session_id, build_image_query_event(jpeg.tobytes()))
+            result = (response.get("event_data") or {}).get("response", response) if isinstance(response, dict) else response
+            print(f"[{sub.name}] {time.strftime('%H:%M:%S', time.localtime(ts))}: {result}")
+
+    try:
+        run_socket_session(client.lens, lens_id, session_fn, client=client, args=args)
+    except Exception as e:
+        logging.error(f"[{sub.name}] session failed: {e}")
+
+
+# ---------- Main ----------
+def main():
+    parser = argparse.ArgumentParser(description="Pull a camera once and fan it out to several consumers.")
+    parser.add_argument("source", help="rtsp:// URL or a local video file")
+    parser.add_argument("--fps", type=float, default=DEFAULT_TARGET_FPS)
+    parser.add_argument("--focus", action="append", default=[],
+                        help="EXPERIMENTAL: one Lens session per focus, fed over the session socket with an "
+                             "undocumented query event (repeatable)")
+    parser.add_argument("--consumers", type=int, default=2, help="dry-run consumers when no --focus is given")
+    parser.add_argument("--gate", action="store_true", help="hold back frames while the scene is static")
+    parser.add_argument("--seconds", type=float, default=0, help="stop after this long (0 = until Ctrl+C)")
+    parser.add_argument("--lens-id", default=DEFAULT_LENS_ID)
+    opts = parser.parse_args()
+
+    relay = get_relay(opts.source, opts.fps, gate=opts.gate)
+    stop = threading.Event()
+    workers = []
+    client = None
+    if opts.focus:
+        print("Warning: --focus uses an undocumented session socket event schema; results may not arrive.")
+        api_key = os.getenv("ATAI_API_KEY", "").strip() or input("Enter your ArchetypeAI API key: ").strip()
+        client = get_client(api_key)
+        for focus in opts.focus:
+            args = {"focus": focus, "instruction": DEFAULT_INSTRUCTION, "max_new_tokens": DEFAULT_MAX_NEW_TOKENS}
+            workers.append(threading.Thread(
+                target=forward_to_lens, args=(client, opts.lens_id, relay.subscribe(focus), args, stop), daemon=True))
+    else:
+        def drain(sub: Subscription):
+            while not stop.is_set() and not sub.closed:
+                sub.get(timeout=1.0)
+        workers = [threading.Thread(target=drain, args=(relay.subscribe(f"consumer-{i + 1}"),), daemon=True)
+                   for i in range(opts.consumers)]
+
+    for w in workers:
+        w.start()
+    deadline = time.monotonic() + opts.seconds if opts.seconds else None
+    try:
+        while relay.is_alive() and (deadline is None or time.monotonic() < deadline):
+            relay.join(timeout=0.5)
+    except KeyboardInterrupt:
+        pass
+    stop.set()
+    relay.stop()
+    for w in workers:
+        w.join(timeout=10)  # lets each Lens worker destroy its session
+    if client:
+        client.lens.sessions.close()  # every focus session has ended; close their sockets
+    print(relay.report())
+    n = len(relay.subscriptions)
+    if n > 1:
+        print(f"Camera pulled once for {n} consumers (direct pulls would open {n} streams).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Result deduplication and timeline for the Activity Monitor.
+Normalizes each response, hashes it and merges it into the current run when it
+is the same description (or nearly the same wording), so only state changes are
+reported, each with how long the previous state lasted. Memory is constant per
+stream: only the current run and a bounded window of recent descriptions are kept.
+
+Finished runs can be written to a run-length-encoded JSONL timeline:
+    {"id": "3f2a…", "start": 12.0, "end": 58.0, "count": 47, "text": "An empty room."}
+`text` is only written the first time an id appears within the window.
+
+Usage (print a timeline):
+    python timeline.py timeline.jsonl
+"""
+
+import argparse
+import hashlib
+import json
+import re
+from collections import deque
+
+# ---------- Defaults ----------
+DEDUP_WINDOW = 32          # recent distinct descriptions remembered per stream
+SIMILARITY = 0.8           # token Jaccard at or above this counts as the same description
+_PUNCT_RE = re.compile(r"[^\w\s]+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    return _SPACE_RE.sub(" ", _PUNCT_RE.sub(" ", text.lower())).strip()
+
+
+def text_id(normalized: str) -> str:
+    return hashlib.blake2b(normalized.encode(), digest_size=8).hexdigest()
+
+
+def similarity(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class ResultDeduper:
+    """Collapses a stream of responses into runs of the same description."""
+
+    def __init__(self, window: int = DEDUP_WINDOW, min_similarity: float = SIMILARITY,
+                 timeline_path: str | None = None, label: str | None = None):
+        self.min_similarity = min_similarity
+        self.label = label
+        self.recent = deque(maxlen=window)   # ids of recent runs
+        self.run = None                      # {"id", "start", "end", "count", "text", "tokens"}
+        self.finished = None
+        self.results = 0
+        self.changes = 0
+        self._timeline = open(timeline_path, "a") if timeline_path else None
+
+    def add(self, ts: float, text: str) -> bool:
+        """Add a response; return True when it starts a new description.
+
+        On a change, the run it replaced is available as `self.finished` (None for the first).
+        """
+        self.results += 1
+        norm = normalize(text)
+        tid = text_id(norm)
+        tokens = frozenset(norm.split())
+        run = self.run
+        if run is not None and (tid == run["id"] or similarity(tokens, run["tokens"]) >= self.min_similarity):
+            run["end"] = ts
+            run["count"] += 1
+            return False
+
+        self.finished = self._finish()
+        self.changes += 1
+        self.run = {"id": tid, "start": ts, "end": ts, "count": 1, "text": text, "tokens": tokens}
+        return True
+
+    def _finish(self) -> dict | None:
+        run = self.run
+        if run is None:
+            return None
+        if self._timeline:
+            record = {"id": run["id"], "start": run["start"], "end": run["end"], "count": run["count"]}
+            if self.label:
+                record["focus"] = self.label
+            if run["id"] not in self.recent:
+                record["text"] = run["text"]
+            self._timeline.write(json.dumps(record) + "\n")
+            self._timeline.flush()
+        if run["id"] in self.recent:
+            self.recent.remove(run["id"])
+        self.recent.append(run["id"])
+        return run
+
+    def close(self) -> dict | None:
+        finished = self._finish()
+        self.run = None
+        if self._timeline:
+            self._timeline.close()
+            self._timeline = None
+        return finished
+
+    def report(self) -> str:
+        saved = 1 - self.changes / self.results if self.results else 0.0
+        return f"{self.results} results, {self.changes} state changes ({100 * saved:.0f}% suppressed as repeats)"
+
+
+def read_timeline(path: str) -> list[dict]:
+    """Load a timeline, filling in `text` for runs that only carry an id."""
+    texts, runs = {}, []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            run = json.loads(line)
+            if "text" in run:
+                texts[run["id"]] = run["text"]
+            run["text"] = texts.get(run["id"], "")
+            runs.append(run)
+    return runs
+
+
+# ---------- Main ----------
+def main():
+    parser = argparse.ArgumentParser(description="Print an Activity Monitor timeline.")
+    parser.add_argument("timeline")
+    opts = parser.parse_args()
+
+    runs = read_timeline(opts.timeline)
+    for run in runs:
+        focus = f"[{run['focus']}] " if "focus" in run else ""
+        print(f"{run['start']:>10} – {run['end']:<10} ({run['count']:>4}x) {focus}{run['text']}")
+    print(f"\n{len(runs)} runs, {sum(r['count'] for r in runs)} results")
+
+if __name__ == "__main__":
+    main()
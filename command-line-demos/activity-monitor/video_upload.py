@@ -0,0 +1,85 @@
+"""
+Resumable video uploads for the Activity Monitor quickstart and the job runner.
+Each uploaded video's SHA-256 and file ID are recorded in UPLOAD_CACHE_PATH, so
+a video already on the endpoint is reused instead of uploaded again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from archetypeai.api_client import ArchetypeAI
+
+# ---------- Defaults ----------
+UPLOAD_CACHE_PATH = ".upload_cache.json"
+UPLOAD_ATTEMPTS = 3
+UPLOAD_WORKERS = 8
+
+
+def _load_upload_cache() -> dict:
+    try:
+        with open(UPLOAD_CACHE_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_upload_cache(cache: dict) -> None:
+    tmp_path = f"{UPLOAD_CACHE_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_path, UPLOAD_CACHE_PATH)
+
+def file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+def upload_video(client: "ArchetypeAI", path: str) -> str:
+    """Upload a video in resumable parts and return its file_id.
+
+    Videos already uploaded to this endpoint (same SHA-256) are reused. Parts are
+    streamed from disk by the client, and a failed attempt resumes from the last
+    checkpointed part instead of starting over.
+    """
+    digest = file_sha256(path)
+    cache = _load_upload_cache()
+    cache_key = f"{client.files.api_endpoint}|{digest}"
+    cached_id = cache.get(cache_key)
+    if cached_id:
+        try:
+            client.files.get_metadata(file_id=cached_id)
+            print(f"Video already uploaded (sha256 {digest[:12]}…) — reusing {cached_id}")
+            return cached_id
+        except Exception:
+            logging.info(f"Cached file {cached_id} not found on the server; uploading again.")
+
+    start = time.monotonic()
+    last_pct = {"value": -10}
+    def _on_progress(done_parts, total_parts, done_bytes, total_bytes):
+        pct = 100 * done_bytes / total_bytes if total_bytes else 100
+        if pct - last_pct["value"] >= 10 or done_parts == total_parts:
+            last_pct["value"] = pct
+            rate = done_bytes / 1e6 / max(time.monotonic() - start, 1e-6)
+            print(f"  upload {pct:5.1f}% ({done_bytes / 1e6:.1f}/{total_bytes / 1e6:.1f} MB) @ {rate:.1f} MB/s")
+
+    for attempt in range(1, UPLOAD_ATTEMPTS + 1):
+        try:
+            resp = client.files.local.upload(path, use_proxy=False, max_workers=UPLOAD_WORKERS,
+                                             on_progress=_on_progress, allow_resume=True)
+            break
+        except Exception as e:
+            if attempt == UPLOAD_ATTEMPTS:
+                raise
+            logging.warning(f"Upload attempt {attempt} failed ({e}); resuming…")
+            time.sleep(2 ** attempt)
+
+    file_id = resp["file_id"]
+    elapsed = time.monotonic() - start
+    size_mb = os.path.getsize(path) / 1e6
+    print(f"Uploaded {size_mb:.1f} MB in {elapsed:.1f}s ({size_mb / max(elapsed, 1e-6):.1f} MB/s) -> {file_id}")
+    cache[cache_key] = file_id
+    _save_upload_cache(cache)
+    return file_id
@@ -0,0 +1,164 @@
+"""
+CSV validation for the Machine State quickstart.
+Streams a CSV in bounded chunks, checks it against the lens csv_configs
+(timestamp + data columns) and computes summary statistics with NumPy.
+
+Parsing uses pyarrow's streaming CSV reader when it is installed (several
+hundred MB/s) and falls back to NumPy otherwise. Memory use is bounded by
+CHUNK_BYTES either way.
+"""
+
+import os
+import time
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # optional fast path
+    pa = None
+
+# ---------- Defaults ----------
+CHUNK_BYTES = 16 * 1024 * 1024  # bytes parsed per batch
+
+
+def read_header(path: str) -> list[str]:
+    with open(path, "r", newline="") as f:
+        return [c.strip() for c in f.readline().strip().split(",")]
+
+
+def _locate_bad_line(lines: list[str], usecols: list[int]) -> tuple[int, str]:
+    """Return (offset, line) of the first line in a chunk that does not parse as numbers."""
+    for offset, line in enumerate(lines):
+        fields = line.rstrip("\r\n").split(",")
+        try:
+            for idx in usecols:
+                float(fields[idx])
+        except (IndexError, ValueError):
+            return offset, line.rstrip("\r\n")
+    return 0, lines[0].rstrip("\r\n") if lines else ""
+
+
+def _iter_blocks_numpy(path: str, usecols: list[int], chunk_bytes: int):
+    """Yield (line_no of first row, float64 block) using NumPy's C parser."""
+    with open(path, "r", newline="") as f:
+        f.readline()  # header
+        line_no = 2
+        while True:
+            lines = f.readlines(chunk_bytes)
+            if not lines:
+                return
+            try:
+                block = np.loadtxt(lines, delimiter=",", usecols=usecols, ndmin=2, dtype=np.float64)
+            except ValueError:
+                offset, bad = _locate_bad_line(lines, usecols)
+                raise ValueError(f"{path}: line {line_no + offset} is not numeric: {bad!r}") from None
+            if len(block):
+                yield line_no, block
+            line_no += len(lines)
+
+
+def _iter_blocks_arrow(path: str, columns: list[str], chunk_bytes: int):
+    """Yield (line_no of first row, float64 block) using pyarrow's streaming reader."""
+    reader = pa_csv.open_csv(
+        path,
+        read_options=pa_csv.ReadOptions(block_size=chunk_bytes),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=columns, column_types={c: pa.float64() for c in columns}),
+    )
+    line_no = 2
+    for batch in reader:
+        if batch.num_rows:
+            block = np.column_stack([batch.column(c).to_numpy(zero_copy_only=False) for c in columns])
+            yield line_no, block
+            line_no += batch.num_rows
+
+
+def validate_csv(path: str, timestamp_column: str, data_columns: list[str], chunk_bytes: int = CHUNK_BYTES) -> dict:
+    """Validate a CSV for the lens and return its summary statistics.
+
+    Checks that the timestamp and data columns exist, every row is numeric and
+    finite, and timestamps are strictly increasing. Raises ValueError with the
+    offending line number on the first problem found.
+    """
+    header = read_header(path)
+    columns = [timestamp_column, *data_columns]
+    missing = [c for c in columns if c not in header]
+    if missing:
+        raise ValueError(f"{path}: missing column(s): {', '.join(missing)}")
+
+    if pa is not None:
+        try:
+            return _validate_blocks(path, data_columns, _iter_blocks_arrow(path, columns, chunk_bytes))
+        except pa.ArrowInvalid:
+            pass  # re-parse with NumPy to report the exact offending line
+    usecols = [header.index(c) for c in columns]
+    return _validate_blocks(path, data_columns, _iter_blocks_numpy(path, usecols, chunk_bytes))
+
+
+def _validate_blocks(path: str, data_columns: list[str], blocks) -> dict:
+    start = time.perf_counter()
+    n_cols = len(data_columns)
+    rows = 0
+    first_ts = last_ts = None
+    min_dt, max_dt = np.inf, 0.0
+    col_sum = np.zeros(n_cols)
+    col_sumsq = np.zeros(n_cols)
+    col_min = np.full(n_cols, np.inf)
+    col_max = np.full(n_cols, -np.inf)
+
+    for line_no, block in blocks:
+        finite = np.isfinite(block).all(axis=1)
+        if not finite.all():
+            offset = int(np.flatnonzero(~finite)[0])
+            raise ValueError(f"{path}: line {line_no + offset} has an empty, NaN or inf value")
+
+        ts = block[:, 0]
+        if last_ts is None:
+            first_ts = float(ts[0])
+            ts_diff = np.diff(ts)
+            bad_offset = 1
+        else:
+            ts_diff = np.diff(ts, prepend=last_ts)
+            bad_offset = 0
+        bad = np.flatnonzero(ts_diff <= 0)
+        if bad.size:
+            raise ValueError(f"{path}: timestamp not increasing at line {line_no + int(bad[0]) + bad_offset}")
+        if ts_diff.size:
+            min_dt = min(min_dt, float(ts_diff.min()))
+            max_dt = max(max_dt, float(ts_diff.max()))
+        last_ts = float(ts[-1])
+
+        values = block[:, 1:]
+        col_sum += values.sum(axis=0)
+        col_sumsq += np.square(values).sum(axis=0)
+        col_min = np.minimum(col_min, values.min(axis=0))
+        col_max = np.maximum(col_max, values.max(axis=0))
+        rows += len(block)
+
+    if rows == 0:
+        raise ValueError(f"{path}: no data rows")
+
+    duration = last_ts - first_ts
+    mean = col_sum / rows
+    std = np.sqrt(np.maximum(col_sumsq / rows - np.square(mean), 0.0))
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(path)
+    return {
+        "rows": rows,
+        "data_columns": list(data_columns),
+        "first_timestamp": first_ts,
+        "last_timestamp": last_ts,
+        "duration_sec": duration,
+        "sample_rate_hz": (rows - 1) / duration if duration > 0 else 0.0,
+        "min_dt_sec": min_dt if rows > 1 else 0.0,
+        "max_dt_sec": max_dt,
+        "mean": mean.tolist(),
+        "std": std.tolist(),
+        "min": col_min.tolist(),
+        "max": col_max.tolist(),
+        "bytes": size,
+        "elapsed_sec": elapsed,
+        "mb_per_sec": size / 1e6 / elapsed if elapsed > 0 else 0.0,
+    }
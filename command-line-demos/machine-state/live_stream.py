@@ -0,0 +1,409 @@
+"""
+Machine State live streaming
+Reads samples from a local source (file tail, named pipe, UDP or TCP), buffers
+them into windows with a fixed-size ring buffer and sends each completed window
+to a Newton Lens session, reporting latency percentiles.
+
+Each window goes through the documented csv_file_reader input stream: it is uploaded
+as a one-window CSV and set as the session input, and results arrive over SSE.
+--experimental-socket instead writes windows over the session socket as a
+"model.query" event; that event schema is a guess and is not a documented API.
+
+Each sample is one CSV line: `timestamp,a1,a2,a3,a4` (or `a1,a2,a3,a4`, stamped on
+arrival). Sources:
+    file:///var/log/sensor.csv   follow a growing file (serial logger, `tail -f` style)
+    file://logs/sensor.csv       the same, relative to the working directory
+    pipe:///tmp/sensor.fifo      read a named pipe, reopening when the writer restarts
+    udp://0.0.0.0:9000           bind and read datagrams (one or more lines each)
+    tcp://192.168.1.20:9000      connect to a sensor gateway and read lines
+
+Usage:
+    python live_stream.py udp://0.0.0.0:9000 sample-files/focus/healthy.csv sample-files/focus/broken.csv
+"""
+
+import argparse
+import logging
+import os
+import queue
+import socket
+import stat
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+from archetypeai.api_client import ArchetypeAI
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))  # shared helpers
+
+from focus_registry import FocusRegistry
+from machine_state_lens import (
+    DATA_COLUMNS, DEFAULT_API_ENDPOINT, DEFAULT_LENS_ID, DEFAULT_STEP_SIZE, DEFAULT_WINDOW_SIZE,
+    TIMESTAMP_COLUMN, build_input_event_csv, build_output_event, build_session_modify_event,
+)
+from sse_supervisor import SupervisedSSE
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# ---------- Defaults ----------
+MAX_PENDING_WINDOWS = 4        # oldest window is dropped beyond this, so latency cannot build up
+LATENCY_HISTORY = 1000         # windows kept for latency percentiles
+REPORT_EVERY_WINDOWS = 20
+POLL_SEC = 0.01
+RECV_BYTES = 65536
+RESULT_TIMEOUT_SEC = 60.0      # a window without a result after this long is counted as lost
+RECONNECT_BACKOFF_MAX_SEC = 5.0
+
+
+# ---------- Sources (yield lists of raw lines) ----------
+def tail_file(path: str, stop: threading.Event):
+    with open(path, "r") as f:
+        f.seek(0, os.SEEK_END)
+        partial = ""
+        while not stop.is_set():
+            data = f.read(RECV_BYTES)
+            if not data:
+                time.sleep(POLL_SEC); continue
+            lines = (partial + data).split("\n")
+            partial = lines.pop()
+            yield lines
+
+def read_pipe(path: str, stop: threading.Event):
+    while not stop.is_set():
+        with open(path, "r") as f:  # blocks until a writer opens the pipe
+            for line in f:
+                yield [line]
+                if stop.is_set():
+                    return
+
+def read_udp(host: str, port: int, stop: threading.Event):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        sock.bind((host, port))
+        sock.settimeout(0.5)
+        while not stop.is_set():
+            try:
+                data, _ = sock.recvfrom(RECV_BYTES)
+            except socket.timeout:
+                continue
+            yield data.decode(errors="replace").splitlines()
+
+def read_tcp(host: str, port: int, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            with socket.create_connection((host, port), timeout=5) as sock:
+                sock.settimeout(0.5)
+                partial = b""
+                while not stop.is_set():
+                    try:
+                        data = sock.recv(RECV_BYTES)
+                    except socket.timeout:
+                        continue
+                    if not data:
+                        break
+                    lines = (partial + data).split(b"\n")
+                    partial = lines.pop()
+                    yield [line.decode(errors="replace") for line in lines]
+        except OSError as e:
+            logging.error(f"TCP source {host}:{port}: {e} — reconnecting")
+            time.sleep(1.0)
+
+def parse_source(url: str) -> tuple:
+    """Validate a source URL up front: ("file"|"pipe", path) or ("udp"|"tcp", host, port)."""
+    parsed = urlparse(url)
+    if parsed.scheme in ("file", "pipe"):
+        path = parsed.netloc + parsed.path  # file://rel/path puts "rel" in netloc
+        if not path:
+            raise ValueError(f"{url}: missing path")
+        if parsed.scheme == "file" and not os.path.isfile(path):
+            raise ValueError(f"{url}: {path} is not a file")
+        if parsed.scheme == "pipe" and not (os.path.exists(path) and stat.S_ISFIFO(os.stat(path).st_mode)):
+            raise ValueError(f"{url}: {path} is not a named pipe (create it with mkfifo)")
+        return parsed.scheme, path
+    if parsed.scheme in ("udp", "tcp"):
+        try:
+            port = parsed.port
+        except ValueError as e:  # out-of-range or non-numeric port
+            raise ValueError(f"{url}: {e}") from None
+        if not parsed.hostname or port is None:
+            raise ValueError(f"{url}: expected {parsed.scheme}://host:port")
+        return parsed.scheme, parsed.hostname, port
+    raise ValueError(f"Unsupported source: {url} (use file://, pipe://, udp:// or tcp://)")
+
+def open_source(source: tuple, stop: threading.Event):
+    """Sample line generator for a source returned by parse_source."""
+    kind, *target = source
+    readers = {"file": tail_file, "pipe": read_pipe, "udp": read_udp, "tcp": read_tcp}
+    return readers[kind](*target, stop)
+
+
+def parse_lines(lines: list[str], n_channels: int) -> tuple[np.ndarray, int]:
+    """Parse CSV lines into a (rows, 1 + n_channels) array; returns (samples, malformed count)."""
+    rows, malformed = [], 0
+    now = time.time()
+    for line in lines:
+        fields = line.strip().split(",")
+        try:
+            values = [float(v) for v in fields]
+        except ValueError:
+            malformed += bool(line.strip())
+            continue
+        if len(values) == n_channels:
+            values.insert(0, now)
+        elif len(values) != n_channels + 1:
+            malformed += 1
+            continue
+        rows.append(values)
+    return np.array(rows, dtype=np.float64).reshape(-1, n_channels + 1), malformed
+
+
+# ---------- Ring buffer ----------
+class WindowRingBuffer:
+    """Fixed-size sample ring that emits a window every `step_size` samples."""
+
+    def __init__(self, window_size: int, step_size: int, width: int):
+        self.window_size = window_size
+        self.step_size = step_size
+        self.buf = np.zeros((window_size, width), dtype=np.float64)
+        self.pos = 0          # next write index
+        self.total = 0        # samples written so far
+        self.until_emit = window_size
+
+    def _window(self) -> np.ndarray:
+        return np.concatenate((self.buf[self.pos:], self.buf[:self.pos]))
+
+    def extend(self, samples: np.ndarray) -> list[np.ndarray]:
+        """Append samples; return the windows completed by them (oldest first)."""
+        windows = []
+        i = 0
+        while i < len(samples):
+            n = min(len(samples) - i, self.until_emit, self.window_size - self.pos)
+            self.buf[self.pos:self.pos + n] = samples[i:i + n]
+            self.pos = (self.pos + n) % self.window_size
+            self.total += n
+            self.until_emit -= n
+            i += n
+            if self.until_emit == 0:
+                windows.append(self._window())
+                self.until_emit = self.step_size
+        return windows
+
+
+# ---------- Lens push ----------
+def write_window_csv(window: np.ndarray, directory: str) -> str:
+    """One window as a CSV in the data file layout, ready for the csv_file_reader stream."""
+    path = os.path.join(directory, f"window-{time.monotonic_ns()}.csv")
+    np.savetxt(path, window, delimiter=",", fmt="%.9g", comments="",
+               header=",".join([TIMESTAMP_COLUMN, *DATA_COLUMNS]))
+    return path
+
+def build_window_event(window: np.ndarray) -> dict:
+    """EXPERIMENTAL: the socket path's query event. This schema is not documented for the
+    machine-state lens and may be rejected; the csv_file_reader path is the supported one."""
+    return {
+        "type": "model.query",
+        "event_data": {
+            "timestamp_column": TIMESTAMP_COLUMN,
+            "data_columns": DATA_COLUMNS,
+            "data": window.tolist(),
+        }
+    }
+
+class LiveStats:
+    def __init__(self):
+        self.samples = 0
+        self.malformed = 0
+        self.windows = 0
+        self.dropped = 0
+        self.lost = 0
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+        self.start = time.monotonic()
+
+    def report(self) -> str:
+        elapsed = max(time.monotonic() - self.start, 1e-9)
+        text = (f"{self.samples / elapsed:.0f} samples/s, {self.windows} windows, "
+                f"{self.dropped} dropped, {self.lost} lost, {self.malformed} malformed")
+        if self.latencies:
+            p50, p95, p99 = np.percentile(np.array(self.latencies) * 1000, [50, 95, 99])
+            text += f", latency p50 {p50:.0f} ms / p95 {p95:.0f} ms / p99 {p99:.0f} ms"
+        return text
+
+
+def ingest(source, ring: WindowRingBuffer, pending: queue.Queue, stats: LiveStats) -> None:
+    """Source thread: parse lines, fill the ring and hand completed windows to the sender."""
+    for lines in source:
+        samples, malformed = parse_lines(lines, len(DATA_COLUMNS))
+        stats.samples += len(samples)
+        stats.malformed += malformed
+        for window in ring.extend(samples):
+            item = (time.monotonic(), window)
+            try:
+                pending.put_nowait(item)
+            except queue.Full:
+                try:
+                    pending.get_nowait()  # drop the stalest window, keep the newest
+                    stats.dropped += 1
+                except queue.Empty:
+                    pass
+                pending.put_nowait(item)
+
+
+def record_result(stats: LiveStats, completed_at: float, label: str, result) -> None:
+    stats.latencies.append(time.monotonic() - completed_at)
+    stats.windows += 1
+    print(f"[{label}] → Predicted class: {result}")
+    if stats.windows % REPORT_EVERY_WINDOWS == 0:
+        print(f"  {stats.report()}")
+
+def send_csv_windows(client: ArchetypeAI, session_id: str, pending: queue.Queue, in_flight: deque,
+                     window_size: int, reader: threading.Thread, stop: threading.Event) -> None:
+    """Sender thread: upload each window as a one-window CSV and set it as the session input."""
+    with tempfile.TemporaryDirectory(prefix="live-windows-") as directory:
+        while not stop.is_set() and (reader.is_alive() or not pending.empty()):
+            try:
+                completed_at, window = pending.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            path = write_window_csv(window, directory)
+            entry = (completed_at, f"{window[-1, 0]:.3f}")
+            try:
+                file_id = client.files.local.upload(path)["file_id"]
+                in_flight.append(entry)  # before sending, so a fast result finds its window
+                client.lens.sessions.process_event(session_id, build_input_event_csv(file_id, window_size, window_size))
+            except Exception as e:
+                logging.error(f"Sending window failed: {e}")
+                try:
+                    in_flight.remove(entry)
+                except ValueError:
+                    pass
+            finally:
+                os.unlink(path)
+
+def expire_in_flight(in_flight: deque, stats: LiveStats) -> None:
+    """Forget windows that got no result within RESULT_TIMEOUT_SEC, so later results pair correctly."""
+    deadline = time.monotonic() - RESULT_TIMEOUT_SEC
+    while in_flight and in_flight[0][0] < deadline:
+        in_flight.popleft()
+        stats.lost += 1
+
+def stream_csv_windows(client: ArchetypeAI, session_id: str, pending: queue.Queue, stats: LiveStats,
+                       reader: threading.Thread, stop: threading.Event, args: dict) -> None:
+    """Supported path: windows go through csv_file_reader, results come back over SSE in order."""
+    client.lens.sessions.process_event(session_id, build_output_event())
+    in_flight = deque()
+    sender = threading.Thread(target=send_csv_windows, daemon=True,
+                              args=(client, session_id, pending, in_flight, args["window_size"], reader, stop))
+    sender.start()
+
+    def finished() -> bool:
+        expire_in_flight(in_flight, stats)
+        return stop.is_set() or not (sender.is_alive() or in_flight)
+
+    # the stream may end after each input file; reconnect while windows are due, backing off
+    # when a connection yields nothing. Once the sender is done, expiry bounds the wait.
+    supervisor = SupervisedSSE(client, session_id, stop=finished, stall_sec=RESULT_TIMEOUT_SEC,
+                               backoff_max_sec=RECONNECT_BACKOFF_MAX_SEC)
+    backoff = POLL_SEC
+    while not finished():
+        got_result = False
+        for event in supervisor.events():
+            if event.get("type") != "inference.result":
+                continue
+            result = (event.get("event_data") or {}).get("response")
+            if result is None:
+                continue
+            got_result = True
+            expire_in_flight(in_flight, stats)
+            if in_flight:
+                completed_at, label = in_flight.popleft()
+                record_result(stats, completed_at, label, result)
+        if got_result:
+            backoff = POLL_SEC
+        elif not finished():
+            time.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX_SEC)
+
+def stream_socket_windows(client: ArchetypeAI, session_id: str, session_endpoint: str, pending: queue.Queue,
+                          stats: LiveStats, reader: threading.Thread) -> None:
+    """EXPERIMENTAL path: write each window over the session socket (see build_window_event)."""
+    if not client.lens.sessions.connect(session_id, session_endpoint):
+        print("Error: could not open the session socket."); return
+    while reader.is_alive() or not pending.empty():
+        try:
+            completed_at, window = pending.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        response = client.lens.sessions.write(session_id, build_window_event(window))
+        result = (response.get("event_data") or {}).get("response", response) if isinstance(response, dict) else response
+        record_result(stats, completed_at, f"{window[-1, 0]:.3f}", result)
+
+def session_fn(session_id: str, session_endpoint: str, client: ArchetypeAI, args: dict) -> None:
+    print(f"Session created: {session_id}")
+    input_n_shot = {cls: client.files.local.upload(p)["file_id"] for cls, p in args["focus_files"].items()}
+    client.lens.sessions.process_event(session_id, build_session_modify_event(input_n_shot, args["window_size"], args["step_size"]))
+
+    stop = threading.Event()
+    stats = LiveStats()
+    pending = queue.Queue(maxsize=MAX_PENDING_WINDOWS)
+    ring = WindowRingBuffer(args["window_size"], args["step_size"], 1 + len(DATA_COLUMNS))
+    reader = threading.Thread(target=ingest, args=(open_source(args["source"], stop), ring, pending, stats), daemon=True)
+    reader.start()
+
+    print(f"\nStreaming from {args['url']}… Press Ctrl+C to stop.\n")
+    try:
+        if args["experimental_socket"]:
+            stream_socket_windows(client, session_id, session_endpoint, pending, stats, reader)
+        else:
+            stream_csv_windows(client, session_id, pending, stats, reader, stop, args)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        print(f"\nStopped. {stats.report()}")
+
+
+# ---------- Main ----------
+def main():
+    parser = argparse.ArgumentParser(description="Stream live sensor samples to the Machine State lens.")
+    parser.add_argument("source", help="file://, pipe://, udp://host:port or tcp://host:port")
+    parser.add_argument("focus_files", nargs="+", help="focus CSVs; the file name becomes the class name")
+    parser.add_argument("--window-size", type=int, default=DEFAULT_WINDOW_SIZE)
+    parser.add_argument("--step-size", type=int, default=DEFAULT_STEP_SIZE)
+    parser.add_argument("--lens-id", default=DEFAULT_LENS_ID)
+    parser.add_argument("--api-endpoint", default=DEFAULT_API_ENDPOINT)
+    parser.add_argument("--experimental-socket", action="store_true",
+                        help="write windows over the session socket with an undocumented query event")
+    opts = parser.parse_args()
+
+    api_key = os.getenv("ATAI_API_KEY", "").strip() or input("Enter your API key: ").strip()
+    if not api_key:
+        print("Error: API key is required."); return
+
+    registry = FocusRegistry(TIMESTAMP_COLUMN, DATA_COLUMNS)
+    try:
+        for p in opts.focus_files:
+            registry.validate(p)
+        source = parse_source(opts.source)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}"); return
+    if opts.experimental_socket:
+        print("Warning: --experimental-socket uses an undocumented event schema; results may not arrive.")
+
+    args = {
+        "url": opts.source,
+        "source": source,
+        "experimental_socket": opts.experimental_socket,
+        "focus_files": {Path(p).stem.lower(): p for p in opts.focus_files},
+        "window_size": opts.window_size,
+        "step_size": opts.step_size,
+    }
+    client = ArchetypeAI(api_key, api_endpoint=opts.api_endpoint)
+    client.lens.create_and_run_session(opts.lens_id, session_fn, auto_destroy=True, client=client, args=args)
+    print("Session finished.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Machine State lens settings and session event builders.
+Shared by the quickstart, live_stream.py, tune.py and the job runner; kept out of
+quickstart.py so they import it under a name no other app uses.
+"""
+
+# ---------- Defaults ----------
+DEFAULT_LENS_ID = "lns-1d519091822706e2-bc108andqxf8b4os"
+DEFAULT_API_ENDPOINT = "https://api.archetypeai.dev/v0.5"
+DEFAULT_WINDOW_SIZE = 1024
+DEFAULT_STEP_SIZE = 1024  # no overlap
+TIMESTAMP_COLUMN = "timestamp"
+DATA_COLUMNS = ["a1", "a2", "a3", "a4"]
+
+# ---------- Event builders ----------
+def build_session_modify_event(input_n_shot: dict, window_size: int, step_size: int) -> dict:
+    return {
+        "type": "session.modify",
+        "event_data": {
+            "input_n_shot": input_n_shot,
+            "csv_configs": {
+                "timestamp_column": TIMESTAMP_COLUMN,
+                "data_columns": DATA_COLUMNS,
+                "window_size": window_size,
+                "step_size": step_size,
+            }
+        }
+    }
+
+def build_input_event_csv(file_id: str, window_size: int, step_size: int) -> dict:
+    return {
+        "type": "input_stream.set",
+        "event_data": {
+            "stream_type": "csv_file_reader",
+            "stream_config": {
+                "file_id": file_id,
+                "window_size": window_size,
+                "step_size": step_size,
+                "loop_recording": False,
+                "output_format": ""
+            }
+        }
+    }
+
+def build_output_event() -> dict:
+    return {
+        "type": "output_stream.set",
+        "event_data": {"stream_type": "server_side_events_writer", "stream_config": {}}
+    }
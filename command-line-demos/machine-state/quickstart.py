@@ -3,13 +3,28 @@ Machine State Quickstart
 Streams a CSV file to a Newton Lens with one-shot class examples and prints predictions.
 """
 
-import logging
 import os
-import signal
 import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))  # shared helpers
+
+import startup_profile  # first, so its clock starts at launch
+
+import logging
+import signal
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from archetypeai.api_client import ArchetypeAI
+from client_pool import get_client
+from machine_state_lens import (
+    DATA_COLUMNS, DEFAULT_API_ENDPOINT, DEFAULT_LENS_ID, DEFAULT_STEP_SIZE, DEFAULT_WINDOW_SIZE,
+    TIMESTAMP_COLUMN, build_input_event_csv, build_output_event, build_session_modify_event,
+)
+from sse_supervisor import SupervisedSSE
+from window_progress import WindowProgress, count_windows, read_budget_sec
+
+if TYPE_CHECKING:
+    from archetypeai.api_client import ArchetypeAI
 
 # ---------- Logging ----------
 logging.basicConfig(level=logging.ERROR, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -26,70 +41,39 @@ BANNER = r"""
 def colorize_text(text: str, red: int = 164, green: int = 186, blue: int = 250) -> str:
     return f"\033[38;2;{red};{green};{blue}m{text}\033[0m"
 
-# ---------- Defaults ----------
-DEFAULT_LENS_ID = "lns-1d519091822706e2-bc108andqxf8b4os"
-DEFAULT_API_ENDPOINT = "https://api.archetypeai.dev/v0.5"
-DEFAULT_MAX_RUN_SEC = 600.0
-DEFAULT_WINDOW_SIZE = 1024
-DEFAULT_STEP_SIZE = 1024  # no overlap
-
-# ---------- Event builders ----------
-def build_session_modify_event(input_n_shot: dict, window_size: int, step_size: int) -> dict:
-    return {
-        "type": "session.modify",
-        "event_data": {
-            "input_n_shot": input_n_shot,
-            "csv_configs": {
-                "timestamp_column": "timestamp",
-                "data_columns": ["a1", "a2", "a3", "a4"],
-                "window_size": window_size,
-                "step_size": step_size,
-            }
-        }
-    }
-
-def build_input_event_csv(file_id: str, window_size: int, step_size: int) -> dict:
-    return {
-        "type": "input_stream.set",
-        "event_data": {
-            "stream_type": "csv_file_reader",
-            "stream_config": {
-                "file_id": file_id,
-                "window_size": window_size,
-                "step_size": step_size,
-                "loop_recording": False,
-                "output_format": ""
-            }
-        }
-    }
-
-def build_output_event() -> dict:
-    return {
-        "type": "output_stream.set",
-        "event_data": {"stream_type": "server_side_events_writer", "stream_config": {}}
-    }
-
 # ---------- Interactive inputs ----------
 def get_user_inputs() -> dict:
     print(colorize_text(BANNER))
     print("\n=== Machine State Lens ===\n")
+    startup_profile.mark("first prompt")
 
     api_key = os.getenv("ATAI_API_KEY", "").strip() or input("Enter your API key: ").strip()
     if not api_key:
         print("Error: API key is required."); sys.exit(1)
 
+    # Validation needs NumPy/pyarrow; they have been loading in the background since launch
+    from csv_validation import validate_csv
+    from focus_registry import FocusRegistry
+
     # Data CSV
     while True:
         data_file_path = input("Enter path to CSV to analyze: ").strip().strip("'\"")
-        if os.path.exists(data_file_path) and data_file_path.lower().endswith(".csv"):
-            break
-        print("Error: file not found or not a .csv — try again.")
+        if not (os.path.exists(data_file_path) and data_file_path.lower().endswith(".csv")):
+            print("Error: file not found or not a .csv — try again."); continue
+        try:
+            data_stats = validate_csv(data_file_path, TIMESTAMP_COLUMN, DATA_COLUMNS)
+        except ValueError as e:
+            print(f"Error: invalid data file — {e}"); continue
+        print(f" Validated: {data_stats['rows']} rows @ {data_stats['sample_rate_hz']:.1f} Hz "
+              f"({data_stats['bytes'] / 1e6:.1f} MB at {data_stats['mb_per_sec']:.0f} MB/s)")
+        break
 
     # Focus CSVs 
     print("\n--- Add Focus Files ---")
     print("Provide CSV example(s) for each class (e.g., healthy.csv -> class 'healthy').")
     print("Type 'done' when finished.\n")
 
+    registry = FocusRegistry(TIMESTAMP_COLUMN, DATA_COLUMNS)
     focus_files = {}
     while True:
         p = input("Focus CSV path (or 'done'): ").strip().strip("'\"")
@@ -99,15 +83,27 @@ def get_user_inputs() -> dict:
             break
         if not (os.path.exists(p) and p.lower().endswith(".csv")):
             print("Error: file not found or not a .csv — try again."); continue
+        try:
+            stats, cached = registry.validate(p)
+        except ValueError as e:
+            print(f"Error: invalid focus file — {e}"); continue
         cls = Path(p).stem.lower()
         focus_files[cls] = p
-        print(f" Added: class '{cls}' from {Path(p).name}")
+        source = "cached" if cached else f"validated at {stats['mb_per_sec']:.0f} MB/s"
+        print(f" Added: class '{cls}' from {Path(p).name} "
+              f"({stats['rows']} rows @ {stats['sample_rate_hz']:.1f} Hz, {source})")
 
     # Window/step (minimal prompts)
-    ws = input(f"\nWindow size [default {DEFAULT_WINDOW_SIZE}]: ").strip()
-    ss = input(f"Step size   [default {DEFAULT_STEP_SIZE}]: ").strip()
-    window_size = int(ws) if ws.isdigit() else DEFAULT_WINDOW_SIZE
-    step_size = int(ss) if ss.isdigit() else DEFAULT_STEP_SIZE
+    print()
+    while True:
+        ws = input(f"Window size [default {DEFAULT_WINDOW_SIZE}]: ").strip()
+        ss = input(f"Step size   [default {DEFAULT_STEP_SIZE}]: ").strip()
+        window_size = int(ws) if ws.isdigit() else DEFAULT_WINDOW_SIZE
+        step_size = int(ss) if ss.isdigit() else DEFAULT_STEP_SIZE
+        expected_windows = count_windows(data_stats["rows"], window_size, step_size)
+        if expected_windows:
+            break
+        print(f"Error: {data_stats['rows']} rows yield no complete window of {window_size} — try again.")
 
     return {
         "api_key": api_key,
@@ -115,13 +111,15 @@ def get_user_inputs() -> dict:
         "focus_files": focus_files,
         "window_size": window_size,
         "step_size": step_size,
+        "data_rows": data_stats["rows"],
+        "expected_windows": expected_windows,
         "lens_id": DEFAULT_LENS_ID,
         "api_endpoint": DEFAULT_API_ENDPOINT,
-        "max_run_time_sec": DEFAULT_MAX_RUN_SEC,
+        "max_run_time_sec": read_budget_sec(expected_windows),
     }
 
 # ---------- Session  ----------
-def session_fn(session_id: str, session_endpoint: str, client: ArchetypeAI, args: dict) -> None:
+def session_fn(session_id: str, session_endpoint: str, client: "ArchetypeAI", args: dict) -> None:
     print(f"Session created: {session_id}")
 
     # Upload focus CSVs -> input_n_shot map
@@ -139,40 +137,50 @@ def session_fn(session_id: str, session_endpoint: str, client: ArchetypeAI, args
     client.lens.sessions.process_event(session_id, build_input_event_csv(data_file_id, args["window_size"], args["step_size"]))
     client.lens.sessions.process_event(session_id, build_output_event())
 
-    # SSE reader (blocking, same style as your Activity Monitor)
-    sse_reader = client.lens.sessions.create_sse_consumer(session_id, max_read_time_sec=args["max_run_time_sec"])
-
     print("\nStreaming… Press Ctrl+C to stop.\n")
+    progress = WindowProgress(args["expected_windows"])
     stop = {"flag": False}
     def _sigint(_s, _f): stop["flag"] = True
     signal.signal(signal.SIGINT, _sigint)
 
+    # Polled without blocking, so a silent stream still ends at the adaptive stall deadline
+    sse_reader = SupervisedSSE(client, session_id, max_read_time_sec=args["max_run_time_sec"],
+                               stop=lambda: stop["flag"] or progress.finished())
     try:
-        for event in sse_reader.read(block=True):
-            if stop["flag"]:
-                break
-            if isinstance(event, dict) and event.get("type") == "inference.result":
+        for event in sse_reader.events():
+            if event.get("type") == "inference.result":
                 ed = event.get("event_data", {}) or {}
                 result = ed.get("response")
                 meta = ed.get("query_metadata") or {}
                 ts = meta.get("query_timestamp", "N/A")
                 if result is not None:
-                    print(f"[{ts}] → Predicted class: {result}")
+                    progress.update()
+                    print(f"[{ts}] → Predicted class: {result}  ({progress.status()})")
+            if progress.done:
+                break
+        if not progress.done and progress.stalled():
+            print(f"No results for a while — stopping at window {progress.count}/{progress.expected}.")
     finally:
         sse_reader.close()
         print("Stopped.")
 
 # ---------- Main ----------
 def main():
+    # Heavy imports (client, NumPy/pyarrow validation) load in the background behind the prompts
+    startup_profile.preload("csv_validation", "archetypeai.api_client")
     args = get_user_inputs()
 
     # Client
-    client = ArchetypeAI(args["api_key"], api_endpoint=args["api_endpoint"])
+    client = get_client(args["api_key"], args["api_endpoint"])
+    startup_profile.mark("client loaded")
+    startup_profile.report()
 
     print("\n--- Configuration Summary ---")
     print(f"Lens ID:      {args['lens_id']}")
     print(f"API Endpoint: {args['api_endpoint']}")
     print(f"Data file:    {args['data_file_path']}")
+    print(f"Windows:      {args['expected_windows']} "
+          f"({args['data_rows']} rows, window {args['window_size']}, step {args['step_size']})")
     print(f"Classes:      {len(args['focus_files'])}")
     for cls, p in args["focus_files"].items():
         print(f"  - {cls}: {p}")
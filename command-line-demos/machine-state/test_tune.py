@@ -0,0 +1,45 @@
+"""
+Tests for the calibration sweep (tune.py), run against its local Lens stand-in.
+
+    python -m pytest test_tune.py
+"""
+
+import os
+
+import pytest
+from archetypeai.api_client import ArchetypeAI
+
+import tune
+
+SAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample-files")
+DATA = os.path.join(SAMPLES, "data.csv")
+FOCUS = {"healthy": os.path.join(SAMPLES, "focus", "healthy.csv"),
+         "broken": os.path.join(SAMPLES, "focus", "broken.csv")}
+GRID = [(256, 128), (256, 256), (512, 512)]
+
+
+@pytest.fixture(scope="module")
+def results():
+    server, url = tune.start_stand_in(ms_per_window=20)
+    try:
+        client = ArchetypeAI("stand-in", api_endpoint=url)
+        rows = tune.validate_csv(DATA, tune.TIMESTAMP_COLUMN, tune.DATA_COLUMNS)["rows"]
+        yield tune.run_sweep(client, tune.DEFAULT_LENS_ID, DATA, rows, FOCUS, GRID,
+                             windows_per_trial=6, parallel=len(GRID), timeout_sec=30)
+    finally:
+        server.shutdown()
+
+
+def test_every_trial_reads_its_windows_until_the_stream_ends(results):
+    assert [(r["window_size"], r["step_size"]) for r in results] == GRID
+    for r in results:
+        assert r["complete"] and r["windows"] == r["expected_windows"] == 6
+        assert set(r["labels"]) <= set(FOCUS)
+
+def test_recommend_picks_the_smallest_step_meeting_the_target(results):
+    best = tune.recommend(results, target_wps=5)
+    assert (best["window_size"], best["step_size"]) == (256, 128)
+
+def test_recommend_falls_back_to_the_fastest_config(results):
+    best = tune.recommend(results, target_latency_sec=0.001)
+    assert best is max(results, key=lambda r: r["windows_per_sec"])
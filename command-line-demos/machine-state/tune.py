@@ -0,0 +1,341 @@
+"""
+Machine State window/step tuning
+Runs short calibration sessions on a sample of the data over a grid of
+window/step sizes, measures per-window latency, throughput and prediction
+stability, and recommends the configuration that meets a latency or
+windows/sec target.
+
+Usage:
+    python tune.py sample-files/data.csv sample-files/focus/healthy.csv sample-files/focus/broken.csv \\
+        --windows 256,512,1024,2048 --step-ratios 0.5,1 --target-wps 2
+
+Pass --stand-in to run the sweep offline against a local Lens stand-in that
+answers every window after --stand-in-ms-per-window.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from archetypeai.api_client import ArchetypeAI
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))  # shared helpers
+
+from csv_validation import validate_csv
+from machine_state_lens import (
+    DATA_COLUMNS, DEFAULT_API_ENDPOINT, DEFAULT_LENS_ID, TIMESTAMP_COLUMN,
+    build_input_event_csv, build_output_event, build_session_modify_event,
+)
+from window_progress import count_windows
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# ---------- Defaults ----------
+DEFAULT_WINDOWS = "256,512,1024,2048"
+DEFAULT_STEP_RATIOS = "0.5,1"
+DEFAULT_WINDOWS_PER_TRIAL = 8
+DEFAULT_PARALLEL = 4
+DEFAULT_TRIAL_TIMEOUT_SEC = 180.0
+DEFAULT_REPORT_PATH = "tune_report.json"
+DEFAULT_STAND_IN_MS_PER_WINDOW = 50.0
+
+
+def write_sample_csv(data_file_path: str, rows: int) -> str:
+    """Copy the header and the first `rows` data rows into a temp CSV."""
+    f = tempfile.NamedTemporaryFile(mode="w", suffix=".csv", delete=False, newline="")
+    with open(data_file_path, "r", newline="") as src, f as dst:
+        dst.write(src.readline())
+        for _, line in zip(range(rows), src):
+            dst.write(line)
+    return f.name
+
+
+def predicted_label(result) -> str:
+    if isinstance(result, list) and result:
+        return str(result[0])
+    return str(result)
+
+
+# ---------- Calibration trial ----------
+def trial_session_fn(session_id: str, session_endpoint: str, client: ArchetypeAI, args: dict) -> dict:
+    """Run one window/step configuration and return its measurements."""
+    window_size, step_size = args["window_size"], args["step_size"]
+    data_file_id = client.files.local.upload(args["sample_path"])["file_id"]
+
+    client.lens.sessions.process_event(session_id, build_session_modify_event(args["input_n_shot"], window_size, step_size))
+    client.lens.sessions.process_event(session_id, build_input_event_csv(data_file_id, window_size, step_size))
+    client.lens.sessions.process_event(session_id, build_output_event())
+    stream_start = time.monotonic()
+
+    sse_reader = client.lens.sessions.create_sse_consumer(session_id, max_read_time_sec=args["timeout_sec"])
+    arrivals, labels = [], []
+    try:
+        for event in sse_reader.read(block=True):
+            event_type = event.get("type") if isinstance(event, dict) else None
+            if event_type == "sse.stream.end":
+                break
+            if event_type == "inference.result":
+                result = event.get("event_data", {}).get("response")
+                if result is not None:
+                    arrivals.append(time.monotonic())
+                    labels.append(predicted_label(result))
+            if len(arrivals) >= args["expected_windows"] or time.monotonic() - stream_start > args["timeout_sec"]:
+                break
+    finally:
+        sse_reader.close()
+
+    intervals = [b - a for a, b in zip(arrivals, arrivals[1:])]
+    span = arrivals[-1] - arrivals[0] if len(arrivals) > 1 else 0.0
+    return {
+        "window_size": window_size,
+        "step_size": step_size,
+        "windows": len(arrivals),
+        "expected_windows": args["expected_windows"],
+        "complete": len(arrivals) >= args["expected_windows"],
+        "first_result_sec": arrivals[0] - stream_start if arrivals else None,
+        "latency_per_window_sec": statistics.mean(intervals) if intervals else None,
+        "windows_per_sec": (len(arrivals) - 1) / span if span > 0 else 0.0,
+        "end_to_end_sec": time.monotonic() - args["trial_start"],
+        "stability": (sum(a == b for a, b in zip(labels, labels[1:])) / (len(labels) - 1)) if len(labels) > 1 else None,
+        "labels": labels,
+    }
+
+
+def run_trial(client: ArchetypeAI, lens_id: str, input_n_shot: dict, data_file_path: str, data_rows: int,
+              window_size: int, step_size: int, windows_per_trial: int, timeout_sec: float) -> dict:
+    sample_rows = min(data_rows, window_size + (windows_per_trial - 1) * step_size)
+    expected_windows = count_windows(sample_rows, window_size, step_size)
+    if expected_windows < 2:  # no interval to time, and a session would only run into the timeout
+        return {"window_size": window_size, "step_size": step_size, "windows": 0, "skipped": True,
+                "error": f"{data_rows} data rows fill fewer than 2 windows"}
+    sample_path = write_sample_csv(data_file_path, sample_rows)
+    args = {
+        "window_size": window_size,
+        "step_size": step_size,
+        "sample_path": sample_path,
+        "input_n_shot": input_n_shot,
+        "expected_windows": expected_windows,
+        "timeout_sec": timeout_sec,
+        "trial_start": time.monotonic(),
+    }
+    try:
+        return client.lens.create_and_run_session(lens_id, trial_session_fn, auto_destroy=True, client=client, args=args)
+    except Exception as e:
+        logging.error(f"Trial window={window_size} step={step_size} failed: {e}")
+        return {"window_size": window_size, "step_size": step_size, "windows": 0, "error": str(e)}
+    finally:
+        os.unlink(sample_path)
+
+
+def run_sweep(client: ArchetypeAI, lens_id: str, data_file_path: str, data_rows: int, focus_files: dict,
+              grid: list[tuple[int, int]], windows_per_trial: int = DEFAULT_WINDOWS_PER_TRIAL,
+              parallel: int = DEFAULT_PARALLEL, timeout_sec: float = DEFAULT_TRIAL_TIMEOUT_SEC) -> list[dict]:
+    """Upload the focus files once, then run every (window, step) trial in parallel."""
+    input_n_shot = {cls: client.files.local.upload(p)["file_id"] for cls, p in focus_files.items()}
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        futures = [
+            pool.submit(run_trial, client, lens_id, input_n_shot, data_file_path, data_rows, w, s,
+                        windows_per_trial, timeout_sec)
+            for w, s in grid
+        ]
+        return [f.result() for f in futures]
+
+
+def recommend(results: list[dict], target_latency_sec: float | None = None, target_wps: float | None = None) -> dict | None:
+    """Pick the finest-resolution (smallest step, then window) config meeting the targets.
+
+    Falls back to the highest-throughput config when nothing meets them. Trials that
+    timed out before their last window are not considered.
+    """
+    ok = [r for r in results if r.get("complete") and r["windows"] > 1]
+    meets = [
+        r for r in ok
+        if (target_latency_sec is None or r["latency_per_window_sec"] <= target_latency_sec)
+        and (target_wps is None or r["windows_per_sec"] >= target_wps)
+    ]
+    if meets:
+        return min(meets, key=lambda r: (r["step_size"], r["window_size"], -(r["stability"] or 0.0)))
+    return max(ok, key=lambda r: r["windows_per_sec"], default=None)
+
+
+def build_grid(windows: str, step_ratios: str) -> list[tuple[int, int]]:
+    grid = []
+    for w in (int(x) for x in windows.split(",")):
+        for ratio in (float(x) for x in step_ratios.split(",")):
+            step = max(1, int(w * ratio))
+            if (w, step) not in grid:
+                grid.append((w, step))
+    return grid
+
+
+def _fmt(value: float | None, width: int) -> str:
+    return f"{value:{width}.2f}" if value is not None else "-".rjust(width)
+
+
+def print_report(results: list[dict], best: dict | None) -> None:
+    print(f"\n{'window':>7} {'step':>6} {'windows':>8} {'first s':>8} {'s/win':>7} {'win/s':>7} {'stable':>7}")
+    for r in sorted(results, key=lambda r: (r["window_size"], r["step_size"])):
+        if r.get("error") or not r["windows"]:
+            status = "skipped" if r.get("skipped") else "failed"
+            print(f"{r['window_size']:>7} {r['step_size']:>6} {status:>8}  {r.get('error', 'no results')}")
+            continue
+        windows = f"{r['windows']}/{r['expected_windows']}"
+        print(f"{r['window_size']:>7} {r['step_size']:>6} {windows:>8} {_fmt(r['first_result_sec'], 8)} "
+              f"{_fmt(r['latency_per_window_sec'], 7)} {r['windows_per_sec']:>7.2f} {_fmt(r['stability'], 7)}"
+              + ("" if r["complete"] else "  timed out"))
+    if best:
+        print(f"\nRecommended: window_size={best['window_size']} step_size={best['step_size']}")
+    else:
+        print("\nNo configuration produced enough results to recommend.")
+
+
+# ---------- Local Lens stand-in ----------
+class _StandInLens(BaseHTTPRequestHandler):
+    """Just enough of the Files and Lens session APIs for a sweep: uploads are counted in
+    rows, and a session's SSE stream emits one result per complete window of its input
+    file, ms_per_window apart, then ends."""
+
+    ms_per_window = DEFAULT_STAND_IN_MS_PER_WINDOW
+    files: dict = {}
+    sessions: dict = {}
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.endswith("/files"):
+            content = body.split(b"\r\n\r\n", 1)[1].rsplit(b"\r\n--", 1)[0]  # the single multipart part
+            file_id = f"file-{uuid.uuid4().hex[:12]}"
+            with self.lock:
+                self.files[file_id] = max(0, len(content.strip().splitlines()) - 1)
+            self._reply({"file_id": file_id})
+        elif self.path.endswith("/sessions/create"):
+            session_id = f"lsn-{uuid.uuid4().hex[:12]}"
+            with self.lock:
+                self.sessions[session_id] = {}
+            self._reply({"session_id": session_id, "session_endpoint": "http://stand-in"})
+        elif self.path.endswith("/sessions/events/process"):
+            request = json.loads(body)
+            event_data = request["event"].get("event_data", {})
+            with self.lock:
+                session = self.sessions.setdefault(request["session_id"], {})
+                if request["event"]["type"] == "session.modify":
+                    session["classes"] = list(event_data.get("input_n_shot", {})) or ["unknown"]
+                elif request["event"]["type"] == "input_stream.set":
+                    session.update(event_data["stream_config"])
+            self._reply({"status": "ok"})
+        elif self.path.endswith("/sessions/destroy"):
+            with self.lock:
+                self.sessions.pop(json.loads(body)["session_id"], None)
+            self._reply({"session_status": "SESSION_STATUS_DESTROYED"})
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        match = re.search(r"/lens/sessions/consumer/([^/?]+)", self.path)
+        if not match:
+            self.send_error(404); return
+        with self.lock:
+            session = dict(self.sessions.get(match.group(1), {}))
+            rows = self.files.get(session.get("file_id"), 0)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        classes = session.get("classes", ["unknown"])
+        windows = count_windows(rows, session.get("window_size", 0), session.get("step_size", 0))
+        for i in range(windows):
+            time.sleep(self.ms_per_window / 1000)
+            label = classes[(i // 3) % len(classes)]  # runs of three, so stability is not trivially 1.0
+            self._send_event({"type": "inference.result", "event_data": {"response": [label, {label: 90.0}]}})
+        self._send_event({"type": "sse.stream.end", "event_data": {}})
+
+    def _send_event(self, event: dict) -> None:
+        self.wfile.write(f"event: message\ndata: {json.dumps(event)}\n\n".encode())
+        self.wfile.flush()
+
+
+def start_stand_in(ms_per_window: float) -> tuple[ThreadingHTTPServer, str]:
+    _StandInLens.ms_per_window = ms_per_window
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInLens)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+# ---------- Main ----------
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate window/step sizes for the Machine State lens.")
+    parser.add_argument("data_file_path")
+    parser.add_argument("focus_files", nargs="+", help="focus CSVs; the file name becomes the class name")
+    parser.add_argument("--windows", default=DEFAULT_WINDOWS)
+    parser.add_argument("--step-ratios", default=DEFAULT_STEP_RATIOS, help="step sizes as fractions of the window")
+    parser.add_argument("--windows-per-trial", type=int, default=DEFAULT_WINDOWS_PER_TRIAL)
+    parser.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TRIAL_TIMEOUT_SEC, help="per-trial timeout (sec)")
+    parser.add_argument("--target-latency", type=float, help="max seconds per window")
+    parser.add_argument("--target-wps", type=float, help="min windows per second")
+    parser.add_argument("--lens-id", default=DEFAULT_LENS_ID)
+    parser.add_argument("--api-endpoint", default=DEFAULT_API_ENDPOINT)
+    parser.add_argument("--report", default=DEFAULT_REPORT_PATH)
+    parser.add_argument("--stand-in", action="store_true", help="run against a local Lens stand-in instead of the API")
+    parser.add_argument("--stand-in-ms-per-window", type=float, default=DEFAULT_STAND_IN_MS_PER_WINDOW)
+    opts = parser.parse_args()
+
+    if opts.stand_in:
+        _, opts.api_endpoint = start_stand_in(opts.stand_in_ms_per_window)
+        api_key = "stand-in"
+        print(f"Lens stand-in at {opts.api_endpoint}, {opts.stand_in_ms_per_window:.0f} ms per window")
+    else:
+        api_key = os.getenv("ATAI_API_KEY", "").strip() or input("Enter your API key: ").strip()
+    if not api_key:
+        print("Error: API key is required."); return
+
+    try:
+        data_rows = validate_csv(opts.data_file_path, TIMESTAMP_COLUMN, DATA_COLUMNS)["rows"]
+        for p in opts.focus_files:
+            validate_csv(p, TIMESTAMP_COLUMN, DATA_COLUMNS)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}"); return
+    focus_files = {Path(p).stem.lower(): p for p in opts.focus_files}
+    grid = build_grid(opts.windows, opts.step_ratios)
+
+    client = ArchetypeAI(api_key, api_endpoint=opts.api_endpoint)
+    print(f"Running {len(grid)} calibration sessions ({opts.parallel} in parallel)…")
+    start = time.monotonic()
+    results = run_sweep(client, opts.lens_id, opts.data_file_path, data_rows, focus_files, grid,
+                        opts.windows_per_trial, opts.parallel, opts.timeout)
+    best = recommend(results, opts.target_latency, opts.target_wps)
+    print_report(results, best)
+
+    with open(opts.report, "w") as f:
+        json.dump({
+            "data_file": opts.data_file_path,
+            "targets": {"latency_per_window_sec": opts.target_latency, "windows_per_sec": opts.target_wps},
+            "sweep_sec": time.monotonic() - start,
+            "results": results,
+            "recommended": best and {"window_size": best["window_size"], "step_size": best["step_size"]},
+        }, f, indent=2)
+    print(f"Report written to {opts.report}")
+
+if __name__ == "__main__":
+    main()
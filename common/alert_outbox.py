@@ -0,0 +1,212 @@
+"""
+Durable alert outbox for the Telegram Smart Monitor.
+Every alert is committed to a local SQLite database (WAL mode) with one
+delivery row per sink before any sink sees it, and a delivery is only marked
+done after the sink reports success. Pending deliveries are replayed on
+restart and re-queued periodically, so alerts survive crashes and outages.
+
+Writes go through one writer thread that group-commits: everything queued
+while the previous transaction was syncing is written in the next one, so a
+single fsync covers many alerts. `put()` returns before that commit, so an
+alert queued just before a crash can still be lost. If a commit fails, its
+alerts are dispatched anyway without a durable row (counted in the report)
+rather than dropped.
+
+Each alert carries a stable `id`; sinks pass `<id>:<sink>` on as an idempotency
+key (webhook header, e-mail Message-ID) so consumers can drop replays.
+
+Usage (throughput benchmark):
+    python alert_outbox.py --bench 20000
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+# ---------- Defaults ----------
+OUTBOX_PATH = "alert_outbox.db"
+BATCH_MAX = 5000
+RETRY_SWEEP_SEC = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    alert_id TEXT NOT NULL REFERENCES alerts(id),
+    sink TEXT NOT NULL,
+    delivered REAL,
+    PRIMARY KEY (alert_id, sink)
+);
+CREATE INDEX IF NOT EXISTS deliveries_pending ON deliveries(alert_id) WHERE delivered IS NULL;
+"""
+
+
+class AlertOutbox:
+    """SQLite outbox; `dispatch(alert, sink_names)` is called once an alert is durable."""
+
+    def __init__(self, path: str = OUTBOX_PATH, dispatch=None, retry_sweep_sec: float = RETRY_SWEEP_SEC):
+        self.path = path
+        self.dispatch = dispatch
+        self.retry_sweep_sec = retry_sweep_sec
+        self.committed = 0
+        self.batches = 0
+        self.not_durable = 0
+        self._queue = queue.Queue()
+        self._in_flight = set()          # (alert_id, sink) handed to a sink and not yet confirmed
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")   # fsync on every (group) commit
+        self._db.executescript(_SCHEMA)
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name="outbox-writer", daemon=True)
+        self._writer.start()
+
+    # ----- producer side -----
+    def put(self, alert: dict, sinks: list[str]) -> None:
+        """Queue an alert for the writer thread; returns without waiting for the commit."""
+        self._queue.put(("alert", alert, list(sinks)))
+
+    def mark_delivered(self, alert_id: str, sink: str) -> None:
+        self._queue.put(("delivered", alert_id, sink))
+
+    def release(self, alert_id: str, sink: str) -> None:
+        """A sink gave up on a delivery; leave it pending for the next retry sweep."""
+        with self._lock:
+            self._in_flight.discard((alert_id, sink))
+
+    # ----- writer thread -----
+    def _write_loop(self) -> None:
+        next_sweep = time.monotonic() + self.retry_sweep_sec
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                items = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                items = []
+            while items and len(items) < BATCH_MAX:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if items:
+                self._commit(items)
+            if time.monotonic() >= next_sweep:
+                self.replay_pending()
+                next_sweep = time.monotonic() + self.retry_sweep_sec
+
+    def _commit(self, items: list[tuple]) -> None:
+        new_alerts, delivered = [], []
+        for kind, a, b in items:
+            (new_alerts if kind == "alert" else delivered).append((a, b))
+        now = time.time()
+        with self._db_lock:
+            durable = self._write(new_alerts, delivered, now)
+        if durable:
+            self.committed += len(new_alerts)
+            self.batches += 1
+        else:  # still deliver live; the lost delivery marks only cause replays after a restart
+            self.not_durable += len(new_alerts)
+        with self._lock:
+            if durable:
+                for alert_id, sink in delivered:
+                    self._in_flight.discard((alert_id, sink))
+            for alert, sinks in new_alerts:
+                self._in_flight.update((alert["id"], sink) for sink in sinks)
+        if self.dispatch:
+            for alert, sinks in new_alerts:
+                if sinks:
+                    self.dispatch(alert, sinks)
+
+    def _write(self, new_alerts: list, delivered: list, now: float) -> bool:
+        try:
+            self._db.execute("BEGIN")
+            self._db.executemany("INSERT OR IGNORE INTO alerts VALUES (?, ?, ?)",
+                                 [(alert["id"], alert["ts"], json.dumps(alert)) for alert, _ in new_alerts])
+            self._db.executemany("INSERT OR IGNORE INTO deliveries (alert_id, sink) VALUES (?, ?)",
+                                 [(alert["id"], sink) for alert, sinks in new_alerts for sink in sinks])
+            self._db.executemany("UPDATE deliveries SET delivered = ? WHERE alert_id = ? AND sink = ?",
+                                 [(now, alert_id, sink) for alert_id, sink in delivered])
+            self._db.execute("COMMIT")
+            return True
+        except sqlite3.Error as e:
+            self._db.execute("ROLLBACK")
+            logging.error(f"Alert outbox commit failed ({len(new_alerts) + len(delivered)} items): {e}")
+            return False
+
+    def pending(self) -> list[tuple[dict, list[str]]]:
+        """Durable alerts with at least one undelivered sink, oldest first."""
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT a.payload, group_concat(d.sink) FROM deliveries d JOIN alerts a ON a.id = d.alert_id "
+                "WHERE d.delivered IS NULL GROUP BY a.id ORDER BY a.created").fetchall()
+        return [(json.loads(payload), sinks.split(",")) for payload, sinks in rows]
+
+    def replay_pending(self) -> int:
+        """Hand pending deliveries that no sink is working on back to dispatch."""
+        replayed = 0
+        for alert, sinks in self.pending():
+            with self._lock:
+                sinks = [s for s in sinks if (alert["id"], s) not in self._in_flight]
+                self._in_flight.update((alert["id"], s) for s in sinks)
+            if sinks and self.dispatch:
+                self.dispatch(alert, sinks)
+                replayed += len(sinks)
+        return replayed
+
+    def close(self) -> None:
+        self._stop.set()
+        self._writer.join()
+        self._db.close()
+
+    def report(self) -> str:
+        n_pending = sum(len(s) for _, s in self.pending()) if not self._stop.is_set() else 0
+        text = f"outbox: {self.committed} alerts committed in {self.batches} batches, {n_pending} deliveries pending"
+        if self.not_durable:
+            text += f", {self.not_durable} sent without a durable row"
+        return text
+
+
+# ---------- Benchmark ----------
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the durable alert outbox.")
+    parser.add_argument("--bench", type=int, default=20000, help="alerts to write")
+    parser.add_argument("--sinks", type=int, default=2, help="delivery rows per alert")
+    opts = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="outbox-"), OUTBOX_PATH)
+    done = threading.Event()
+    delivered = [0]
+    box = None
+
+    def dispatch(alert, sinks):  # instant sink: confirm every delivery
+        for sink in sinks:
+            box.mark_delivered(alert["id"], sink)
+        delivered[0] += 1
+        if delivered[0] == opts.bench:
+            done.set()
+
+    box = AlertOutbox(path, dispatch)
+    sinks = [f"sink{i}" for i in range(opts.sinks)]
+    start = time.perf_counter()
+    for i in range(opts.bench):
+        box.put({"id": f"bench-{i}", "ts": time.time(), "text": f"Alert: test {i}"}, sinks)
+    done.wait()
+    durable = time.perf_counter() - start
+    box.close()
+    print(f"{opts.bench} alerts × {opts.sinks} sinks durable and dispatched in {durable:.2f}s "
+          f"({opts.bench / durable:,.0f} alerts/s, {box.batches} group commits)")
+    shutil.rmtree(os.path.dirname(path))
+
+if __name__ == "__main__":
+    main()
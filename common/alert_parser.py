@@ -0,0 +1,159 @@
+"""
+Alert response parser for the Telegram Smart Monitor.
+Splits a Lens response written to DEFAULT_INSTRUCTION's format
+(`<scan> … </scan> Search result: … Alert: …` / `No alerts: …`) into its
+sections in one pass over the text. A marker only counts at the start of the
+text, a line or a sentence and must end in a colon; casing and markdown drift
+such as `**Alert:**`, `No alert:` or `Search results:` is tolerated. An alert
+whose text is only "none" (`Alerts: none`) is read as no alert, and a <scan>
+block without its closing tag runs to the end of the response.
+
+Usage (benchmark against recorded responses, one JSON object or plain line each):
+    python alert_parser.py responses.jsonl
+    python alert_parser.py --synthetic 100000
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from dataclasses import dataclass
+
+_SCAN_OPEN_RE = re.compile(r"<\s*scan\s*>", re.IGNORECASE)
+_SCAN_CLOSE_RE = re.compile(r"<\s*/\s*scan\s*>", re.IGNORECASE)
+_MARKER = (r"[ \t*_#]*(?i:(?P<search>search[ \t]+results?)|(?P<no_alert>no[ \t]+alerts?)|(?P<alert>alerts?))"
+           r"[ \t*_]*:")
+# After a sentence end, line break or tag. Starting on that (case-sensitive) character lets
+# the regex engine skip straight to candidates instead of trying a marker at every position.
+_MARKER_RE = re.compile(r"[.!?>\n]" + _MARKER)
+_LEADING_MARKER_RE = re.compile(r"\s*" + _MARKER)  # at the start of the text or after </scan>
+_STRIP = " \t\r\n*_`\"'"
+_NONE_WORDS = {"", "none", "nothing", "n/a"}  # "Alerts: none." is a verdict of no alert
+
+
+@dataclass(slots=True)
+class AlertResponse:
+    is_alert: bool | None     # None when the response has neither an Alert nor a No alerts section
+    text: str = ""            # the alert / no-alert description
+    scan: str = ""
+    search_result: str = ""
+
+
+def parse_alert(response: str) -> AlertResponse:
+    """Parse one response. Markers inside the <scan> block are ignored; the first verdict wins."""
+    result = AlertResponse(None)
+    close_start, close_end = _find_tag(response, "</scan>", _SCAN_CLOSE_RE, 0, len(response))
+    open_start, open_end = _find_tag(response, "<scan>", _SCAN_OPEN_RE, 0,
+                                     len(response) if close_start < 0 else close_start)
+    if close_start >= 0:
+        result.scan = response[max(open_end, 0):close_start].strip(_STRIP)
+    elif open_start >= 0:  # truncated response: everything after <scan> is scan text
+        result.scan = response[open_end:].strip(_STRIP)
+        return result
+    section, start = None, max(close_end, 0)
+    leading = _LEADING_MARKER_RE.match(response, start)
+    if leading:
+        section, start = leading.lastgroup, leading.end()
+    for m in _MARKER_RE.finditer(response, start):
+        if section is not None:
+            _assign(result, section, response[start:m.start() + 1])  # keeps the sentence's full stop
+            if section != "search":
+                return result
+        section, start = m.lastgroup, m.end()
+    if section is not None:
+        _assign(result, section, response[start:])
+    return result
+
+
+def _find_tag(response: str, tag: str, pattern: re.Pattern, start: int, end: int) -> tuple[int, int]:
+    """(start, end) of the tag in response[start:end], or (-1, -1). Exact lower-case tags are
+    found with str.find; the regex (spacing, casing) only runs when that misses."""
+    at = response.find(tag, start, end)
+    if at >= 0:
+        return at, at + len(tag)
+    m = pattern.search(response, start, end)
+    return (m.start(), m.end()) if m else (-1, -1)
+
+
+def _assign(result: AlertResponse, section: str, text: str) -> None:
+    text = text.strip(_STRIP)
+    if section == "search":
+        result.search_result = text
+    else:
+        first_word = text.split(None, 1)[0].rstrip(".,;!") if text else ""
+        result.is_alert = section == "alert" and first_word.lower() not in _NONE_WORDS
+        result.text = text
+
+
+def legacy_is_alert(text: str) -> tuple[bool, str]:
+    """The substring check this parser replaces, kept for benchmarking."""
+    is_alert = "alert:" in text.lower()
+    return is_alert, text.split("Alert:", 1)[-1].strip() if is_alert else ""
+
+
+# ---------- Benchmark ----------
+_SCANS = ["a red car parked near a gate, a person in a blue jacket walking left",
+          "an empty loading bay, a forklift, stacked pallets, a closed door",
+          "two people talking, a dog, a white van with an open door, trees"]
+
+def synthetic_corpus(n: int, seed: int = 0) -> list[tuple[str, bool]]:
+    """Responses with format drift (casing, markdown, line breaks), alerts mentioned inside the
+    scan or mid-sentence, "Alerts: none" verdicts and responses truncated inside the scan."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        scan = rng.choice(_SCANS) + rng.choice(["", ", a sign reading alert: wet floor"])
+        if rng.random() < 0.05:
+            corpus.append((f"<scan> I see in this video: {scan}, a person near the gate. Alert: the", False))
+            continue
+        alert = rng.random() < 0.3
+        verdict = rng.choice(["Alert:", "**Alert:**", "ALERT:", "alert:"]) if alert else \
+            rng.choice(["No alerts:", "No alert:", "NO ALERTS:", "**No alerts:**", "Alerts: none."])
+        search = rng.choice(["Search result:", "Search Results:", "**Search result:**"])
+        analysis = rng.choice(["analysis of the scan.", "the forklift is high-alert - running."])
+        description = "" if verdict == "Alerts: none." else " person near the gate"
+        corpus.append((f"<scan> I see in this video: {scan} </scan>{rng.choice([' ', chr(10)])}{search} {analysis} "
+                       f"{verdict}{description}", alert))
+    return corpus
+
+def load_corpus(path: str) -> list[tuple[str, bool | None]]:
+    """Lines of {"response": ..., "is_alert": ...} JSON, or plain response text."""
+    corpus = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+                corpus.append((rec["response"], rec.get("is_alert")))
+            except (ValueError, KeyError, TypeError):
+                corpus.append((line, None))
+    return corpus
+
+def benchmark(corpus: list[tuple[str, bool | None]]) -> None:
+    texts = [t for t, _ in corpus]
+    size_mb = sum(len(t) for t in texts) / 1e6
+    for name, fn in (("parse_alert", lambda t: parse_alert(t).is_alert), ("legacy", lambda t: legacy_is_alert(t)[0])):
+        start = time.perf_counter()
+        predicted = [fn(t) for t in texts]
+        elapsed = time.perf_counter() - start
+        labelled = [(bool(p), y) for p, (_, y) in zip(predicted, corpus) if y is not None]
+        accuracy = f", accuracy {100 * sum(p == y for p, y in labelled) / len(labelled):.1f}%" if labelled else ""
+        print(f"{name:>11}: {len(texts) / elapsed:,.0f} responses/s, {1e6 * elapsed / len(texts):.1f} µs each "
+              f"({size_mb / elapsed:.0f} MB/s){accuracy}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the alert parser on a corpus of responses.")
+    parser.add_argument("corpus", nargs="?", help="JSONL or text file of recorded responses")
+    parser.add_argument("--synthetic", type=int, default=20000, help="generated responses when no corpus is given")
+    opts = parser.parse_args()
+
+    corpus = load_corpus(opts.corpus) if opts.corpus else synthetic_corpus(opts.synthetic)
+    print(f"{len(corpus)} responses")
+    benchmark(corpus)
+
+if __name__ == "__main__":
+    main()
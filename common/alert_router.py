@@ -0,0 +1,314 @@
+"""
+Alert routing for the Telegram Smart Monitor.
+Matches each alert against rules (camera, focus, severity) and fans it out to
+sinks: Telegram chats, webhooks, a local JSONL file, syslog and SMTP email.
+Every sink has its own queue and worker thread, token-bucket rate limit and
+retry policy, so a slow or failing sink never delays the others or the SSE loop.
+
+Routes are read from alert_routes.json when it exists, e.g.:
+    {
+      "sinks": {
+        "ops":     {"type": "telegram", "bot_token": "...", "chat_id": "..."},
+        "hook":    {"type": "webhook", "url": "http://localhost:8080/alerts", "rate_per_sec": 5},
+        "log":     {"type": "file", "path": "alerts.jsonl"},
+        "syslog":  {"type": "syslog", "address": "/dev/log"},
+        "mail":    {"type": "smtp", "host": "localhost", "port": 1025,
+                    "sender": "monitor@example.com", "to": ["oncall@example.com"]}
+      },
+      "outbox": "alert_outbox.db",
+      "rules": [
+        {"sinks": ["log"]},
+        {"sinks": ["ops", "hook"], "min_severity": "warning"},
+        {"sinks": ["mail"], "min_severity": "critical", "camera": "loading-bay", "focus": "smoke"}
+      ]
+    }
+Without the file, everything goes to the app's BOT_TOKEN / CHAT_ID Telegram chat.
+
+Alerts are committed to the durable outbox (alert_outbox.py) before any sink
+sees them and are replayed until every sink has confirmed delivery.
+"""
+
+import abc
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import smtplib
+import threading
+import time
+import uuid
+from collections import deque
+from email.message import EmailMessage
+
+import requests
+
+from alert_outbox import OUTBOX_PATH, AlertOutbox
+
+# ---------- Defaults ----------
+ALERT_ROUTES_PATH = "alert_routes.json"
+SEVERITIES = {"info": 0, "warning": 1, "critical": 2}
+QUEUE_SIZE = 1000
+RATE_PER_SEC = 1.0          # Telegram allows ~1 message/sec per chat
+BURST = 5
+RETRIES = 3
+RETRY_BACKOFF_SEC = 1.0
+LATENCY_HISTORY = 1000
+
+
+def make_alert(text: str, severity: str = "warning", camera: str = "", focus: str = "",
+               evidence: list[str] | None = None, alert_id: str | None = None) -> dict:
+    return {"id": alert_id or uuid.uuid4().hex, "text": text, "severity": severity, "camera": camera or "",
+            "focus": focus or "", "evidence": evidence or [], "ts": time.time()}
+
+
+class TokenBucket:
+    def __init__(self, rate_per_sec: float, burst: int):
+        self.rate = rate_per_sec
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self, stop: threading.Event) -> None:
+        """Block until a token is available (or stop is set)."""
+        while not stop.is_set():
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            stop.wait((1 - self.tokens) / self.rate)
+
+
+# ---------- Sinks ----------
+class Sink(abc.ABC):
+    """Base sink: a bounded queue drained by one worker thread."""
+
+    def __init__(self, name: str, rate_per_sec: float = RATE_PER_SEC, burst: int = BURST,
+                 retries: int = RETRIES, retry_backoff_sec: float = RETRY_BACKOFF_SEC, queue_size: int = QUEUE_SIZE):
+        self.name = name
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.bucket = TokenBucket(rate_per_sec, burst)
+        self.retries = retries
+        self.retry_backoff_sec = retry_backoff_sec
+        self.delivered = 0
+        self.failed = 0
+        self.dropped = 0
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+        self.on_delivered = None   # callback(alert_id, sink_name)
+        self.on_failed = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"sink-{name}", daemon=True)
+        self._thread.start()
+
+    @abc.abstractmethod
+    def send(self, alert: dict) -> None:
+        """Deliver one alert; raise on failure so the worker retries."""
+
+    def submit(self, alert: dict) -> None:
+        try:
+            self.queue.put_nowait((time.monotonic(), alert))
+        except queue.Full:
+            self.dropped += 1
+            logging.warning(f"Alert sink '{self.name}' queue full; alert dropped")
+            if self.on_failed:  # the outbox keeps it pending for the next retry sweep
+                self.on_failed(alert["id"], self.name)
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self.queue.empty()):
+            try:
+                queued_at, alert = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.bucket.take(self._stop)
+            for attempt in range(1, self.retries + 1):
+                try:
+                    self.send(alert)
+                    self.delivered += 1
+                    self.latencies.append(time.monotonic() - queued_at)
+                    if self.on_delivered:
+                        self.on_delivered(alert["id"], self.name)
+                    break
+                except Exception as e:
+                    logging.warning(f"Alert sink '{self.name}' attempt {attempt}/{self.retries} failed: {e}")
+                    if attempt < self.retries:
+                        time.sleep(self.retry_backoff_sec * 2 ** (attempt - 1))
+            else:
+                self.failed += 1
+                if self.on_failed:
+                    self.on_failed(alert["id"], self.name)
+
+    def close(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def report(self) -> str:
+        text = f"{self.name}: {self.delivered} delivered, {self.failed} failed, {self.dropped} dropped"
+        if self.latencies:
+            lat = sorted(self.latencies)
+            p50, p95 = lat[len(lat) // 2], lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+            text += f", latency p50 {1000 * p50:.0f} ms / p95 {1000 * p95:.0f} ms"
+        return text
+
+
+class TelegramSink(Sink):
+    def __init__(self, name: str, bot_token: str, chat_id: str, **kw):
+        if not bot_token or bot_token.startswith("YOUR_"):
+            raise ValueError(f"Telegram sink '{name}': bot_token is not set")
+        self.bot_token, self.chat_id = bot_token, chat_id
+        super().__init__(name, **kw)
+
+    def send(self, alert: dict) -> None:
+        api = f"https://api.telegram.org/bot{self.bot_token}"
+        if not alert["evidence"]:
+            r = requests.post(f"{api}/sendMessage", data={"chat_id": self.chat_id, "text": alert["text"]}, timeout=10)
+            r.raise_for_status()
+            return
+        files = {f"p{i}": open(p, "rb") for i, p in enumerate(alert["evidence"][:10])}
+        try:
+            if len(files) == 1:
+                r = requests.post(f"{api}/sendPhoto", data={"chat_id": self.chat_id, "caption": alert["text"]},
+                                  files={"photo": files["p0"]}, timeout=30)
+            else:
+                media = [{"type": "photo", "media": f"attach://{name}"} for name in files]
+                media[0]["caption"] = alert["text"]
+                r = requests.post(f"{api}/sendMediaGroup", data={"chat_id": self.chat_id, "media": json.dumps(media)},
+                                  files=files, timeout=30)
+            r.raise_for_status()
+        finally:
+            for f in files.values():
+                f.close()
+
+
+class WebhookSink(Sink):
+    def __init__(self, name: str, url: str, headers: dict | None = None, **kw):
+        self.url, self.headers = url, headers or {}
+        super().__init__(name, **kw)
+
+    def send(self, alert: dict) -> None:
+        headers = {**self.headers, "Idempotency-Key": f"{alert['id']}:{self.name}"}
+        requests.post(self.url, json=alert, headers=headers, timeout=10).raise_for_status()
+
+
+class FileSink(Sink):
+    def __init__(self, name: str, path: str, **kw):
+        self.path = path
+        super().__init__(name, **kw)
+
+    def send(self, alert: dict) -> None:
+        with open(self.path, "a") as f:
+            f.write(json.dumps(alert) + "\n")
+
+
+class SyslogSink(Sink):
+    def __init__(self, name: str, address: str | list = "/dev/log", **kw):
+        self.logger = logging.getLogger(f"alerts.{name}")
+        self.logger.propagate = False
+        self.logger.addHandler(logging.handlers.SysLogHandler(address=tuple(address) if isinstance(address, list) else address))
+        super().__init__(name, **kw)
+
+    def send(self, alert: dict) -> None:
+        level = logging.CRITICAL if alert["severity"] == "critical" else logging.WARNING
+        self.logger.log(level, f"smart-monitor [{alert['camera']}] {alert['focus']}: {alert['text']}")
+
+
+class SmtpSink(Sink):
+    def __init__(self, name: str, host: str, port: int, sender: str, to: list[str],
+                 username: str | None = None, password: str | None = None, starttls: bool = False, **kw):
+        self.host, self.port, self.sender, self.to = host, port, sender, to
+        self.username, self.password, self.starttls = username, password, starttls
+        super().__init__(name, **kw)
+
+    def send(self, alert: dict) -> None:
+        msg = EmailMessage()
+        msg["Subject"] = f"[{alert['severity']}] {alert['text'][:80]}"
+        msg["From"] = self.sender
+        msg["To"] = ", ".join(self.to)
+        msg["Message-ID"] = f"<{alert['id']}.{self.name}@smart-monitor>"  # lets mail clients drop replays
+        msg.set_content(json.dumps(alert, indent=2))
+        for path in alert["evidence"]:
+            with open(path, "rb") as f:
+                msg.add_attachment(f.read(), maintype="image", subtype="jpeg", filename=os.path.basename(path))
+        with smtplib.SMTP(self.host, self.port, timeout=15) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            smtp.send_message(msg)
+
+
+SINK_TYPES = {"telegram": TelegramSink, "webhook": WebhookSink, "file": FileSink, "syslog": SyslogSink, "smtp": SmtpSink}
+
+
+# ---------- Router ----------
+def rule_matches(rule: dict, alert: dict) -> bool:
+    if SEVERITIES.get(alert["severity"], 1) < SEVERITIES.get(rule.get("min_severity", "info"), 0):
+        return False
+    if rule.get("camera") and rule["camera"] not in alert["camera"]:
+        return False
+    if rule.get("focus") and rule["focus"].lower() not in alert["focus"].lower():
+        return False
+    return True
+
+
+class AlertRouter:
+    def __init__(self, sinks: dict[str, Sink], rules: list[dict], outbox_path: str | None = OUTBOX_PATH):
+        self.sinks = sinks
+        self.rules = rules
+        self.outbox = AlertOutbox(outbox_path, self._dispatch) if outbox_path else None
+        if self.outbox:
+            for sink in sinks.values():
+                sink.on_delivered = self.outbox.mark_delivered
+                sink.on_failed = self.outbox.release
+            replayed = self.outbox.replay_pending()
+            if replayed:
+                logging.info(f"Replaying {replayed} undelivered alert deliveries from {outbox_path}")
+
+    def _dispatch(self, alert: dict, sink_names: list[str]) -> None:
+        for name in sink_names:
+            if name in self.sinks:
+                self.sinks[name].submit(alert)
+
+    def route(self, alert: dict) -> None:
+        """Record the alert and queue it on every matching sink (each sink at most once); never blocks."""
+        targets = sorted({name for rule in self.rules if rule_matches(rule, alert) for name in rule["sinks"]})
+        if self.outbox:
+            self.outbox.put(alert, targets)  # dispatched once committed
+        else:
+            self._dispatch(alert, targets)
+
+    def report(self) -> str:
+        lines = [sink.report() for sink in self.sinks.values()]
+        if self.outbox:
+            lines.append(self.outbox.report())
+        return "\n".join(lines)
+
+    def close(self) -> None:
+        for sink in self.sinks.values():
+            sink.close()
+        if self.outbox:
+            self.outbox.close()
+
+
+def load_router(path: str = ALERT_ROUTES_PATH, bot_token: str = "", chat_id: str = "") -> AlertRouter:
+    """Build the router from `path`, or a single Telegram route when the file does not exist."""
+    if not os.path.exists(path):
+        if not bot_token or bot_token.startswith("YOUR_"):
+            logging.warning(f"⚠️ Telegram BOT token not set and no {path}; alerts are not sent.")
+            return AlertRouter({}, [], outbox_path=None)
+        return AlertRouter({"telegram": TelegramSink("telegram", bot_token, chat_id)}, [{"sinks": ["telegram"]}])
+    with open(path) as f:
+        config = json.load(f)
+    sinks = {}
+    for name, spec in config["sinks"].items():
+        spec = dict(spec)
+        sink_type = spec.pop("type")
+        if sink_type not in SINK_TYPES:
+            raise ValueError(f"{path}: unknown sink type '{sink_type}' for '{name}'")
+        sinks[name] = SINK_TYPES[sink_type](name, **spec)
+    for rule in config["rules"]:
+        unknown = [s for s in rule["sinks"] if s not in sinks]
+        if unknown:
+            raise ValueError(f"{path}: rule refers to unknown sink(s): {', '.join(unknown)}")
+    return AlertRouter(sinks, config["rules"], config.get("outbox", OUTBOX_PATH))
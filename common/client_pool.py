@@ -0,0 +1,351 @@
+"""
+Shared ArchetypeAI clients for one process.
+The ArchetypeAI client sends every API call with a bare `requests.get`/`post`/`delete`,
+so each call opens and tears down its own connection: DNS, TCP and the TLS handshake
+are paid again for every session create, event and destroy. `get_client()` keeps one
+client per (api_key, endpoint) and routes all of its sub-APIs through a shared
+`requests.Session`, whose connection pool keeps connections alive across calls and
+across jobs. Connections that sit idle longer than IDLE_SEC are closed by a reaper
+thread and reopened on the next call.
+
+Pool sizes come from ATAI_POOL_CONNECTIONS (hosts kept per client) and
+ATAI_POOL_MAXSIZE (connections per host, sized for concurrent jobs), or `configure()`.
+requests speaks HTTP/1.1 only, so there is no HTTP/2 multiplexing; with keep-alive a
+warm call costs one round trip either way. SSE streams and direct-to-storage upload
+parts use their own connections and are not pooled here.
+
+Benchmark against a local TLS stand-in server (per-job setup latency, fresh vs pooled):
+    python client_pool.py --bench
+    python client_pool.py --bench --jobs 50 --connect-delay-ms 40   # emulate WAN handshakes
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from archetypeai.api_client import ArchetypeAI
+
+# ---------- Defaults ----------
+POOL_CONNECTIONS = int(os.getenv("ATAI_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.getenv("ATAI_POOL_MAXSIZE", "16"))
+IDLE_SEC = float(os.getenv("ATAI_POOL_IDLE_SEC", "300"))
+REAP_INTERVAL_SEC = 30.0
+
+_clients = {}
+_lock = threading.Lock()
+_reaper = None
+
+
+def configure(pool_connections: int | None = None, pool_maxsize: int | None = None,
+              idle_sec: float | None = None) -> None:
+    """Change pool sizes for clients created after this call."""
+    global POOL_CONNECTIONS, POOL_MAXSIZE, IDLE_SEC
+    if pool_connections is not None:
+        POOL_CONNECTIONS = pool_connections
+    if pool_maxsize is not None:
+        POOL_MAXSIZE = pool_maxsize
+    if idle_sec is not None:
+        IDLE_SEC = idle_sec
+
+
+class _Entry:
+    def __init__(self, client, http):
+        self.client = client
+        self.http = http
+        self.last_used = time.monotonic()
+        self.idle_closes = 0
+
+
+# ---------- Pooled request methods (same contract as archetypeai's ApiBase) ----------
+# The client has no hook for a shared requests.Session, so these replace the private
+# ApiBase._requests_get/_post/_delete/_download that every public call goes through in
+# archetypeai 26.8.19. _pool_supported() checks that layout first; if an upgrade changes it,
+# get_client warns and returns an unpooled client instead of patching blind.
+def _pooled_get(self, api_endpoint: str, params: dict = {}, additional_headers: dict = {}):
+    from archetypeai._common import safely_extract_response_data
+    self._pool_entry.last_used = time.monotonic()
+    response = self._pool_entry.http.get(api_endpoint, params=params, timeout=self.request_timeout_sec,
+                                         headers={**self.auth_headers, **additional_headers})
+    return response.status_code, safely_extract_response_data(response)
+
+def _pooled_post(self, api_endpoint: str, data_payload: bytes, additional_headers: dict = {}):
+    from archetypeai._common import safely_extract_response_data
+    self._pool_entry.last_used = time.monotonic()
+    response = self._pool_entry.http.post(api_endpoint, data=data_payload, timeout=self.request_timeout_sec,
+                                          headers={**self.auth_headers, **additional_headers})
+    return response.status_code, safely_extract_response_data(response)
+
+def _pooled_delete(self, api_endpoint: str, params: dict = {}, additional_headers: dict = {}):
+    from archetypeai._common import safely_extract_response_data
+    self._pool_entry.last_used = time.monotonic()
+    response = self._pool_entry.http.delete(api_endpoint, params=params, timeout=self.request_timeout_sec,
+                                            headers={**self.auth_headers, **additional_headers})
+    return response.status_code, safely_extract_response_data(response)
+
+def _pooled_download(self, api_endpoint: str, params: dict = {}, additional_headers: dict = {}):
+    self._pool_entry.last_used = time.monotonic()
+    response = self._pool_entry.http.get(api_endpoint, params=params, timeout=self.request_timeout_sec,
+                                         headers={**self.auth_headers, **additional_headers})
+    if response.status_code != 200:
+        logging.warning(f"Failed to download file: {api_endpoint}. Error: {response}")
+    return response.status_code, response
+
+_POOLED = {"_requests_get": _pooled_get, "_requests_post": _pooled_post,
+           "_requests_delete": _pooled_delete, "_requests_download": _pooled_download}
+
+
+def _pool_supported() -> bool:
+    from archetypeai._base import ApiBase
+
+    missing = [name for name in _POOLED if not callable(getattr(ApiBase, name, None))]
+    try:
+        from archetypeai._common import safely_extract_response_data  # noqa: F401
+    except ImportError:
+        missing.append("_common.safely_extract_response_data")
+    if missing:
+        logging.warning(f"archetypeai client no longer matches 26.8.19 (missing {', '.join(missing)}); "
+                        f"connections are not pooled")
+    return not missing
+
+
+def _route_through_pool(client, entry: _Entry) -> int:
+    """Point the client and every nested sub-API (lens.sessions, files.local, …) at the pool."""
+    from archetypeai._base import ApiBase
+
+    routed, pending, seen = 0, [client], set()
+    while pending:
+        api = pending.pop()
+        if id(api) in seen:
+            continue
+        seen.add(id(api))
+        api._pool_entry = entry
+        for name, func in _POOLED.items():
+            setattr(api, name, types.MethodType(func, api))
+        routed += 1
+        pending.extend(v for v in vars(api).values() if isinstance(v, ApiBase))
+    return routed
+
+
+def _new_http():
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    http = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    http.mount("https://", adapter)
+    http.mount("http://", adapter)
+    return http
+
+
+def get_client(api_key: str, api_endpoint: str | None = None) -> "ArchetypeAI":
+    """Return the process-wide client for this key and endpoint, creating it on first use.
+
+    The client is shared by every caller in the process, which is fine for REST calls and
+    SSE readers. Session sockets are not: archetypeai keeps them in a class-level cache, and
+    create_and_run_session(auto_destroy=True) calls sessions.close(), which closes every
+    socket in it, including other callers'. Callers that open session sockets must destroy
+    only their own session and call sessions.close() once every socket user in the process
+    has finished (see rtsp_relay.run_socket_session).
+    """
+    from archetypeai.api_client import ArchetypeAI
+
+    api_endpoint = api_endpoint or ArchetypeAI.get_default_endpoint()
+    key = (api_key, api_endpoint)
+    with _lock:
+        entry = _clients.get(key)
+        if entry is None:
+            client = ArchetypeAI(api_key, api_endpoint=api_endpoint)
+            entry = _clients[key] = _Entry(client, _new_http())
+            if _pool_supported():
+                _route_through_pool(client, entry)
+                _start_reaper()
+        entry.last_used = time.monotonic()
+        return entry.client
+
+
+# ---------- Idle reaping ----------
+def reap_idle(idle_sec: float | None = None) -> int:
+    """Close the pooled connections of clients idle for longer than idle_sec; returns how many."""
+    limit = IDLE_SEC if idle_sec is None else idle_sec
+    now = time.monotonic()
+    closed = 0
+    with _lock:
+        for entry in _clients.values():
+            if now - entry.last_used > limit and _open_connections(entry):
+                entry.http.close()  # the session stays usable and reconnects on demand
+                entry.idle_closes += 1
+                closed += 1
+    return closed
+
+
+def _start_reaper() -> None:
+    global _reaper
+    if _reaper is not None:
+        return
+    def loop() -> None:
+        while True:
+            time.sleep(REAP_INTERVAL_SEC)
+            reap_idle()
+    _reaper = threading.Thread(target=loop, name="client-pool-reaper", daemon=True)
+    _reaper.start()
+
+
+def _open_connections(entry: _Entry) -> int:
+    total = 0
+    for adapter in set(entry.http.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                total += pool.num_connections
+    return total
+
+
+def _requests_served(entry: _Entry) -> int:
+    total = 0
+    for adapter in set(entry.http.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                total += pool.num_requests
+    return total
+
+
+def report() -> str:
+    with _lock:
+        entries = list(_clients.values())
+    requests_ = sum(_requests_served(e) for e in entries)
+    connections = sum(_open_connections(e) for e in entries)
+    reaped = sum(e.idle_closes for e in entries)
+    return f"{len(entries)} clients, {requests_} requests over {connections} connections, {reaped} idle closes"
+
+
+def close_all() -> None:
+    with _lock:
+        for entry in _clients.values():
+            entry.http.close()
+        _clients.clear()
+
+
+# ---------- Benchmark: local stand-in Lens API ----------
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, as the real API allows
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    connect_delay_sec = 0.0
+    new_connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).new_connections += 1
+        time.sleep(self.connect_delay_sec)  # stands in for the extra WAN round trips of a new connection
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.endswith("/sessions/create"):
+            self._reply({"session_id": "lsn-bench", "session_endpoint": "https://stand-in"})
+        elif self.path.endswith("/sessions/destroy"):
+            self._reply({"session_status": "SESSION_STATUS_DESTROYED"})
+        else:
+            self._reply({"status": "ok"})
+
+    def do_GET(self):
+        self._reply({"session_status": "SESSION_STATUS_RUNNING"})
+
+
+def _tls_context(workdir: str):
+    """Self-signed certificate for the stand-in, or None to benchmark plain HTTP."""
+    if not shutil.which("openssl"):
+        return None, None
+    cert, key = os.path.join(workdir, "cert.pem"), os.path.join(workdir, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+                    "-keyout", key, "-out", cert], check=True, capture_output=True)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context, cert
+
+
+def _run_job(client, events: int) -> None:
+    """Per-job setup as the apps do it: create, configure, check, destroy."""
+    session_id, _ = client.lens.create_session("lns-bench")
+    for _ in range(events):
+        client.lens.sessions.process_event(session_id, {"type": "session.modify", "event_data": {}})
+    client.lens.sessions.get_metadata(session_id=session_id)
+    client.lens.sessions.destroy(session_id)
+
+
+def _bench(label: str, make_client, jobs: int, events: int) -> list[float]:
+    start_connections = _StandInHandler.new_connections
+    times = []
+    for _ in range(jobs):
+        start = time.perf_counter()
+        _run_job(make_client(), events)
+        times.append(1000 * (time.perf_counter() - start))
+    p95 = sorted(times)[max(0, int(0.95 * len(times)) - 1)]
+    print(f"{label:<16} median {statistics.median(times):7.1f} ms  p95 {p95:7.1f} ms  "
+          f"total {sum(times) / 1000:6.2f} s  new connections {_StandInHandler.new_connections - start_connections}")
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process-wide ArchetypeAI client pool.")
+    parser.add_argument("--bench", action="store_true", help="compare fresh and pooled clients against a local stand-in")
+    parser.add_argument("--jobs", type=int, default=30)
+    parser.add_argument("--events", type=int, default=3, help="events sent per job")
+    parser.add_argument("--connect-delay-ms", type=float, default=0.0,
+                        help="extra delay per new connection, to emulate a remote endpoint")
+    opts = parser.parse_args()
+    if not opts.bench:
+        parser.print_help(); return
+
+    from archetypeai.api_client import ArchetypeAI
+
+    workdir = tempfile.mkdtemp()
+    try:
+        _StandInHandler.connect_delay_sec = opts.connect_delay_ms / 1000
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+        context, cert = _tls_context(workdir)
+        scheme = "http"
+        if context:
+            server.socket = context.wrap_socket(server.socket, server_side=True)
+            os.environ["REQUESTS_CA_BUNDLE"] = cert
+            scheme = "https"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        endpoint = f"{scheme}://127.0.0.1:{server.server_port}"
+        print(f"Stand-in Lens API at {endpoint}; {opts.jobs} jobs × ({opts.events + 3} calls), "
+              f"+{opts.connect_delay_ms:.0f} ms per new connection\n")
+
+        fresh = _bench("fresh client", lambda: ArchetypeAI("bench-key", api_endpoint=endpoint), opts.jobs, opts.events)
+        pooled = _bench("pooled client", lambda: get_client("bench-key", endpoint), opts.jobs, opts.events)
+        server.shutdown()
+        print(f"\nPer-job setup: {statistics.median(fresh):.1f} -> {statistics.median(pooled):.1f} ms median "
+              f"({statistics.median(fresh) / max(statistics.median(pooled), 1e-6):.1f}x); {report()}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
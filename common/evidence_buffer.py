@@ -0,0 +1,236 @@
+"""
+Alert evidence capture for the Telegram Smart Monitor.
+Keeps the last few minutes of a camera as JPEG thumbnails in a fixed-size,
+memory-mapped ring file on local disk (one file per camera, so disk use never
+grows). When an alert fires, the frames around it are extracted to image files
+on a background thread and handed to a callback, so the SSE loop never waits.
+
+Clips go to `<evidence_dir>/<camera key>/<time>-<alert id>/`; only the newest
+CLIP_KEEP clips younger than CLIP_MAX_AGE_SEC are kept per camera. The ring file
+is locked while recording, so a second job on the same camera runs without
+evidence instead of writing into the same ring.
+
+Requires OpenCV: pip install opencv-python
+
+Ring file layout: `slots` fixed-size records of
+    [seq u64][timestamp f64][length u32][pad u32][jpeg bytes … slot_bytes]
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows: the one-recorder-per-camera lock is not enforced
+    fcntl = None
+
+# ---------- Defaults ----------
+EVIDENCE_DIR = ".evidence"
+RING_SLOTS = 300              # 5 minutes at 1 fps
+SLOT_BYTES = 48 * 1024        # max JPEG size per frame; larger frames are re-encoded smaller
+THUMB_SIZE = (180, 320)       # (height, width)
+JPEG_QUALITY = 70
+CAPTURE_FPS = 1.0
+CLIP_BEFORE_SEC = 10.0
+CLIP_FRAMES = 6
+CLIP_KEEP = 200               # clip folders kept per camera
+CLIP_MAX_AGE_SEC = 7 * 24 * 3600
+RECONNECT_SEC = 2.0
+
+_RECORD = struct.Struct("<QdII")
+
+
+class FrameRing:
+    """Fixed-size ring of (timestamp, jpeg) records in a memory-mapped file."""
+
+    def __init__(self, path: str, slots: int = RING_SLOTS, slot_bytes: int = SLOT_BYTES):
+        self.path = path
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.record_bytes = _RECORD.size + slot_bytes
+        size = slots * self.record_bytes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a+b") as f:
+            if os.path.getsize(path) != size:
+                f.truncate(size)
+        self._file = open(path, "r+b")
+        if fcntl:
+            try:
+                fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._file.close()
+                raise RuntimeError(f"{path} is in use by another recorder") from None
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._lock = threading.Lock()
+        # Resume after the newest record already on disk
+        self.seq = max((self._header(i)[0] for i in range(slots)), default=0)
+
+    def _header(self, slot: int) -> tuple[int, float, int, int]:
+        return _RECORD.unpack_from(self._map, slot * self.record_bytes)
+
+    def write(self, ts: float, jpeg: bytes) -> bool:
+        if len(jpeg) > self.slot_bytes:
+            return False
+        with self._lock:
+            self.seq += 1
+            offset = ((self.seq - 1) % self.slots) * self.record_bytes
+            self._map[offset + _RECORD.size:offset + _RECORD.size + len(jpeg)] = jpeg
+            _RECORD.pack_into(self._map, offset, self.seq, ts, len(jpeg), 0)
+        return True
+
+    def read_since(self, since_ts: float) -> list[tuple[float, bytes]]:
+        """Frames with timestamp >= since_ts, oldest first."""
+        with self._lock:
+            frames = []
+            for slot in range(self.slots):
+                seq, ts, length, _ = self._header(slot)
+                if seq and ts >= since_ts:
+                    offset = slot * self.record_bytes + _RECORD.size
+                    frames.append((seq, ts, bytes(self._map[offset:offset + length])))
+        return [(ts, data) for _, ts, data in sorted(frames)]
+
+    def close(self) -> None:
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+
+
+def camera_key(source: str) -> str:
+    return hashlib.sha1(source.encode()).hexdigest()[:12]
+
+
+def ring_path(source: str, evidence_dir: str = EVIDENCE_DIR) -> str:
+    return os.path.join(evidence_dir, camera_key(source) + ".ring")
+
+
+def prune_clips(clip_dir: str, keep: int = CLIP_KEEP, max_age_sec: float = CLIP_MAX_AGE_SEC) -> int:
+    """Delete all but the newest `keep` clip folders, and any older than `max_age_sec`."""
+    try:
+        clips = sorted(((e.stat().st_mtime, e.path) for e in os.scandir(clip_dir) if e.is_dir()), reverse=True)
+    except FileNotFoundError:
+        return 0
+    cutoff = time.time() - max_age_sec
+    removed = 0
+    for i, (mtime, path) in enumerate(clips):
+        if i >= keep or mtime < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+class EvidenceRecorder:
+    """Pulls a camera into a FrameRing and extracts alert clips in the background."""
+
+    def __init__(self, source: str, fps: float = CAPTURE_FPS, slots: int = RING_SLOTS,
+                 evidence_dir: str = EVIDENCE_DIR):
+        self.source = source
+        self.fps = fps
+        self.evidence_dir = evidence_dir
+        self.clip_dir = os.path.join(evidence_dir, camera_key(source))
+        self.ring = FrameRing(ring_path(source, evidence_dir), slots)
+        self.written = 0
+        self.skipped = 0
+        self.write_sec = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._capture, daemon=True)
+        self._extractor = ThreadPoolExecutor(max_workers=1)
+
+    def start(self) -> "EvidenceRecorder":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self._extractor.shutdown(wait=True)
+        self.ring.close()
+        logging.info(f"Evidence: {self.report()}")
+
+    def _capture(self) -> None:
+        import cv2
+
+        height, width = THUMB_SIZE
+        interval = 1.0 / self.fps
+        while not self._stop.is_set():
+            cap = cv2.VideoCapture(self.source)
+            if not cap.isOpened():
+                logging.warning(f"Evidence: cannot open {self.source}; retrying")
+                time.sleep(RECONNECT_SEC); continue
+            next_write = 0.0
+            try:
+                while not self._stop.is_set() and cap.grab():
+                    now = time.monotonic()
+                    if now < next_write:
+                        continue
+                    ok, frame = cap.retrieve()
+                    if not ok:
+                        continue
+                    next_write = now + interval
+                    start = time.perf_counter()
+                    thumb = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+                    ok, jpeg = cv2.imencode(".jpg", thumb, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+                    if not ok or len(jpeg) > self.ring.slot_bytes:
+                        ok, jpeg = cv2.imencode(".jpg", thumb, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY // 2])
+                    if ok and self.ring.write(time.time(), jpeg.tobytes()):
+                        self.written += 1
+                    else:
+                        self.skipped += 1
+                    self.write_sec += time.perf_counter() - start
+            finally:
+                cap.release()
+            time.sleep(RECONNECT_SEC)
+
+    def capture_async(self, label: str, alert_id: str, callback=None, before_sec: float = CLIP_BEFORE_SEC,
+                      max_frames: int = CLIP_FRAMES) -> Future:
+        """Extract the frames from the last `before_sec` seconds to files; returns a Future of paths.
+
+        `callback(paths)` runs on the extractor thread once the files exist.
+        """
+        alert_ts = time.time()
+
+        def extract() -> list[str]:
+            frames = self.ring.read_since(alert_ts - before_sec)
+            if len(frames) > max_frames:  # spread the picks evenly across the clip
+                frames = [frames[round(i * (len(frames) - 1) / (max_frames - 1))] for i in range(max_frames)]
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(alert_ts))
+            out_dir = os.path.join(self.clip_dir, f"{stamp}-{alert_id}")
+            os.makedirs(out_dir, exist_ok=True)
+            paths = []
+            for i, (ts, data) in enumerate(frames):
+                path = os.path.join(out_dir, f"{i:02d}_{ts:.0f}.jpg")
+                with open(path, "wb") as f:
+                    f.write(data)
+                paths.append(path)
+            logging.info(f"Evidence for '{label}': {len(paths)} frame(s) in {out_dir}")
+            prune_clips(self.clip_dir)
+            if callback:
+                callback(paths)
+            return paths
+
+        return self._extractor.submit(extract)
+
+    def report(self) -> str:
+        per_frame = 1000 * self.write_sec / self.written if self.written else 0.0
+        return (f"{self.written} frames written ({per_frame:.1f} ms each), {self.skipped} skipped, "
+                f"ring {self.ring.slots * self.ring.record_bytes / 1e6:.1f} MB at {self.ring.path}")
+
+
+def start_recorder(source: str) -> EvidenceRecorder | None:
+    """Start evidence capture if OpenCV is installed; returns None otherwise."""
+    try:
+        import cv2  # noqa: F401
+    except ImportError:
+        logging.warning("OpenCV not installed; alert evidence capture disabled (pip install opencv-python).")
+        return None
+    try:
+        return EvidenceRecorder(source).start()
+    except RuntimeError as e:
+        logging.warning(f"Alert evidence capture disabled: {e}")
+        return None
@@ -0,0 +1,104 @@
+"""
+Multi-focus helpers: several focus questions served by one Lens session.
+The focuses are sent as one numbered focus, the Lens answers each on a line
+starting with its number, and demux_response splits the answer back per focus.
+Lines inside a <scan> block are ignored, so a numbered list in the scan cannot
+be mistaken for answers. FocusAlerts keeps the Telegram apps' per-focus alert state.
+"""
+
+import logging
+import re
+import uuid
+
+from alert_parser import parse_alert
+
+FOCUS_SEPARATOR = ";"
+FOCUS_LINE_RE = re.compile(r"^\s*(\d+)\s*[.):-]\s*(.+?)\s*$", re.MULTILINE)
+_SCAN_RE = re.compile(r"<\s*scan\s*>.*?(?:<\s*/\s*scan\s*>|\Z)", re.IGNORECASE | re.DOTALL)
+
+# The Telegram apps' alert format, one numbered verdict per focus
+MULTI_FOCUS_ALERT_INSTRUCTION = (
+    "STOP. FOLLOW THIS EXACT FORMAT: Step 1: Write <scan> I see in this video: "
+    "then list ALL detected objects, vehicles, people, animals, buildings, and their "
+    "visual or behavioral attributes (colors, shapes, positions, actions). Then close "
+    "with </scan>. Step 2: For EACH numbered item being searched for, write exactly one line "
+    "starting with its number. If the item is present, it is VERY IMPORTANT THAT YOU WRITE: "
+    "<number>. Alert: short description of what was detected, max 15 words. Otherwise write: "
+    "<number>. No alerts: short description, max 15 words. Do not describe anything else."
+)
+
+
+def split_focuses(text: str) -> list[str]:
+    return [f.strip() for f in text.split(FOCUS_SEPARATOR) if f.strip()]
+
+def build_multi_focus(focuses: list[str]) -> str:
+    """Combine several focus queries into one numbered focus for a single session."""
+    if len(focuses) == 1:
+        return focuses[0]
+    return "\n".join(f"{i}. {f}" for i, f in enumerate(focuses, 1))
+
+def demux_response(text: str, n_focuses: int) -> dict[int, str]:
+    """Split a combined response back into {focus index: answer} (1-based).
+
+    Out-of-range numbers are ignored, the first line wins for a repeated number and
+    focuses without a line are missing from the result.
+    """
+    if n_focuses == 1:
+        return {1: text.strip()}
+    text = _SCAN_RE.sub("", text)  # an unclosed <scan> runs to the end of the response
+    answers = {}
+    for m in FOCUS_LINE_RE.finditer(text):
+        idx = int(m.group(1))
+        if 1 <= idx <= n_focuses and idx not in answers:
+            answers[idx] = m.group(2)
+    return answers
+
+
+class FocusAlerts:
+    """Per-focus alert state for one session: alerts when a focus enters the alert state.
+
+    send_alert(message, focus=..., evidence=..., alert_id=...) delivers an alert; with a
+    recorder (see evidence_buffer.start_recorder) it goes out with its frames once they
+    are extracted.
+    """
+
+    def __init__(self, focuses: list[str], send_alert, recorder=None):
+        self.focuses = focuses
+        self.multi = len(focuses) > 1
+        self.send_alert = send_alert
+        self.recorder = recorder
+        self.alerting = {}  # focus index -> in the alert state
+        self.results = 0
+        self.missing = 0
+
+    def handle_response(self, text: str) -> None:
+        self.results += 1
+        answers = demux_response(text, len(self.focuses))
+        self.missing += len(self.focuses) - len(answers)
+        for idx, answer in answers.items():
+            self._handle_focus(idx, self.focuses[idx - 1], answer)
+
+    def _handle_focus(self, idx: int, focus: str, text: str) -> None:
+        parsed = parse_alert(text)
+        is_alert = bool(parsed.is_alert)
+        if is_alert and not self.alerting.get(idx, False):
+            alert_text = parsed.text
+            label = f" ({focus})" if self.multi else ""
+            logging.info(f"🚨 Alert detected{label} (state changed): {alert_text}")
+            message = f"🚨 Alert{label}: {alert_text}"
+            if self.recorder:
+                alert_id = uuid.uuid4().hex  # names the clip folder and the alert
+                self.recorder.capture_async(
+                    alert_text, alert_id,
+                    lambda paths: self.send_alert(message, focus=focus, evidence=paths, alert_id=alert_id))
+            else:
+                self.send_alert(message, focus=focus)
+        self.alerting[idx] = is_alert
+
+    def report(self) -> str:
+        """Session summary for multi-focus runs; empty for a single focus or no results."""
+        if not (self.multi and self.results):
+            return ""
+        return (f"{len(self.focuses)} focuses served by 1 session in {self.results} inference calls "
+                f"(separate sessions: {len(self.focuses) * self.results}); "
+                f"{self.missing} answers missing from responses.")
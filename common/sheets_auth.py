@@ -0,0 +1,147 @@
+"""
+Shared Google Sheets credentials and service for one process.
+Credentials are loaded from token.pickle once (or obtained through the OAuth flow
+with credentials.json) and shared by every Sheets call in the process. A background
+thread refreshes the access token REFRESH_MARGIN_SEC before it expires and saves it,
+so result writes never wait on an inline token refresh.
+
+googleapiclient's HTTP transport (httplib2) is not thread-safe, so each thread gets
+its own Sheets service over its own keep-alive connection, all authorized with the
+same credentials. The discovery document is parsed once for all of them.
+
+Usage:
+    from sheets_auth import get_service
+    get_service().spreadsheets().values().get(spreadsheetId=..., range="A1").execute()
+"""
+
+import datetime
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+import urllib.request
+
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+TOKEN_PATH = "token.pickle"
+CREDENTIALS_PATH = "credentials.json"
+DISCOVERY_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sheets_v4_discovery.json")
+DISCOVERY_URL = "https://sheets.googleapis.com/$discovery/rest?version=v4"
+REFRESH_MARGIN_SEC = 300.0  # ahead of google-auth's own 225 s threshold, so calls never refresh inline
+REFRESH_RETRY_SEC = 30.0
+
+_lock = threading.Lock()
+_local = threading.local()
+_state = {"creds": None, "doc": None, "refresher": None, "refreshes": 0, "services": 0}
+
+
+def load_discovery_doc(path: str = DISCOVERY_CACHE_PATH) -> str:
+    """Sheets v4 discovery document, read from a local file after the first run."""
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    from googleapiclient.discovery_cache import get_static_doc
+
+    doc = get_static_doc("sheets", "v4")  # bundled with google-api-python-client >= 2.0
+    if doc is None:
+        with urllib.request.urlopen(DISCOVERY_URL, timeout=30) as resp:
+            doc = resp.read().decode("utf-8")
+    tmp_path = f"{path}.{os.getpid()}.tmp"  # concurrent first runs each write their own file
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(doc)
+    os.replace(tmp_path, path)
+    return doc
+
+
+def _save(creds) -> None:
+    tmp_path = f"{TOKEN_PATH}.tmp"
+    with open(tmp_path, "wb") as token:
+        pickle.dump(creds, token)
+    os.replace(tmp_path, TOKEN_PATH)
+
+
+def _load_credentials():
+    """Authenticate with Google Sheets API using credentials.json/token.pickle."""
+    from google.auth.transport.requests import Request
+
+    creds = None
+    if os.path.exists(TOKEN_PATH):
+        with open(TOKEN_PATH, "rb") as token:
+            creds = pickle.load(token)
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            if not os.path.exists(CREDENTIALS_PATH):
+                raise FileNotFoundError(f"{CREDENTIALS_PATH} not found. See README for setup.")
+            from google_auth_oauthlib.flow import InstalledAppFlow
+
+            flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_PATH, SCOPES)
+            creds = flow.run_local_server(port=0)
+        _save(creds)
+    return creds
+
+
+def _seconds_to_refresh(creds) -> float:
+    if creds.expiry is None:  # no expiry known (e.g. service-account JWT handled by google-auth)
+        return REFRESH_RETRY_SEC * 10
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)  # google-auth keeps expiry as naive UTC
+    remaining = (creds.expiry - now).total_seconds()
+    return max(0.0, remaining - REFRESH_MARGIN_SEC)
+
+
+def _refresh_loop() -> None:
+    from google.auth.transport.requests import Request
+
+    creds = _state["creds"]
+    while creds.refresh_token:
+        time.sleep(_seconds_to_refresh(creds))
+        if creds.expiry is not None and _seconds_to_refresh(creds) == 0:
+            start = time.monotonic()
+            try:
+                with _lock:
+                    creds.refresh(Request())
+                    _save(creds)
+                _state["refreshes"] += 1
+                logging.info(f"Google token refreshed in the background in {time.monotonic() - start:.2f}s "
+                             f"(valid until {creds.expiry:%H:%M:%S} UTC)")
+            except Exception as e:
+                logging.warning(f"Background token refresh failed ({e}); retrying in {REFRESH_RETRY_SEC:.0f}s")
+        # Never loop faster than this, even for tokens that live shorter than REFRESH_MARGIN_SEC
+        time.sleep(REFRESH_RETRY_SEC)
+    logging.info("Google credentials have no refresh token; background refresh disabled")
+
+
+def get_credentials():
+    """Process-wide credentials, loaded on first use and kept fresh in the background."""
+    with _lock:
+        if _state["creds"] is None:
+            _state["creds"] = _load_credentials()
+            _state["refresher"] = threading.Thread(target=_refresh_loop, name="sheets-token-refresh", daemon=True)
+            _state["refresher"].start()
+        return _state["creds"]
+
+
+def get_service():
+    """Sheets v4 service for the calling thread, built on first use."""
+    service = getattr(_local, "service", None)
+    if service is None:
+        import google_auth_httplib2
+        import httplib2
+        from googleapiclient.discovery import build_from_document
+
+        creds = get_credentials()
+        with _lock:
+            if _state["doc"] is None:
+                _state["doc"] = json.loads(load_discovery_doc())
+            _state["services"] += 1
+        http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+        service = _local.service = build_from_document(_state["doc"], http=http)
+    return service
+
+
+def report() -> str:
+    creds = _state["creds"]
+    expiry = f", token valid until {creds.expiry:%H:%M:%S} UTC" if creds is not None and creds.expiry else ""
+    return f"{_state['services']} Sheets services, {_state['refreshes']} background refreshes{expiry}"
@@ -0,0 +1,254 @@
+"""
+Supervised SSE consumer for long-running Lens sessions.
+Wraps `client.lens.sessions.create_sse_consumer` so a monitor can run 24/7:
+    - polls the reader's read(block=False) without blocking, so a dead reader cannot hang the loop
+    - treats silence longer than STALL_SEC (heartbeats included) as a dropped connection,
+      which also covers a reader whose worker gave up
+    - reconnects with jittered exponential backoff
+    - skips events already seen before a reconnect (by content, and by sensor timestamp while
+      the stream replays events from before the drop)
+    - renews the session (new session + the app's setup events) when it has died
+    - reports reconnects, renewals, skipped duplicates and gap durations
+
+Usage (exercise it against a local SSE server that drops connections on purpose):
+    python sse_supervisor.py --demo
+"""
+
+import argparse
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ---------- Defaults ----------
+POLL_SEC = 0.1
+STALL_SEC = 90.0              # server heartbeats every 30 s
+BACKOFF_MIN_SEC = 1.0
+BACKOFF_MAX_SEC = 60.0
+RENEW_AFTER_RECONNECTS = 5    # consecutive reconnects without events before checking the session
+DEAD_STATUSES = ("DESTROY", "FAIL", "STOP", "ERROR", "TERMINAT")
+RECENT_EVENTS = 256           # events remembered by content for duplicate detection
+
+
+class SupervisedSSE:
+    """Yields session events across reconnects and session renewals."""
+
+    def __init__(self, client, session_id: str, lens_id: str | None = None, setup=None,
+                 max_read_time_sec: float = -1.0, stop=None, stall_sec: float = STALL_SEC,
+                 backoff_min_sec: float = BACKOFF_MIN_SEC, backoff_max_sec: float = BACKOFF_MAX_SEC):
+        self.client = client
+        self.session_id = session_id
+        self.lens_id = lens_id
+        self.setup = setup                    # setup(session_id): re-sends the app's stream/focus events
+        self.max_read_time_sec = max_read_time_sec
+        self.stop = stop or (lambda: False)
+        self.stall_sec = stall_sec
+        self.backoff_min_sec = backoff_min_sec
+        self.backoff_max_sec = backoff_max_sec
+        self.reconnects = 0
+        self.renewals = 0
+        self.duplicates = 0
+        self.gaps = []
+        self._reader = None
+        self._last_ts = None
+        self._replaying = False               # after a reconnect, until the stream passes _last_ts
+        self._recent = deque(maxlen=RECENT_EVENTS)
+        self._owned_sessions = []             # renewed sessions this supervisor must destroy
+
+    def _connect(self) -> None:
+        self._reader = self.client.lens.sessions.create_sse_consumer(self.session_id, max_read_time_sec=-1)
+
+    def _disconnect(self) -> None:
+        reader, self._reader = self._reader, None
+        if reader is not None:
+            # close() joins the worker, which may be blocked on a dead connection
+            threading.Thread(target=reader.close, daemon=True).start()
+
+    def _read(self) -> list:
+        """Events queued so far, via the reader's public non-blocking read()."""
+        events = []
+        try:
+            for event in self._reader.read(block=False):
+                events.append(event)
+        except queue.Empty:  # archetypeai 26.8 read(block=False) raises this once it empties the queue
+            pass
+        return events
+
+    def _is_duplicate(self, event: dict) -> bool:
+        """True for an event that was already yielded: one of the last RECENT_EVENTS by content,
+        or, while replaying after a reconnect, one whose sensor timestamp is older than the last
+        one seen. Timestamps are only compared when numeric and only during a replay, so a
+        timeline that jumps back (a clock reset, a file read from the start) is passed through."""
+        key = json.dumps(event, sort_keys=True, default=str)
+        if key in self._recent:
+            return True
+        ts = ((event.get("event_data") or {}).get("query_metadata") or {}).get("sensor_timestamp")
+        if isinstance(ts, (int, float)) and not isinstance(ts, bool):
+            if self._replaying and self._last_ts is not None:
+                if ts < self._last_ts:
+                    return True
+                self._replaying = ts == self._last_ts
+            self._last_ts = ts
+        self._recent.append(key)
+        return False
+
+    def _session_dead(self) -> bool:
+        try:
+            meta = self.client.lens.sessions.get_metadata(session_id=self.session_id)
+        except Exception as e:
+            logging.warning(f"SSE: session status check failed: {e}")
+            return False
+        if isinstance(meta, list):
+            meta = meta[0] if meta else {}
+        status = str(meta.get("session_status", "")).upper() if isinstance(meta, dict) else ""
+        return any(s in status for s in DEAD_STATUSES)
+
+    def _renew(self) -> bool:
+        if not (self.lens_id and self.setup):
+            return False
+        try:
+            new_id, _ = self.client.lens.create_session(self.lens_id)
+            self.setup(new_id)
+        except Exception as e:
+            logging.error(f"SSE: session renewal failed: {e}")
+            return False
+        logging.warning(f"SSE: session {self.session_id} died; continuing on {new_id}")
+        self.session_id = new_id
+        self._owned_sessions.append(new_id)
+        self.renewals += 1
+        self._last_ts = None          # a new session starts its own timeline
+        self._replaying = False
+        self._recent.clear()
+        return True
+
+    def events(self):
+        """Yield events (heartbeats excluded) until the stream ends, stop() or max_read_time_sec."""
+        start = time.monotonic()
+        backoff = self.backoff_min_sec
+        failures = 0
+        disconnected_at = None
+        self._connect()
+        last_event = time.monotonic()
+        try:
+            while not self.stop():
+                if self.max_read_time_sec >= 0 and time.monotonic() - start >= self.max_read_time_sec:
+                    return
+                got_event = False
+                # read() also stops after one event once the reader's worker has stopped,
+                # so keep calling it while it returns anything
+                for event in self._read():
+                    got_event = True
+                    last_event = time.monotonic()
+                    if not isinstance(event, dict):
+                        continue
+                    if event.get("type") == "sse.stream.heartbeat":
+                        continue
+                    if event.get("type") == "sse.stream.end":
+                        return
+                    if self._is_duplicate(event):
+                        self.duplicates += 1
+                        continue
+                    if disconnected_at is not None:
+                        self.gaps.append(time.monotonic() - disconnected_at)
+                        disconnected_at = None
+                    backoff, failures = self.backoff_min_sec, 0
+                    yield event
+                if got_event:
+                    continue
+                if time.monotonic() - last_event < self.stall_sec:
+                    time.sleep(POLL_SEC)
+                    continue
+
+                # Reader died or went silent: reconnect (renewing the session if it is gone)
+                disconnected_at = disconnected_at or last_event
+                self._disconnect()
+                failures += 1
+                self.reconnects += 1
+                delay = random.uniform(0, backoff)  # full jitter
+                logging.warning(f"SSE: connection lost; reconnecting in {delay:.1f}s (attempt {failures})")
+                time.sleep(delay)
+                backoff = min(backoff * 2, self.backoff_max_sec)
+                if failures >= RENEW_AFTER_RECONNECTS and self._session_dead() and self._renew():
+                    failures = 0
+                self._replaying = self._last_ts is not None
+                self._connect()
+                last_event = time.monotonic()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self._disconnect()
+        for session_id in self._owned_sessions:
+            try:
+                self.client.lens.sessions.destroy(session_id)
+            except Exception as e:
+                logging.warning(f"SSE: failed to destroy renewed session {session_id}: {e}")
+        self._owned_sessions = []
+
+    def report(self) -> str:
+        gaps = f", gaps avg {sum(self.gaps) / len(self.gaps):.1f}s / max {max(self.gaps):.1f}s" if self.gaps else ""
+        return (f"{self.reconnects} reconnects, {self.renewals} session renewals, "
+                f"{self.duplicates} duplicates skipped{gaps}")
+
+
+# ---------- Demo: local SSE server that drops connections ----------
+class _FlakyHandler(BaseHTTPRequestHandler):
+    total_events = 60
+    next_ts = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if not self.path.startswith("/lens/sessions/consumer/"):
+            self.send_error(404); return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        cls = type(self)
+        start = max(0, cls.next_ts - random.randint(0, 3))  # replay a few events after a reconnect
+        drop_after = random.randint(5, 15)
+        try:
+            for ts in range(start, cls.total_events):
+                event = {"type": "inference.result",
+                         "event_data": {"response": [f"window {ts}"], "query_metadata": {"sensor_timestamp": ts}}}
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                self.wfile.flush()
+                cls.next_ts = max(cls.next_ts, ts + 1)
+                time.sleep(0.05)
+                if ts - start + 1 >= drop_after:
+                    if random.random() < 0.3:
+                        time.sleep(3)  # go silent instead of closing
+                    return            # drop the connection
+            self.wfile.write(f"data: {json.dumps({'type': 'sse.stream.end'})}\n\n".encode())
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Supervised SSE consumer.")
+    parser.add_argument("--demo", action="store_true", help="run against a local SSE server that drops connections")
+    parser.add_argument("--events", type=int, default=60)
+    opts = parser.parse_args()
+    if not opts.demo:
+        parser.print_help(); return
+
+    from archetypeai.api_client import ArchetypeAI
+
+    _FlakyHandler.total_events = opts.events
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FlakyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = ArchetypeAI("demo-key", api_endpoint=f"http://127.0.0.1:{server.server_port}")
+
+    supervisor = SupervisedSSE(client, "demo-session", stall_sec=1.0, backoff_max_sec=1.0)
+    seen = [e["event_data"]["query_metadata"]["sensor_timestamp"] for e in supervisor.events()]
+    server.shutdown()
+    print(f"Received {len(seen)} unique events of {opts.events} (in order: {seen == sorted(set(seen))})")
+    print(supervisor.report())
+
+if __name__ == "__main__":
+    main()
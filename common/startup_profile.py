@@ -0,0 +1,54 @@
+"""
+Startup timing for the command-line apps.
+Heavy client libraries (the ArchetypeAI client, NumPy/pyarrow, the Google API
+stack) are imported inside the functions that use them, so the first prompt
+appears without waiting for them. `preload()` imports them on a background
+thread while the user is answering prompts.
+
+With STARTUP_PROFILE=1 set, each milestone is printed to stderr as the time
+since launch, followed by how long each preloaded module took to import:
+    STARTUP_PROFILE=1 python quickstart.py
+
+For a per-module breakdown, use Python's own import profiler:
+    python -X importtime quickstart.py 2> importtime.log
+"""
+
+import importlib
+import os
+import sys
+import threading
+import time
+
+LAUNCHED = time.perf_counter()  # import this module first so the clock starts at launch
+ENABLED = bool(os.getenv("STARTUP_PROFILE"))
+
+_import_sec = {}
+
+
+def preload(*modules: str) -> threading.Thread:
+    """Import `modules` on a daemon thread; code that needs one later just imports it as usual."""
+    def load() -> None:
+        for name in modules:
+            if name in sys.modules:
+                continue
+            start = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                continue  # reported by the code that actually needs it
+            _import_sec[name] = time.perf_counter() - start
+
+    thread = threading.Thread(target=load, name="preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def mark(stage: str) -> None:
+    if ENABLED:
+        print(f"[startup] {1000 * (time.perf_counter() - LAUNCHED):7.0f} ms  {stage}", file=sys.stderr)
+
+
+def report() -> None:
+    if ENABLED:
+        for name, sec in _import_sec.items():
+            print(f"[startup] {1000 * sec:7.0f} ms  import {name} (background)", file=sys.stderr)
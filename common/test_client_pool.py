@@ -0,0 +1,49 @@
+"""
+Tests for the shared clients (client_pool.py), run against the benchmark's local stand-in.
+
+    python -m pytest test_client_pool.py
+"""
+
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import client_pool
+
+
+@pytest.fixture
+def endpoint():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), client_pool._StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    client_pool.close_all()
+
+
+def new_connections(jobs) -> int:
+    start = client_pool._StandInHandler.new_connections
+    jobs()
+    return client_pool._StandInHandler.new_connections - start
+
+
+def test_patched_client_reuses_one_connection(endpoint):
+    client = client_pool.get_client("test-key", endpoint)
+    assert client_pool.get_client("test-key", endpoint) is client
+    assert client.lens.sessions._pool_entry is client._pool_entry  # nested sub-APIs are routed too
+    assert new_connections(lambda: [client_pool._run_job(client, events=2) for _ in range(5)]) == 1
+    assert client_pool.report().startswith("1 clients, 25 requests over 1 connections")
+
+def test_unpooled_fallback_still_works(endpoint, monkeypatch):
+    monkeypatch.setattr(client_pool, "_pool_supported", lambda: False)
+    client = client_pool.get_client("test-key", endpoint)
+    assert not hasattr(client, "_pool_entry")
+    assert new_connections(lambda: [client_pool._run_job(client, events=2) for _ in range(3)]) > 1
+
+def test_configure_keeps_values_that_are_not_given(monkeypatch):
+    monkeypatch.setattr(client_pool, "POOL_MAXSIZE", 16)
+    monkeypatch.setattr(client_pool, "IDLE_SEC", 300.0)
+    client_pool.configure(pool_maxsize=4, idle_sec=0)
+    assert (client_pool.POOL_MAXSIZE, client_pool.IDLE_SEC) == (4, 0)
+    client_pool.configure()
+    assert (client_pool.POOL_MAXSIZE, client_pool.IDLE_SEC) == (4, 0)
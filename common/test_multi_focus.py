@@ -0,0 +1,66 @@
+"""
+Tests for demultiplexing multi-focus responses (multi_focus.py).
+
+    python -m pytest test_multi_focus.py
+"""
+
+from multi_focus import FocusAlerts, build_multi_focus, demux_response, split_focuses
+
+
+def test_split_and_build_round_trip():
+    focuses = split_focuses(" person at the door ;; car in the drive; ")
+    assert focuses == ["person at the door", "car in the drive"]
+    assert build_multi_focus(focuses) == "1. person at the door\n2. car in the drive"
+    assert build_multi_focus(["person"]) == "person"
+
+def test_single_focus_is_the_whole_response():
+    assert demux_response("  1. Alert: a person  \n", 1) == {1: "1. Alert: a person"}
+
+def test_each_numbered_line_answers_its_focus():
+    text = "1. Alert: person at the door\n2) No alerts: empty drive\n3 - No alerts: quiet"
+    assert demux_response(text, 3) == {1: "Alert: person at the door", 2: "No alerts: empty drive",
+                                       3: "No alerts: quiet"}
+
+def test_missing_lines_are_left_out():
+    assert demux_response("Search result: nothing.\n2. No alerts: empty drive", 3) == {2: "No alerts: empty drive"}
+
+def test_out_of_range_numbers_are_ignored():
+    assert demux_response("0. Alert: zero\n1. No alerts: fine\n4. Alert: four", 3) == {1: "No alerts: fine"}
+
+def test_first_line_wins_for_a_repeated_number():
+    assert demux_response("1. No alerts: fine\n1. Alert: changed its mind", 2) == {1: "No alerts: fine"}
+
+def test_numbered_list_inside_scan_is_ignored():
+    text = "<scan> I see in this video:\n1. a red car\n2. a dog\n</scan>\n2. Alert: dog in the yard"
+    assert demux_response(text, 2) == {2: "Alert: dog in the yard"}
+
+def test_unclosed_scan_yields_no_answers():
+    assert demux_response("<scan> I see in this video:\n1. a red car\n2. a dog", 2) == {}
+
+
+class Recorder:
+    def __init__(self):
+        self.sent = []
+
+    def __call__(self, message, focus="", evidence=None, alert_id=None):
+        self.sent.append((message, focus))
+
+def test_alerts_only_on_entering_the_alert_state():
+    sent = Recorder()
+    alerts = FocusAlerts(["person", "car"], sent)
+    alerts.handle_response("1. Alert: person at the door\n2. No alerts: empty drive")
+    alerts.handle_response("1. Alert: person still there")
+    alerts.handle_response("1. No alerts: gone\n2. Alert: car arrived")
+    alerts.handle_response("1. Alert: person is back\n2. Alert: car parked")
+    assert sent.sent == [("🚨 Alert (person): person at the door", "person"),
+                         ("🚨 Alert (car): car arrived", "car"),
+                         ("🚨 Alert (person): person is back", "person")]
+    assert alerts.missing == 1
+    assert alerts.report().startswith("2 focuses served by 1 session in 4 inference calls")
+
+def test_single_focus_alert_has_no_label_or_report():
+    sent = Recorder()
+    alerts = FocusAlerts(["person"], sent)
+    alerts.handle_response("<scan> a porch </scan> Search result: found. Alert: person at the door")
+    assert sent.sent == [("🚨 Alert: person at the door", "person")]
+    assert alerts.report() == ""
@@ -0,0 +1,79 @@
+"""
+Tests for duplicate skipping across reconnects (sse_supervisor.py), with a scripted client
+whose SSE connections each deliver a fixed list of events and then go silent.
+
+    python -m pytest test_sse_supervisor.py
+"""
+
+import queue
+
+from sse_supervisor import SupervisedSSE
+
+END = {"type": "sse.stream.end"}
+
+
+class Reader:
+    def __init__(self, events):
+        self.pending = list(events)
+
+    def read(self, block=True):
+        while self.pending:
+            yield self.pending.pop(0)
+        raise queue.Empty
+
+    def close(self):
+        pass
+
+
+class Sessions:
+    def __init__(self, connections):
+        self.connections = list(connections)
+
+    def create_sse_consumer(self, session_id, max_read_time_sec=-1):
+        return Reader(self.connections.pop(0) if self.connections else [END])
+
+
+class Client:
+    def __init__(self, *connections):
+        self.lens = type("Lens", (), {})()
+        self.lens.sessions = Sessions(connections)
+
+
+def result(ts, text="ok"):
+    return {"type": "inference.result",
+            "event_data": {"response": [text], "query_metadata": {"sensor_timestamp": ts}}}
+
+
+def stream(*connections):
+    sse = SupervisedSSE(Client(*connections), "lsn-test", stall_sec=0.05, backoff_min_sec=0.0)
+    return [(e["event_data"].get("query_metadata", {}).get("sensor_timestamp"), e["event_data"]["response"][0])
+            for e in sse.events()], sse
+
+
+def test_replay_after_a_reconnect_is_skipped():
+    events, sse = stream([result(0), result(1), result(2)], [result(1), result(2), result(3), END])
+    assert events == [(0, "ok"), (1, "ok"), (2, "ok"), (3, "ok")]
+    assert (sse.reconnects, sse.duplicates) == (1, 2)
+
+def test_replay_is_skipped_beyond_the_remembered_events():
+    first = [result(ts, str(ts)) for ts in range(300)]
+    events, sse = stream(first, first[-280:] + [result(300, "300")])
+    assert [ts for ts, _ in events] == list(range(301))
+    assert sse.duplicates == 280
+
+def test_timestamps_may_go_back_without_a_reconnect():
+    events, sse = stream([result(5), result(0), result(1), END])
+    assert [ts for ts, _ in events] == [5, 0, 1]
+    assert sse.duplicates == 0
+
+def test_distinct_events_may_share_a_timestamp():
+    events, sse = stream([result(1, "a"), result(1, "b"), result(1, "a")], [result(1, "b"), result(1, "c")])
+    assert events == [(1, "a"), (1, "b"), (1, "c")]
+    assert sse.duplicates == 2
+
+def test_untimed_events_are_compared_by_content():
+    untimed = [{"type": "inference.result", "event_data": {"response": [text], "query_metadata": {"sensor_timestamp": "12:00"}}}
+               for text in ("a", "b", "c")]
+    events, sse = stream(untimed[:2] + [{"type": "sse.stream.heartbeat"}], untimed)
+    assert [text for _, text in events] == ["a", "b", "c"]
+    assert sse.duplicates == 2
@@ -0,0 +1,74 @@
+"""
+Window progress for csv_file_reader sessions (machine-state and cl-to-sheets).
+Counts result windows against the number the data can fill, reports throughput
+and ETA, and decides when to stop reading: after the last window, or when no
+result arrives within a deadline that adapts to the observed window rate.
+Check stalled() while the stream is silent, not only after an event, e.g. as
+SupervisedSSE's stop callback.
+"""
+
+import time
+
+# ---------- Defaults ----------
+DEFAULT_FIRST_RESULT_SEC = 120.0   # allowance for session start-up before the first window
+DEFAULT_SEC_PER_WINDOW = 5.0       # read budget per expected window until a rate is observed
+STALL_FACTOR = 10.0                # stop after this many average window intervals without a result
+MIN_IDLE_SEC = 30.0
+
+
+def count_windows(rows: int, window_size: int, step_size: int) -> int:
+    """Number of complete windows a csv_file_reader produces for `rows` samples."""
+    if window_size <= 0 or step_size <= 0 or rows < window_size:
+        return 0
+    return (rows - window_size) // step_size + 1
+
+def read_budget_sec(expected_windows: int) -> float:
+    """Upper bound for the SSE read, scaled to the file instead of a fixed timeout."""
+    return DEFAULT_FIRST_RESULT_SEC + expected_windows * DEFAULT_SEC_PER_WINDOW
+
+
+class WindowProgress:
+    """Counts result windows against the expected total to report throughput/ETA
+    and to end the read once the last window arrives or results stall."""
+
+    def __init__(self, expected_windows: int):
+        self.expected = expected_windows
+        self.count = 0
+        self.start = time.monotonic()
+        self.first_at = None
+        self.last_at = None
+
+    def update(self) -> None:
+        now = time.monotonic()
+        self.count += 1
+        self.first_at = self.first_at or now
+        self.last_at = now
+
+    @property
+    def done(self) -> bool:
+        return self.count >= self.expected
+
+    def rate(self) -> float:
+        """Windows per second since the first result."""
+        if self.count < 2 or self.last_at <= self.first_at:
+            return 0.0
+        return (self.count - 1) / (self.last_at - self.first_at)
+
+    def stalled(self) -> bool:
+        """True when no result arrived within the adaptive deadline."""
+        now = time.monotonic()
+        if self.last_at is None:
+            return now - self.start > DEFAULT_FIRST_RESULT_SEC
+        rate = self.rate()
+        idle_limit = max(MIN_IDLE_SEC, STALL_FACTOR / rate) if rate else DEFAULT_FIRST_RESULT_SEC
+        return now - self.last_at > idle_limit
+
+    def finished(self) -> bool:
+        return self.done or self.stalled()
+
+    def status(self) -> str:
+        rate = self.rate()
+        if not rate:
+            return f"{self.count}/{self.expected}"
+        eta = (self.expected - self.count) / rate
+        return f"{self.count}/{self.expected}, {rate:.2f} win/s, ETA {eta:.0f}s"
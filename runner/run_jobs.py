@@ -0,0 +1,505 @@
+"""
+Cookbook Job Runner
+Runs cookbook lens jobs from a job file without any prompts. Each job names the
+app it follows (machine-state CSV classification or activity-monitor video/RTSP),
+its inputs, focus, window/step and where results go; many jobs run concurrently
+in one process.
+
+Job files are TOML, JSON or YAML (YAML needs PyYAML). Every job is validated and
+compiled into its session events up front using the apps' own event builders,
+so a bad job fails before any session is created, and jobs with the same
+configuration share one compiled payload. Uploaded files are shared the same way.
+
+Usage:
+    export ATAI_API_KEY=...
+    python run_jobs.py jobs.example.toml
+    python run_jobs.py jobs.example.toml --only press-line-1 --dry-run
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "common"))  # shared helpers
+# The apps' lens settings, event builders and helpers; no module name appears in both
+# directories except quickstart.py, which is never imported here
+sys.path.insert(0, str(REPO_ROOT / "command-line-demos" / "machine-state"))
+sys.path.insert(0, str(REPO_ROOT / "command-line-demos" / "activity-monitor"))
+
+import activity_lens
+import client_pool
+import machine_state_lens
+from multi_focus import build_multi_focus, demux_response, split_focuses
+from sse_supervisor import SupervisedSSE
+from video_upload import upload_video
+from window_progress import WindowProgress, count_windows, read_budget_sec
+
+if TYPE_CHECKING:
+    from archetypeai.api_client import ArchetypeAI
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# ---------- Defaults ----------
+DEFAULT_CONCURRENCY = 4
+DEFAULT_API_KEY_ENV = "ATAI_API_KEY"
+DEFAULT_SINKS = ["stdout"]
+WEBHOOK_TIMEOUT_SEC = 10
+
+JOB_KEYS = {
+    "machine-state": {"name", "app", "lens_id", "api_endpoint", "sinks",
+                      "data", "focus", "window_size", "step_size"},
+    "activity-monitor": {"name", "app", "lens_id", "api_endpoint", "sinks",
+                         "video", "rtsp_url", "focus", "window_size", "step_size",
+                         "max_new_tokens", "max_run_time_sec"},
+}
+
+class JobError(ValueError):
+    pass
+
+# ---------- Job file ----------
+def read_job_file(path: str) -> dict:
+    suffix = Path(path).suffix.lower()
+    if suffix == ".toml":
+        import tomllib
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    if suffix == ".json":
+        with open(path, "r") as f:
+            return json.load(f)
+    if suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise JobError("YAML job files need PyYAML (pip install pyyaml); TOML and JSON work without it")
+        with open(path, "r") as f:
+            return yaml.safe_load(f) or {}
+    raise JobError(f"unsupported job file type '{suffix}' (use .toml, .json or .yaml)")
+
+class FileRef:
+    """Placeholder for a local file in a compiled payload; replaced by its file_id at run time."""
+
+    def __init__(self, path: str, kind: str):
+        self.path = path
+        self.kind = kind  # "csv" or "video"
+
+    def __eq__(self, other):
+        return isinstance(other, FileRef) and (self.path, self.kind) == (other.path, other.kind)
+
+    def __hash__(self):
+        return hash((self.path, self.kind))
+
+    def __repr__(self):
+        return f"<file {self.path}>"
+
+def resolve_refs(payload, file_ids: dict):
+    if isinstance(payload, FileRef):
+        return file_ids[payload]
+    if isinstance(payload, dict):
+        return {k: resolve_refs(v, file_ids) for k, v in payload.items()}
+    if isinstance(payload, list):
+        return [resolve_refs(v, file_ids) for v in payload]
+    return payload
+
+def _positive_int(job: dict, key: str, default: int) -> int:
+    value = job.get(key, default)
+    if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+        raise JobError(f"'{key}' must be a positive integer, got {value!r}")
+    return value
+
+def _existing_file(base: Path, value, key: str, suffixes: tuple = ()) -> str:
+    if not isinstance(value, str) or not value:
+        raise JobError(f"'{key}' must be a file path")
+    path = (base / value).resolve()
+    if not path.is_file():
+        raise JobError(f"'{key}' file not found: {path}")
+    if suffixes and path.suffix.lower() not in suffixes:
+        raise JobError(f"'{key}' must be a {'/'.join(suffixes)} file: {path}")
+    return str(path)
+
+# ---------- Compilation ----------
+class CompiledJob:
+    def __init__(self, name: str, app: str, lens_id: str, api_endpoint: str | None, events: list,
+                 sinks: list, files: list, max_run_time_sec: float, expected_windows: int | None = None,
+                 focuses: list | None = None, summary: str = ""):
+        self.name = name
+        self.app = app
+        self.lens_id = lens_id
+        self.api_endpoint = api_endpoint
+        self.events = events
+        self.sinks = sinks
+        self.files = files
+        self.max_run_time_sec = max_run_time_sec
+        self.expected_windows = expected_windows
+        self.focuses = focuses or []
+        self.summary = summary
+
+_validation_cache = {}
+
+def _validated(path: str, validate) -> dict:
+    """Validate each CSV once, however many jobs use it."""
+    if path not in _validation_cache:
+        try:
+            _validation_cache[path] = validate(path)
+        except ValueError as e:
+            raise JobError(f"invalid CSV {path}: {e}")
+    return _validation_cache[path]
+
+def compile_machine_state(job: dict, base: Path) -> dict:
+    from csv_validation import validate_csv  # NumPy/pyarrow, only when a CSV job exists
+
+    data = _existing_file(base, job.get("data"), "data", (".csv",))
+    focus = job.get("focus")
+    if not isinstance(focus, dict) or not focus:
+        raise JobError("'focus' must map class names to example CSV files")
+    focus_files = {str(cls).lower(): _existing_file(base, p, f"focus.{cls}", (".csv",)) for cls, p in focus.items()}
+    window_size = _positive_int(job, "window_size", machine_state_lens.DEFAULT_WINDOW_SIZE)
+    step_size = _positive_int(job, "step_size", machine_state_lens.DEFAULT_STEP_SIZE)
+
+    validate = lambda p: validate_csv(p, machine_state_lens.TIMESTAMP_COLUMN, machine_state_lens.DATA_COLUMNS)
+    for path in focus_files.values():
+        _validated(path, validate)
+    rows = _validated(data, validate)["rows"]
+    expected = count_windows(rows, window_size, step_size)
+    if not expected:
+        raise JobError(f"{rows} rows yield no complete window of {window_size}")
+
+    input_n_shot = {cls: FileRef(p, "csv") for cls, p in focus_files.items()}
+    data_ref = FileRef(data, "csv")
+    return {
+        "events": [
+            machine_state_lens.build_session_modify_event(input_n_shot, window_size, step_size),
+            machine_state_lens.build_input_event_csv(data_ref, window_size, step_size),
+            machine_state_lens.build_output_event(),
+        ],
+        "files": [*input_n_shot.values(), data_ref],
+        "lens_id": machine_state_lens.DEFAULT_LENS_ID,
+        "api_endpoint": machine_state_lens.DEFAULT_API_ENDPOINT,
+        "max_run_time_sec": read_budget_sec(expected),
+        "expected_windows": expected,
+        "summary": f"{Path(data).name}: {expected} windows ({rows} rows, window {window_size}, "
+                   f"step {step_size}), classes {', '.join(focus_files)}",
+    }
+
+def compile_activity_monitor(job: dict, base: Path) -> dict:
+    if ("video" in job) == ("rtsp_url" in job):
+        raise JobError("give exactly one of 'video' or 'rtsp_url'")
+    focus = job.get("focus", ["Describe the video."])
+    focuses = split_focuses(focus) if isinstance(focus, str) else focus
+    if not isinstance(focuses, list) or not focuses or not all(isinstance(f, str) and f.strip() for f in focuses):
+        raise JobError("'focus' must be a question or a list of questions")
+    focuses = [f.strip() for f in focuses]
+
+    args = {
+        "focus": build_multi_focus(focuses),
+        "instruction": (activity_lens.DEFAULT_INSTRUCTION if len(focuses) == 1
+                        else activity_lens.MULTI_FOCUS_INSTRUCTION),
+        "max_new_tokens": _positive_int(job, "max_new_tokens", activity_lens.DEFAULT_MAX_NEW_TOKENS),
+        "step_size": _positive_int(job, "step_size", activity_lens.DEFAULT_STEP_SIZE),
+        "window_size": _positive_int(job, "window_size", activity_lens.DEFAULT_WINDOW_SIZE),
+    }
+    files = []
+    if "rtsp_url" in job:
+        url = job["rtsp_url"]
+        if not isinstance(url, str) or not url.lower().startswith(("rtsp://", "rtsps://")):
+            raise JobError(f"'rtsp_url' must be an rtsp:// or rtsps:// URL, got {url!r}")
+        args.update(input_type="rtsp", rtsp_url=url)
+        source = url
+        default_run_sec = -1.0  # cameras run until stopped
+    else:
+        video_ref = FileRef(_existing_file(base, job["video"], "video"), "video")
+        args.update(input_type="video", video_file_id=video_ref)
+        files.append(video_ref)
+        source = Path(video_ref.path).name
+        default_run_sec = activity_lens.DEFAULT_MAX_RUN_SEC
+
+    max_run_time_sec = job.get("max_run_time_sec", default_run_sec)
+    if not isinstance(max_run_time_sec, (int, float)) or isinstance(max_run_time_sec, bool):
+        raise JobError(f"'max_run_time_sec' must be a number, got {max_run_time_sec!r}")
+
+    return {
+        "events": [activity_lens.build_input_event(args), activity_lens.build_focus_event(args),
+                   activity_lens.build_output_event()],
+        "files": files,
+        "lens_id": activity_lens.DEFAULT_LENS_ID,
+        "api_endpoint": None,  # the client's default endpoint, as in the quickstart
+        "max_run_time_sec": float(max_run_time_sec),
+        "focuses": focuses,
+        "summary": f"{source}: {'; '.join(focuses)}",
+    }
+
+COMPILERS = {"machine-state": compile_machine_state, "activity-monitor": compile_activity_monitor}
+
+def compile_jobs(spec: dict, base: Path) -> tuple[list[CompiledJob], list[str]]:
+    """Validate every job and compile it into session events; returns (jobs, errors)."""
+    defaults = spec.get("defaults", {})
+    raw_jobs = spec.get("jobs")
+    if not isinstance(raw_jobs, list) or not raw_jobs:
+        return [], ["the job file has no [[jobs]] entries"]
+
+    compiled, errors, names = [], [], set()
+    payloads = {}  # identical configurations share one compiled payload
+    for i, raw in enumerate(raw_jobs, 1):
+        job = {**defaults, **raw}
+        name = str(job.get("name") or f"job-{i}")
+        try:
+            if name in names:
+                raise JobError("duplicate job name")
+            names.add(name)
+            app = job.get("app")
+            if app not in COMPILERS:
+                raise JobError(f"'app' must be one of {', '.join(COMPILERS)}, got {app!r}")
+            unknown = set(raw) - JOB_KEYS[app]
+            if unknown:
+                raise JobError(f"unknown keys for {app}: {', '.join(sorted(unknown))}")
+
+            key = json.dumps({k: v for k, v in job.items() if k not in ("name", "sinks")}, sort_keys=True, default=str)
+            if key not in payloads:
+                payloads[key] = COMPILERS[app](job, base)
+            payload = payloads[key]
+
+            sinks = job.get("sinks", DEFAULT_SINKS)
+            if not isinstance(sinks, list) or not all(isinstance(s, str) for s in sinks):
+                raise JobError("'sinks' must be a list such as [\"stdout\", \"jsonl:results.jsonl\"]")
+            for s in sinks:
+                parse_sink(s, base)
+
+            compiled.append(CompiledJob(
+                name=name, app=app,
+                lens_id=job.get("lens_id", payload["lens_id"]),
+                api_endpoint=job.get("api_endpoint", payload["api_endpoint"]),
+                events=payload["events"], files=payload["files"], sinks=sinks,
+                max_run_time_sec=payload["max_run_time_sec"],
+                expected_windows=payload.get("expected_windows"),
+                focuses=payload.get("focuses"), summary=payload["summary"],
+            ))
+        except JobError as e:
+            errors.append(f"job '{name}': {e}")
+    return compiled, errors
+
+# ---------- Sinks ----------
+class StdoutSink:
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def write(self, record: dict) -> None:
+        with self.lock:
+            print(f"[{record['job']}] {record['timestamp']} → {record['result']}", flush=True)
+
+    def close(self) -> None:
+        pass
+
+class JsonlSink:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, "a")
+        self.lock = threading.Lock()
+
+    def write(self, record: dict) -> None:
+        with self.lock:
+            self.file.write(json.dumps(record) + "\n")
+            self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+class WebhookSink:
+    def __init__(self, url: str):
+        self.url = url
+
+    def write(self, record: dict) -> None:
+        req = urllib.request.Request(self.url, data=json.dumps(record).encode(),
+                                     headers={"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(req, timeout=WEBHOOK_TIMEOUT_SEC).close()
+        except OSError as e:
+            logging.warning(f"Webhook {self.url} failed: {e}")
+
+    def close(self) -> None:
+        pass
+
+def parse_sink(text: str, base: Path) -> tuple[str, str]:
+    kind, _, target = text.partition(":")
+    if kind == "stdout" and not target:
+        return ("stdout", "")
+    if kind == "jsonl" and target:
+        return ("jsonl", str((base / target).resolve()))
+    if kind == "webhook" and target.startswith(("http://", "https://")):
+        return ("webhook", target)
+    raise JobError(f"unknown sink {text!r} (use stdout, jsonl:<path> or webhook:<url>)")
+
+class SinkSet:
+    """One sink per distinct target, shared by every job that writes to it."""
+
+    def __init__(self, base: Path):
+        self.base = base
+        self.sinks = {}
+        self.lock = threading.Lock()
+
+    def get(self, text: str):
+        key = parse_sink(text, self.base)
+        with self.lock:
+            if key not in self.sinks:
+                kind, target = key
+                self.sinks[key] = (StdoutSink() if kind == "stdout" else
+                                   JsonlSink(target) if kind == "jsonl" else WebhookSink(target))
+            return self.sinks[key]
+
+    def close(self) -> None:
+        for sink in self.sinks.values():
+            sink.close()
+
+# ---------- Uploads ----------
+class Uploads:
+    """Uploads each local file once per endpoint, even when several jobs start together."""
+
+    def __init__(self):
+        self.futures = {}
+        self.lock = threading.Lock()
+
+    def file_id(self, client: "ArchetypeAI", ref: FileRef) -> str:
+        key = (client.files.api_endpoint, ref)
+        with self.lock:
+            future = self.futures.get(key)
+            owner = future is None
+            if owner:
+                future = self.futures[key] = Future()
+        if owner:
+            try:
+                if ref.kind == "video":
+                    file_id = upload_video(client, ref.path)
+                else:
+                    file_id = client.files.local.upload(ref.path)["file_id"]
+                future.set_result(file_id)
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+# ---------- Running ----------
+def run_job(job: CompiledJob, client: "ArchetypeAI", uploads: Uploads, sinks: SinkSet,
+            stop: threading.Event) -> dict:
+    start = time.monotonic()
+    file_ids = {ref: uploads.file_id(client, ref) for ref in job.files}
+    events = resolve_refs(job.events, file_ids)
+    outputs = [sinks.get(s) for s in job.sinks]
+    state = {"results": 0, "stream": ""}
+
+    def configure(session_id: str) -> None:
+        for event in events:
+            client.lens.sessions.process_event(session_id, event)
+
+    def session_fn(session_id: str, session_endpoint: str) -> None:
+        configure(session_id)
+        progress = WindowProgress(job.expected_windows) if job.expected_windows else None
+        sse_reader = SupervisedSSE(client, session_id, lens_id=job.lens_id, setup=configure,
+                                   max_read_time_sec=job.max_run_time_sec,
+                                   stop=lambda: stop.is_set() or bool(progress and progress.finished()))
+        try:
+            for event in sse_reader.events():
+                if isinstance(event, dict) and event.get("type") == "inference.result":
+                    ed = event.get("event_data", {}) or {}
+                    meta = ed.get("query_metadata") or {}
+                    result = ed.get("response")
+                    if result is None:
+                        continue
+                    state["results"] += 1
+                    record = {"job": job.name, "session_id": session_id,
+                              "timestamp": meta.get("query_timestamp", meta.get("sensor_timestamp", "N/A")),
+                              "result": result}
+                    if len(job.focuses) > 1 and isinstance(result, list) and result:
+                        answers = demux_response(result[0], len(job.focuses))
+                        record["answers"] = {job.focuses[i - 1]: a for i, a in answers.items()}
+                    for sink in outputs:
+                        sink.write(record)
+                    if progress:
+                        progress.update()
+                if progress and progress.done:
+                    break
+        finally:
+            sse_reader.close()
+            state["stream"] = sse_reader.report()
+
+    client.lens.create_and_run_session(job.lens_id, session_fn, auto_destroy=True)
+    return {"results": state["results"], "stream": state["stream"], "elapsed_sec": time.monotonic() - start}
+
+def print_dry_run(jobs: list[CompiledJob]) -> None:
+    for job in jobs:
+        print(f"\n--- {job.name} ({job.app}, lens {job.lens_id}) ---")
+        print(f"{job.summary}")
+        print(f"Sinks: {', '.join(job.sinks)}")
+        for event in job.events:
+            print(json.dumps(event, indent=2, default=repr))
+
+# ---------- Main ----------
+def main():
+    parser = argparse.ArgumentParser(description="Run cookbook lens jobs from a TOML/JSON/YAML job file.")
+    parser.add_argument("job_file", help="job file (.toml, .json or .yaml)")
+    parser.add_argument("--only", action="append", metavar="NAME", help="run only this job (repeatable)")
+    parser.add_argument("--concurrency", type=int, help="jobs running at once (overrides the job file)")
+    parser.add_argument("--dry-run", action="store_true", help="validate and print the compiled events, then exit")
+    args = parser.parse_args()
+
+    base = Path(args.job_file).resolve().parent
+    try:
+        spec = read_job_file(args.job_file)
+    except (OSError, ValueError) as e:
+        print(f"Error: cannot read {args.job_file}: {e}"); sys.exit(1)
+
+    start = time.monotonic()
+    jobs, errors = compile_jobs(spec, base)
+    if args.only:
+        missing = set(args.only) - {j.name for j in jobs}
+        errors += [f"no job named '{n}'" for n in sorted(missing)]
+        jobs = [j for j in jobs if j.name in args.only]
+    for e in errors:
+        print(f"Error: {args.job_file}: {e}")
+    if errors:
+        sys.exit(1)
+    payloads = len({id(j.events) for j in jobs})
+    print(f"Compiled {len(jobs)} jobs ({payloads} distinct payloads) in {time.monotonic() - start:.2f}s")
+
+    if args.dry_run:
+        print_dry_run(jobs)
+        return
+
+    api_key = os.getenv(spec.get("api_key_env", DEFAULT_API_KEY_ENV), "").strip()
+    if not api_key:
+        print(f"Error: set {spec.get('api_key_env', DEFAULT_API_KEY_ENV)} to your API key."); sys.exit(1)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda _s, _f: stop.set())
+    uploads, sinks = Uploads(), SinkSet(base)
+    concurrency = args.concurrency or spec.get("concurrency", DEFAULT_CONCURRENCY)
+    client_pool.configure(pool_maxsize=max(client_pool.POOL_MAXSIZE, concurrency))
+    print(f"Running {len(jobs)} jobs, {concurrency} at a time. Press Ctrl+C to stop.\n")
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="job") as pool:
+        # Jobs share one client per endpoint; safe because they read results over SSE and never
+        # open session sockets (see client_pool.get_client)
+        futures = {pool.submit(run_job, job, client_pool.get_client(api_key, job.api_endpoint),
+                               uploads, sinks, stop): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                r = future.result()
+                print(f"✅ {job.name}: {r['results']} results in {r['elapsed_sec']:.1f}s ({r['stream']})", flush=True)
+            except Exception as e:
+                failed += 1
+                print(f"❌ {job.name}: {e}", flush=True)
+    sinks.close()
+    print(f"\nFinished {len(jobs) - failed}/{len(jobs)} jobs in {time.monotonic() - start:.1f}s.")
+    print(f"HTTP: {client_pool.report()}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
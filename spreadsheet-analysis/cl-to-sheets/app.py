@@ -3,19 +3,24 @@ Machine State → Google Sheets
 Streams a CSV into a Newton Lens with one-shot examples and logs predictions to Google Sheets.
 """
 
-import logging
 import os
 import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))  # shared helpers
+
+import startup_profile  # first, so its clock starts at launch
+
+import logging
 from datetime import datetime
 from pathlib import Path
-import pickle
+from typing import TYPE_CHECKING
 
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from sheets_auth import get_service
+from sse_supervisor import SupervisedSSE
+from window_progress import WindowProgress, count_windows, read_budget_sec
 
-from archetypeai.api_client import ArchetypeAI
+if TYPE_CHECKING:
+    from archetypeai.api_client import ArchetypeAI
 
 # ---------- Logging ----------
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -28,39 +33,24 @@ BANNER = r"""
 ██║ ╚████║███████╗╚███╔███╔╝   ██║   ╚██████╔╝██║ ╚████║    ██║  ██║██╗
 ╚═╝  ╚═══╝╚══════╝ ╚══╝╚══╝    ╚═╝    ╚═════╝ ╚═╝  ╚═══╝    ╚═╝  ╚═╝╚═╝
 """
-print(BANNER)
 
 # ---------- Defaults ----------
 DEFAULT_LENS_ID = "lns-1d519091822706e2-bc108andqxf8b4os"
 DEFAULT_API_ENDPOINT = "https://api.archetypeai.dev/v0.5"
-DEFAULT_MAX_RUN_SEC = 600.0
 DEFAULT_WINDOW_SIZE = 1024
 DEFAULT_STEP_SIZE = 1024  # no overlap
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+HEAVY_MODULES = ("googleapiclient.discovery", "google_auth_oauthlib.flow", "archetypeai.api_client")
 
 # ---------- Google Sheets Logger ----------
 class GoogleSheetsLogger:
     def __init__(self, spreadsheet_id: str):
         self.spreadsheet_id = spreadsheet_id
-        self.service = self._authenticate()
-
-    def _authenticate(self):
-        """Authenticate with Google Sheets API using credentials.json/token.pickle."""
-        creds = None
-        if os.path.exists("token.pickle"):
-            with open("token.pickle", "rb") as token:
-                creds = pickle.load(token)
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                if not os.path.exists("credentials.json"):
-                    raise FileNotFoundError("credentials.json not found. See README for setup.")
-                flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-                creds = flow.run_local_server(port=0)
-            with open("token.pickle", "wb") as token:
-                pickle.dump(creds, token)
-        return build("sheets", "v4", credentials=creds)
+        get_service()  # authenticate up front; credentials are shared by the whole process
+
+    @property
+    def service(self):
+        """This thread's Sheets service (httplib2 connections must not be shared across threads)."""
+        return get_service()
 
     def init_sheet(self):
         """Clear sheet and write headers."""
@@ -114,6 +104,18 @@ class GoogleSheetsLogger:
         except Exception as e:
             logging.error(f"Error logging to sheet: {e}")
 
+# ---------- Progress ----------
+def count_data_rows(path: str) -> int:
+    """Count CSV data rows (excluding the header) by scanning raw bytes."""
+    rows, last = 0, b"\n"
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            rows += chunk.count(b"\n")
+            last = chunk[-1:]
+    if last != b"\n":
+        rows += 1  # final line without a trailing newline
+    return max(rows - 1, 0)
+
 # ---------- Event Builders ----------
 def build_session_modify_event(input_n_shot: dict, window_size: int, step_size: int) -> dict:
     return {
@@ -153,6 +155,7 @@ def build_output_event() -> dict:
 # ---------- Interactive Inputs ----------
 def get_user_inputs() -> dict:
     print("\n=== Machine State → Google Sheets ===\n")
+    startup_profile.mark("first prompt")
 
     api_key = os.getenv("ATAI_API_KEY", "").strip() or input("Enter your ArchetypeAI API key: ").strip()
     if not api_key:
@@ -184,11 +187,18 @@ def get_user_inputs() -> dict:
         focus_files[cls] = p
         print(f" Added: class '{cls}' from {Path(p).name}")
 
-    window_size_input = input(f"\nWindow size [default {DEFAULT_WINDOW_SIZE}]: ").strip()
-    step_size_input = input(f"Step size   [default {DEFAULT_STEP_SIZE}]: ").strip()
+    data_rows = count_data_rows(data_file_path)
+    print()
+    while True:
+        window_size_input = input(f"Window size [default {DEFAULT_WINDOW_SIZE}]: ").strip()
+        step_size_input = input(f"Step size   [default {DEFAULT_STEP_SIZE}]: ").strip()
 
-    window_size = int(window_size_input) if window_size_input.isdigit() else DEFAULT_WINDOW_SIZE
-    step_size = int(step_size_input) if step_size_input.isdigit() else DEFAULT_STEP_SIZE
+        window_size = int(window_size_input) if window_size_input.isdigit() else DEFAULT_WINDOW_SIZE
+        step_size = int(step_size_input) if step_size_input.isdigit() else DEFAULT_STEP_SIZE
+        expected_windows = count_windows(data_rows, window_size, step_size)
+        if expected_windows:
+            break
+        print(f"Error: {data_rows} rows yield no complete window of {window_size} — try again.")
 
     return {
         "api_key": api_key,
@@ -197,13 +207,15 @@ def get_user_inputs() -> dict:
         "focus_files": focus_files,
         "window_size": window_size,
         "step_size": step_size,
+        "data_rows": data_rows,
+        "expected_windows": expected_windows,
         "lens_id": DEFAULT_LENS_ID,
         "api_endpoint": DEFAULT_API_ENDPOINT,
-        "max_run_time_sec": DEFAULT_MAX_RUN_SEC,
+        "max_run_time_sec": read_budget_sec(expected_windows),
     }
 
 # ---------- Session Handling ----------
-def session_fn(session_id: str, session_endpoint: str, client: ArchetypeAI, args: dict) -> None:
+def session_fn(session_id: str, session_endpoint: str, client: "ArchetypeAI", args: dict) -> None:
     print(f"Session created: {session_id}")
 
     # Google Sheets init
@@ -231,42 +243,55 @@ def session_fn(session_id: str, session_endpoint: str, client: ArchetypeAI, args
         build_input_event_csv(data_file_id, args["window_size"], args["step_size"]))
     client.lens.sessions.process_event(session_id, build_output_event())
 
-    # SSE reader
-    sse_reader = client.lens.sessions.create_sse_consumer(session_id, max_read_time_sec=args["max_run_time_sec"])
-
     print("\nProcessing… (Ctrl+C to stop)\n")
-    window_count = 0
+    progress = WindowProgress(args["expected_windows"])
+    # Polled without blocking, so a silent stream still ends at the adaptive stall deadline
+    sse_reader = SupervisedSSE(client, session_id, max_read_time_sec=args["max_run_time_sec"], stop=progress.finished)
     try:
-        for event in sse_reader.read(block=True):
-            if isinstance(event, dict) and event.get("type") == "inference.result":
+        for event in sse_reader.events():
+            if event.get("type") == "inference.result":
                 result = event.get("event_data", {}).get("response")
                 if result is not None:
-                    window_count += 1
+                    progress.update()
                     pred, conf, scores = sheets.parse_prediction_result(result)
-                    print(f"Window {window_count}: {pred} ({conf}) — {scores}")
+                    print(f"Window {progress.status()}: {pred} ({conf}) — {scores}")
                     sheets.log_result(
                         file_name=data_file_name,
-                        window_num=window_count,
+                        window_num=progress.count,
                         predicted_result=result
                     )
+            if progress.done:
+                break
+        if not progress.done and progress.stalled():
+            logging.warning(f"No results for a while — stopping at window {progress.count}/{progress.expected}.")
     finally:
         sse_reader.close()
-        logging.info(f"Completed analysis of {window_count} windows.")
+        logging.info(f"Completed analysis of {progress.count}/{progress.expected} windows.")
 
 # ---------- Main ----------
 def main():
+    print(BANNER)
+    startup_profile.preload(*HEAVY_MODULES)  # loads in the background behind the prompts
     if not os.path.exists("credentials.json") and not os.path.exists("token.pickle"):
         print("\n❌ Google credentials not found.")
         print("Please place your OAuth client file as 'credentials.json' in this directory.")
         print("The script will guide you through authorization on first run.\n")
 
     args = get_user_inputs()
+
+    from archetypeai.api_client import ArchetypeAI
+
+    startup_profile.mark("clients loaded")
+    startup_profile.report()
     client = ArchetypeAI(args["api_key"], api_endpoint=args["api_endpoint"])
+    get_service()  # authorize Sheets now rather than inside the session
 
     print("\n--- Configuration Summary ---")
     print(f"Lens ID:      {args['lens_id']}")
     print(f"API Endpoint: {args['api_endpoint']}")
     print(f"Data file:    {args['data_file_path']}")
+    print(f"Windows:      {args['expected_windows']} "
+          f"({args['data_rows']} rows, window {args['window_size']}, step {args['step_size']})")
     print(f"Classes:      {len(args['focus_files'])}")
     for cls, p in args["focus_files"].items():
         print(f"  - {cls}: {p}")
@@ -6,21 +6,32 @@ focus-class sheets as n-shot examples, and logs predictions back to the sheet.
 Monitors a trigger cell to run on demand.
 """
 
-import logging
 import os
 import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))  # shared helpers
+
+import startup_profile  # first, so its clock starts at launch
+
+import argparse
+import logging
 import time
 import csv
+import io
+import json
 import tempfile
-import pickle
+import threading
+import types
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from client_pool import get_client
+from sheets_auth import get_service, report as sheets_report
 
-from archetypeai.api_client import ArchetypeAI
+if TYPE_CHECKING:
+    from archetypeai.api_client import ArchetypeAI
 
 # ---------- Logging ----------
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -34,16 +45,24 @@ BANNER = r"""
 ██║ ╚████║███████╗╚███╔███╔╝   ██║   ╚██████╔╝██║ ╚████║    ██║  ██║██╗
 ╚═╝  ╚═══╝╚══════╝ ╚══╝╚══╝    ╚═╝    ╚═════╝ ╚═╝  ╚═══╝    ╚═╝  ╚═╝╚═╝
 """
-print(BANNER)
 
 # ---------- Defaults ----------
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 TRIGGER_CELL = "Config!B10"
 STATUS_CELL  = "Config!B11"
 CONFIG_RANGE = "Config!A:B"
 DATA_SHEET   = "Data"
 RESULTS_HDR_RANGE = "Results!A1:E1"
 RESULTS_RANGE     = "Results!A:E"
+UPLOAD_WORKERS = 8
+UPLOAD_ATTEMPTS = 3
+SPOOL_MAX_BYTES = 8 * 1024 * 1024  # CSVs up to this size are never written to disk
+SPOOL_BATCH_ROWS = 2000
+RUN_STATE_PATH = ".run_state.json"
+HEAVY_MODULES = ("googleapiclient.discovery", "google_auth_oauthlib.flow", "archetypeai.api_client")
+
+def a1_range(sheet: str, cells: str = "A:Z") -> str:
+    """A1 range for a tab, quoted so titles with spaces or quotes work."""
+    return "'" + sheet.replace("'", "''") + "'!" + cells
 
 # ---------- Event builders ----------
 def build_session_modify_event(input_n_shot: dict, cfg: dict) -> dict:
@@ -85,34 +104,18 @@ def build_output_event() -> dict:
 class SpreadsheetLensRunner:
     def __init__(self, spreadsheet_id: str):
         self.spreadsheet_id = spreadsheet_id
-        self.service = self._authenticate()
-
-    def _authenticate(self):
-        """Authenticate with Google Sheets API using credentials.json/token.pickle."""
-        creds = None
-        if os.path.exists("token.pickle"):
-            with open("token.pickle", "rb") as token:
-                creds = pickle.load(token)
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                if not os.path.exists("credentials.json"):
-                    raise FileNotFoundError("credentials.json not found. See README for setup.")
-                flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-                creds = flow.run_local_server(port=0)
-            with open("token.pickle", "wb") as token:
-                pickle.dump(creds, token)
-        return build("sheets", "v4", credentials=creds)
+        get_service()  # authenticate up front; credentials are shared by the whole process
+
+    @property
+    def service(self):
+        """This thread's Sheets service (httplib2 connections must not be shared across threads)."""
+        return get_service()
 
     # ---- Sheet helpers
-    def read_config(self) -> dict | None:
+    def parse_config(self, rows: list[list[str]]) -> dict | None:
         try:
-            res = self.service.spreadsheets().values().get(
-                spreadsheetId=self.spreadsheet_id, range=CONFIG_RANGE
-            ).execute()
             cfg = {}
-            for row in res.get("values", []):
+            for row in rows:
                 if len(row) >= 2 and row[0] and row[1]:
                     cfg[row[0].strip().lower().replace(" ", "_")] = row[1].strip()
             for req in ("api_key", "lens_id", "api_endpoint"):
@@ -123,16 +126,18 @@ class SpreadsheetLensRunner:
             logging.error(f"Error reading config: {e}")
             return None
 
-    def get_trigger(self) -> bool:
+    def get_trigger(self) -> str | None:
+        """'RUN' (new rows only), 'RUN FULL' (every row) or None."""
         try:
             res = self.service.spreadsheets().values().get(
                 spreadsheetId=self.spreadsheet_id, range=TRIGGER_CELL
             ).execute()
             vals = res.get("values", [])
-            return bool(vals and vals[0] and vals[0][0].strip().upper() == "RUN")
+            command = " ".join(vals[0][0].split()).upper() if vals and vals[0] else ""
+            return command if command in ("RUN", "RUN FULL") else None
         except Exception as e:
             logging.error(f"Error checking trigger: {e}")
-            return False
+            return None
 
     def clear_trigger(self) -> None:
         try:
@@ -154,14 +159,15 @@ class SpreadsheetLensRunner:
         except Exception as e:
             logging.error(f"Error updating status: {e}")
 
-    def read_sheet(self, sheet_name: str) -> list[list[str]] | None:
+    def read_ranges(self, ranges: list[str]) -> list[list[list[str]]] | None:
+        """Read several ranges in one batchGet round trip; values come back in request order."""
         try:
-            res = self.service.spreadsheets().values().get(
-                spreadsheetId=self.spreadsheet_id, range=f"{sheet_name}!A:Z"
+            res = self.service.spreadsheets().values().batchGet(
+                spreadsheetId=self.spreadsheet_id, ranges=ranges, majorDimension="ROWS"
             ).execute()
-            return res.get("values", []) or None
+            return [vr.get("values", []) for vr in res.get("valueRanges", [])]
         except Exception as e:
-            logging.error(f"Error reading sheet {sheet_name}: {e}")
+            logging.error(f"Error reading {len(ranges)} ranges: {e}")
             return None
 
     def write_results_header_if_missing(self) -> None:
@@ -205,23 +211,12 @@ class SpreadsheetLensRunner:
             logging.error(f"Error parsing result {result}: {e}")
             return str(result), "N/A", str(result)
 
-    # ---- CSV temp helpers
-    def to_temp_csv(self, rows: list[list[str]]) -> str | None:
-        """Write rows to a temp CSV file and return its path."""
-        try:
-            f = tempfile.NamedTemporaryFile(mode="w", suffix=".csv", delete=False, newline="")
-            with f as fp:
-                writer = csv.writer(fp)
-                writer.writerows(rows)
-            return f.name
-        except Exception as e:
-            logging.error(f"Error writing temp CSV: {e}")
-            return None
-
     def list_focus_sheets(self) -> list[str]:
         """List candidate focus-class sheets (excludes known operational tabs)."""
         try:
-            meta = self.service.spreadsheets().get(spreadsheetId=self.spreadsheet_id).execute()
+            meta = self.service.spreadsheets().get(
+                spreadsheetId=self.spreadsheet_id, fields="sheets.properties.title"  # titles only, no grid metadata
+            ).execute()
             excluded = {"config", "data", "results", "sheet1"}
             focus_titles = []
             for sheet in meta.get("sheets", []):
@@ -233,64 +228,248 @@ class SpreadsheetLensRunner:
             logging.error(f"Error listing focus sheets: {e}")
             return []
 
-# ---------- One-shot run (reads config, builds temps, runs Lens, logs results) ----------
-def run_once(runner: SpreadsheetLensRunner):
-    cfg = runner.read_config()
+# ---------- Run state (incremental re-runs) ----------
+# Per spreadsheet: how many windows have been analysed and the last row they covered, so
+# a RUN only sends the rows appended since then (plus the overlap the next window needs).
+def _load_run_state() -> dict:
+    try:
+        with open(RUN_STATE_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_run_state(state: dict) -> None:
+    tmp_path = f"{RUN_STATE_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, RUN_STATE_PATH)
+
+def windowing(cfg: dict, header: list[str]) -> dict:
+    """Everything that decides where windows fall; earlier windows only carry over if it is unchanged."""
+    return {
+        "window_size": int(cfg.get("window_size", 1024)),
+        "step_size": int(cfg.get("step_size", 1024)),
+        "timestamp_column": cfg.get("timestamp_column", "timestamp"),
+        "data_columns": cfg.get("data_columns", "a1,a2,a3,a4"),
+        "header": header,
+    }
+
+def first_row_to_read(prev: dict | None) -> int:
+    """First Data row (0-based, below the header) a run has to read: the start of the next
+    window, or the last analysed row if that comes earlier, so it can be checked for edits."""
+    if not prev:
+        return 0
+    next_row = prev["windows"] * prev["windowing"]["step_size"]
+    return min(next_row, prev["last_row"])
+
+def stale_reason(prev: dict, current: dict, rows: list[list[str]], read_from: int) -> str | None:
+    """Why the previous run can't be continued, or None if it can."""
+    if prev["windowing"] != current:
+        changed = [k for k in current if prev["windowing"].get(k) != current[k]]
+        return f"{', '.join(changed).replace('_', ' ')} changed"
+    anchor = prev["last_row"] - read_from
+    if anchor >= len(rows) or rows[anchor] != prev["last_row_values"]:
+        return f"Data row {prev['last_row'] + 2} was edited or removed"
+    return None
+
+def plan_run(prev: dict | None, current: dict, rows: list[list[str]], read_from: int) -> tuple[int, list[list[str]]]:
+    """Where a run starts: the first window number and the Data rows to send from it.
+    `rows` were read from `read_from`; prev is None for a full run."""
+    first_window = prev["windows"] if prev else 0
+    return first_window, rows[first_window * current["step_size"] - read_from:]
+
+def record_run(state: dict, spreadsheet_id: str, current: dict, windows: int,
+               rows: list[list[str]], read_from: int) -> None:
+    """Save how far the windows of this spreadsheet have been analysed."""
+    window_size, step_size = current["window_size"], current["step_size"]
+    last_row = min((windows - 1) * step_size + window_size, read_from + len(rows)) - 1
+    state[spreadsheet_id] = {
+        "windowing": current,
+        "windows": windows,
+        "last_row": last_row,
+        "last_row_values": rows[last_row - read_from],
+        "analysed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    _save_run_state(state)
+
+# ---------- Uploads ----------
+class _SpoolReader:
+    """Read-only view of a spooled CSV with a known length. The multipart encoder sizes
+    parts from `len`; without it, it would call fileno(), which forces the spool to disk."""
+
+    def __init__(self, spool, size: int):
+        self.spool = spool
+        self.size = size
+
+    @property
+    def len(self) -> int:
+        return self.size - self.spool.tell()
+
+    def read(self, length: int = -1) -> bytes:
+        return self.spool.read(length)
+
+def spool_csv(rows: list[list[str]]) -> tuple[tempfile.SpooledTemporaryFile, int]:
+    """Serialize rows to CSV in memory, spilling to an unlinked temp file above SPOOL_MAX_BYTES."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode="w+b")
+    text = io.StringIO()
+    writer = csv.writer(text)
+    for start in range(0, len(rows), SPOOL_BATCH_ROWS):  # encode in blocks, not row by row
+        writer.writerows(rows[start:start + SPOOL_BATCH_ROWS])
+        spool.write(text.getvalue().encode("utf-8"))
+        text.seek(0)
+        text.truncate()
+    return spool, spool.tell()
+
+def _post_to_files_api(client: "ArchetypeAI", encoder) -> tuple[int, dict]:
+    """POST a streaming multipart body to the Files API; returns (status, response json).
+
+    The public client only uploads from a file path, so this borrows the client's own
+    request plumbing: ApiBase._get_endpoint and ApiBase._requests_post on client.files.local,
+    as laid out in archetypeai 26.8.19. If an upgrade moves them this raises instead of
+    silently falling back to temp files.
+    """
+    api = client.files.local
+    try:
+        endpoint = api._get_endpoint(api.api_endpoint, "files")
+        post = api._requests_post
+    except AttributeError as e:
+        raise RuntimeError(f"archetypeai client no longer matches 26.8.19 ({e}); update _post_to_files_api") from e
+    return post(endpoint, encoder, {"Content-Type": encoder.content_type})
+
+def upload_csv_rows(client: "ArchetypeAI", name: str, rows: list[list[str]]) -> tuple[str, int]:
+    """Stream rows to the Files API as a multipart CSV upload; returns (file_id, bytes sent).
+
+    The body is read from the spool as it is sent, and each retry rewinds the spool and
+    builds a fresh encoder (the client's own retry would resend a consumed encoder).
+    """
+    from requests_toolbelt import MultipartEncoder
+
+    spool, size = spool_csv(rows)
+    with spool:
+        for attempt in range(1, UPLOAD_ATTEMPTS + 1):
+            spool.seek(0)
+            encoder = MultipartEncoder({"file": (f"{name}.csv", _SpoolReader(spool, size), "text/csv")})
+            try:
+                status, data = _post_to_files_api(client, encoder)
+            except OSError as e:  # requests' connection errors
+                status, data = None, str(e)
+            if status in (200, 201) and "file_id" in data:
+                return data["file_id"], size
+            if status is not None and 400 <= status < 500:
+                raise ValueError(f"Upload of '{name}' rejected: {status} {data}")
+            if attempt == UPLOAD_ATTEMPTS:
+                raise ValueError(f"Upload of '{name}' failed after {attempt} attempts: {status} {data}")
+            logging.warning(f"Upload of '{name}' failed ({status} {data}); retrying…")
+            time.sleep(2 ** attempt)
+
+class UploadBatch:
+    """Serializes each tab to CSV and streams it to the Files API on a worker thread, so
+    serialization, the uploads and session creation all overlap."""
+
+    def __init__(self, client: "ArchetypeAI", started_at: float):
+        self.client = client
+        self.started_at = started_at
+        self.pool = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+        self.lock = threading.Lock()
+        self.first_upload_sec = None
+        self.done_sec = None
+        self.bytes_sent = 0
+        self.bytes_spilled = 0
+
+    def submit(self, name: str, rows: list[list[str]]) -> Future:
+        return self.pool.submit(self._upload, name, rows)
+
+    def _upload(self, name: str, rows: list[list[str]]) -> str:
+        with self.lock:
+            if self.first_upload_sec is None:
+                self.first_upload_sec = time.monotonic() - self.started_at
+        file_id, size = upload_csv_rows(self.client, name, rows)
+        logging.info(f"Uploaded '{name}' ({size / 1e6:.2f} MB) -> {file_id}")
+        with self.lock:
+            self.done_sec = time.monotonic() - self.started_at
+            self.bytes_sent += size
+            self.bytes_spilled += size if size > SPOOL_MAX_BYTES else 0
+        return file_id
+
+    def report(self) -> str:
+        return (f"{self.bytes_sent / 1e6:.2f} MB uploaded, {self.bytes_spilled / 1e6:.2f} MB spilled to disk, "
+                f"first upload at {1000 * self.first_upload_sec:.0f} ms, done at {1000 * self.done_sec:.0f} ms")
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+# ---------- One-shot run (reads config, uploads tabs, runs Lens, logs results) ----------
+def run_once(runner: SpreadsheetLensRunner, triggered_at: float | None = None, full: bool = False):
+    started_at = triggered_at or time.monotonic()
+    state = _load_run_state()
+    prev = None if full else state.get(runner.spreadsheet_id)
+    read_from = first_row_to_read(prev)
+
+    # Two round trips for everything: tab titles, then config + Data header + the Data rows
+    # not analysed yet + every focus tab in one batchGet
+    focus_tabs = runner.list_focus_sheets()
+    if not focus_tabs:
+        runner.set_status("ERROR", "No focus sheets found")
+        return
+    ranges = runner.read_ranges([CONFIG_RANGE, a1_range(DATA_SHEET, "A1:Z1"),
+                                 a1_range(DATA_SHEET, f"A{read_from + 2}:Z"),
+                                 *(a1_range(tab) for tab in focus_tabs)])
+    if ranges is None:
+        runner.set_status("ERROR", "Sheet read failed")
+        return
+    cfg = runner.parse_config(ranges[0])
     if not cfg:
         runner.set_status("ERROR", "Config read failed")
         return
-
-    runner.set_status("STARTING", "Reading sheets")
-    data_values = runner.read_sheet(DATA_SHEET)
-    if not data_values:
+    header, data_rows = (ranges[1] or [[]])[0], ranges[2]
+    if not header or not (data_rows or read_from):
         runner.set_status("ERROR", "No data in Data sheet")
         return
-
-    focus_tabs = runner.list_focus_sheets()
-    if not focus_tabs:
-        runner.set_status("ERROR", "No focus sheets found")
+    focus_rows = {tab.lower(): rows for tab, rows in zip(focus_tabs, ranges[3:]) if rows}
+    if not focus_rows:
+        runner.set_status("ERROR", "No valid focus CSVs")
         return
 
-    # Build temp CSV files
-    temp_paths: list[str] = []
-    try:
-        data_csv = runner.to_temp_csv(data_values)
-        if not data_csv:
-            runner.set_status("ERROR", "Could not create data CSV")
-            return
-        temp_paths.append(data_csv)
-
-        focus_files: dict[str, str] = {}
-        for tab in focus_tabs:
-            rows = runner.read_sheet(tab)
-            if rows:
-                temp_path = runner.to_temp_csv(rows)
-                if temp_path:
-                    focus_files[tab.lower()] = temp_path
-                    temp_paths.append(temp_path)
-
-        if not focus_files:
-            runner.set_status("ERROR", "No valid focus CSVs")
+    current = windowing(cfg, header)
+    reason = stale_reason(prev, current, data_rows, read_from) if prev else None
+    if full or reason:
+        logging.info(f"Full run: {reason or 'RUN FULL requested'}; window numbering restarts at 1")
+        if state.pop(runner.spreadsheet_id, None) is not None:
+            _save_run_state(state)
+    if reason:
+        prev, read_from = None, 0
+        data_rows = (runner.read_ranges([a1_range(DATA_SHEET, "A2:Z")]) or [[]])[0]
+    first_window, new_rows = plan_run(prev, current, data_rows, read_from)
+    next_row = first_window * current["step_size"]
+    total_rows = read_from + len(data_rows)
+    if prev:
+        if len(new_rows) < current["window_size"]:
+            runner.set_status("UP TO DATE", f"{total_rows - next_row} rows after window {first_window}, "
+                                            f"{current['window_size']} needed for the next one")
             return
+        overlap = max(0, prev["last_row"] + 1 - next_row)
+        logging.info(f"Incremental run: sending Data rows {next_row + 2}–{total_rows + 1} "
+                     f"({len(new_rows)} of {total_rows}, {overlap} overlapping window {first_window}); "
+                     f"{next_row} rows already analysed are skipped")
+    read_sec = time.monotonic() - started_at
+    logging.info(f"Read config, data and {len(focus_tabs)} focus tabs in {3 if reason else 2} requests "
+                 f"({1000 * read_sec:.0f} ms)")
+
+    client = get_client(cfg["api_key"], cfg["api_endpoint"])  # kept alive across triggered runs
+    uploads = UploadBatch(client, started_at)
+    try:
+        # CSV serialization and uploads run in the background while the session is created
+        focus_uploads = {cls: uploads.submit(cls, rows) for cls, rows in focus_rows.items()}
+        data_upload = uploads.submit(DATA_SHEET, [header, *new_rows])
 
         runner.write_results_header_if_missing()
-        runner.set_status("RUNNING", f"{len(focus_files)} classes")
-
-        # ---- Lens: create client and run session via callback
-        client = ArchetypeAI(cfg["api_key"], api_endpoint=cfg["api_endpoint"])
-
-        def session_fn(session_id: str, session_endpoint: str, client: ArchetypeAI, args: dict):
-            # Upload focus CSVs
-            input_n_shot = {}
-            input_n_shot = {}
-            for class_name, file_path in focus_files.items():
-                upload_response = client.files.local.upload(file_path)
-                input_n_shot[class_name] = upload_response["file_id"]
-                logging.info(f"Uploaded focus '{class_name}' -> {upload_response['file_id']}")
+        runner.set_status("RUNNING", f"{len(focus_rows)} classes, {len(new_rows)} rows from window {first_window + 1}")
 
-            # Upload data CSV
-            data_upload_response = client.files.local.upload(data_csv)
-            data_file_id = data_upload_response["file_id"]
+        def session_fn(session_id: str, session_endpoint: str, client: "ArchetypeAI", args: dict):
+            input_n_shot = {cls: future.result() for cls, future in focus_uploads.items()}
+            data_file_id = data_upload.result()
+            logging.info(f"Run timings after the trigger: sheets read {1000 * read_sec:.0f} ms, "
+                         f"{len(focus_uploads) + 1} files: {uploads.report()}")
 
             # Configure lens & streams
             client.lens.sessions.process_event(session_id, build_session_modify_event(input_n_shot, cfg))
@@ -300,18 +479,25 @@ def run_once(runner: SpreadsheetLensRunner):
             # SSE reader
             sse = client.lens.sessions.create_sse_consumer(session_id, max_read_time_sec=int(cfg.get("max_run_time_sec", 600)))
             window_count = 0
-            for event in sse_reader_iter(sse):
-                if isinstance(event, dict) and event.get("type") == "inference.result":
-                    result = event.get("event_data", {}).get("response")
-                    if result is not None:
-                        window_count += 1
-                        predicted_label, confidence_pct, _ = runner.parse_prediction_result(result)
-                        logging.info(f"Window {window_count}: {predicted_label} ({confidence_pct})")
-                        runner.append_result(window_count, result)
-                        if window_count % 10 == 0:
-                            runner.set_status("RUNNING", f"Processed {window_count} windows")
+            try:
+                for event in sse_reader_iter(sse):
+                    if isinstance(event, dict) and event.get("type") == "inference.result":
+                        result = event.get("event_data", {}).get("response")
+                        if result is not None:
+                            window_count += 1
+                            window_num = first_window + window_count  # continues the numbering of earlier runs
+                            predicted_label, confidence_pct, _ = runner.parse_prediction_result(result)
+                            logging.info(f"Window {window_num}: {predicted_label} ({confidence_pct})")
+                            runner.append_result(window_num, result)
+                            if window_count % 10 == 0:
+                                runner.set_status("RUNNING", f"Processed {window_count} windows")
+            finally:
+                if window_count:  # also after an interrupted run, so its windows aren't appended twice
+                    record_run(state, runner.spreadsheet_id, current, first_window + window_count,
+                               data_rows, read_from)
             sse.close()
-            runner.set_status("COMPLETED", f"Analyzed {window_count} windows")
+            runner.set_status("COMPLETED", f"Analyzed windows {first_window + 1}–{first_window + window_count}"
+                              if window_count else "Analyzed 0 windows")
 
         # Kick off session
         client.lens.create_and_run_session(cfg["lens_id"], session_fn, auto_destroy=True, client=client, args={})
@@ -320,12 +506,7 @@ def run_once(runner: SpreadsheetLensRunner):
         logging.error(f"Run error: {e}")
         runner.set_status("ERROR", str(e))
     finally:
-        # Cleanup temps
-        for path_to_delete in temp_paths:
-            try:
-                os.unlink(path_to_delete)
-            except Exception:
-                pass
+        uploads.close()
 
 def sse_reader_iter(sse_reader):
     """Helper to ensure we always close SSE properly if exceptions occur."""
@@ -338,35 +519,183 @@ def sse_reader_iter(sse_reader):
         except Exception:
             pass
 
+# ---------- Benchmark: trigger-to-upload latency against emulated APIs ----------
+class _EmulatedCall:
+    def __init__(self, rtt_sec: float, result: dict):
+        self.rtt_sec = rtt_sec
+        self.result = result
+
+    def execute(self) -> dict:
+        time.sleep(self.rtt_sec)
+        return self.result
+
+class _EmulatedSheets:
+    """Sheets API stand-in where every request costs one round trip."""
+
+    def __init__(self, tabs: dict, rtt_sec: float):
+        self.tabs = tabs
+        self.rtt_sec = rtt_sec
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def _rows(self, a1: str) -> list:
+        name = a1.rsplit("!", 1)[0].strip("'")
+        return self.tabs.get(name, [])
+
+    def get(self, spreadsheetId: str, range: str | None = None, fields: str | None = None):
+        if range is None:
+            return _EmulatedCall(self.rtt_sec, {"sheets": [{"properties": {"title": t}} for t in self.tabs]})
+        return _EmulatedCall(self.rtt_sec, {"values": self._rows(range)})
+
+    def batchGet(self, spreadsheetId: str, ranges: list, majorDimension: str = "ROWS"):
+        return _EmulatedCall(self.rtt_sec, {"valueRanges": [{"values": self._rows(r)} for r in ranges]})
+
+    def update(self, **kwargs):
+        return _EmulatedCall(self.rtt_sec, {})
+
+class _EmulatedRunner(SpreadsheetLensRunner):
+    def __init__(self, service: _EmulatedSheets):
+        self.spreadsheet_id = "bench"
+        self._service = service
+
+    @property
+    def service(self):
+        return self._service
+
+class _EmulatedFiles:
+    """Files API stand-in: reads the whole body, then costs one round trip."""
+
+    def __init__(self, rtt_sec: float):
+        self.rtt_sec = rtt_sec
+        self.local = self
+        self.api_endpoint = "https://stand-in"
+
+    def _get_endpoint(self, base: str, path: str) -> str:
+        return f"{base}/{path}"
+
+    def upload(self, path: str) -> dict:
+        with open(path, "rb") as f:
+            f.read()
+        time.sleep(self.rtt_sec)
+        return {"file_id": os.path.basename(path)}
+
+    def _requests_post(self, endpoint: str, data_payload, additional_headers: dict) -> tuple[int, dict]:
+        while data_payload.read(1 << 16):
+            pass
+        time.sleep(self.rtt_sec)
+        return 200, {"file_id": "bench"}
+
+def _bench_tabs(classes: int, data_rows: int, focus_rows: int = 2000) -> dict:
+    header = ["timestamp", "a1", "a2", "a3", "a4"]
+    def rows(n):
+        return [header] + [[f"{i / 30:.4f}", "0.12", "-0.34", "0.56", "-0.78"] for i in range(n)]
+    tabs = {"Config": [["api_key", "k"], ["lens_id", "l"], ["api_endpoint", "e"]], DATA_SHEET: rows(data_rows)}
+    tabs.update({f"class{i}": rows(focus_rows) for i in range(classes)})
+    return tabs
+
+def _temp_csv(rows: list[list[str]]) -> str:
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".csv", delete=False, newline="") as f:
+        csv.writer(f).writerows(rows)
+    return f.name
+
+def _sequential_inputs(runner: SpreadsheetLensRunner, files: _EmulatedFiles, rtt_sec: float) -> tuple[float, float, int]:
+    """The original run_once: config, status, Data, full metadata, each tab to a temp CSV,
+    session, then each upload read back from disk."""
+    start = time.monotonic()
+    service = runner.service
+    service.get(spreadsheetId="bench", range=CONFIG_RANGE).execute()
+    service.update().execute()
+    paths = [_temp_csv(service.get(spreadsheetId="bench", range=a1_range(DATA_SHEET)).execute()["values"])]
+    for tab in runner.list_focus_sheets():
+        paths.append(_temp_csv(service.get(spreadsheetId="bench", range=a1_range(tab)).execute()["values"]))
+    disk_bytes = sum(os.path.getsize(p) for p in paths)
+    time.sleep(rtt_sec)  # session create
+    first = time.monotonic() - start
+    for path in paths:
+        files.upload(path)
+        os.unlink(path)
+    return first, time.monotonic() - start, disk_bytes
+
+def _batched_inputs(runner: SpreadsheetLensRunner, files: _EmulatedFiles, rtt_sec: float) -> tuple[float, float, int]:
+    """The run_once order: titles, one batchGet, then streamed uploads overlapping session creation."""
+    start = time.monotonic()
+    tabs = runner.list_focus_sheets()
+    ranges = runner.read_ranges([CONFIG_RANGE, a1_range(DATA_SHEET), *(a1_range(t) for t in tabs)])
+    uploads = UploadBatch(types.SimpleNamespace(files=files), start)
+    try:
+        futures = [uploads.submit(tab, rows) for tab, rows in zip([DATA_SHEET, *tabs], ranges[1:])]
+        time.sleep(rtt_sec)  # session create
+        for future in futures:
+            future.result()
+    finally:
+        uploads.close()
+    return uploads.first_upload_sec, time.monotonic() - start, uploads.bytes_spilled
+
+def bench(class_counts: list[int], rtt_ms: float, data_rows: int) -> None:
+    rtt_sec = rtt_ms / 1000
+    logging.getLogger().setLevel(logging.WARNING)  # no per-upload lines in the table
+    print(f"Emulated round trip {rtt_ms:.0f} ms per Sheets/API request; "
+          f"{data_rows} Data rows, 2000 rows per class\n")
+    print(f"{'classes':>7}  {'first upload (before → now)':>30}  {'all uploaded (before → now)':>30}  "
+          f"{'temp disk MB':>14}")
+    for classes in class_counts:
+        runner = _EmulatedRunner(_EmulatedSheets(_bench_tabs(classes, data_rows), rtt_sec))
+        files = _EmulatedFiles(rtt_sec)
+        seq_first, seq_all, seq_disk = _sequential_inputs(runner, files, rtt_sec)
+        new_first, new_all, new_disk = _batched_inputs(runner, files, rtt_sec)
+        print(f"{classes:>7}  {1000 * seq_first:>12.0f} → {1000 * new_first:>6.0f} ms ({seq_first / new_first:4.1f}x)"
+              f"  {1000 * seq_all:>12.0f} → {1000 * new_all:>6.0f} ms ({seq_all / new_all:4.1f}x)"
+              f"  {seq_disk / 1e6:>5.1f} → {new_disk / 1e6:>4.1f}")
+
 # ---------- Main: monitor trigger cell ----------
 def main():
+    parser = argparse.ArgumentParser(description="Spreadsheet-driven Newton Lens runner.")
+    parser.add_argument("--bench", nargs="+", type=int, metavar="CLASSES",
+                        help="measure trigger-to-upload latency for these focus class counts, then exit")
+    parser.add_argument("--rtt-ms", type=float, default=100.0, help="emulated round trip for --bench")
+    parser.add_argument("--data-rows", type=int, default=20000, help="Data tab rows for --bench")
+    opts = parser.parse_args()
+    if opts.bench:
+        bench(opts.bench, opts.rtt_ms, opts.data_rows); return
+
+    print(BANNER)
+    startup_profile.preload(*HEAVY_MODULES)  # loads in the background behind the prompt
     if not os.path.exists("credentials.json") and not os.path.exists("token.pickle"):
         print("\nℹ️ Google credentials not found yet.")
         print("Place your OAuth client file as 'credentials.json' in this directory.")
         print("You will be guided through authorization on first run.\n")
 
+    startup_profile.mark("first prompt")
     spreadsheet_id = os.getenv("GOOGLE_SHEETS_ID", "").strip() or input("Enter your Google Sheets ID: ").strip()
     if not spreadsheet_id:
         print("Google Sheets ID is required."); sys.exit(1)
 
     runner = SpreadsheetLensRunner(spreadsheet_id)
+    startup_profile.mark("Sheets client ready")
+    startup_profile.report()
 
     print("\n🔄 Monitoring for triggers…")
-    print(f"- Put 'RUN' in {TRIGGER_CELL} to start an analysis")
+    print(f"- Put 'RUN' in {TRIGGER_CELL} to analyse rows added since the last run ('RUN FULL' for all rows)")
     print(f"- Status updates will appear in {STATUS_CELL}")
     print("Press Ctrl+C to stop.\n")
 
     try:
         while True:
-            if runner.get_trigger():
+            command = runner.get_trigger()
+            if command:
+                triggered_at = time.monotonic()
                 logging.info("Trigger detected — starting analysis…")
                 runner.clear_trigger()
                 runner.set_status("TRIGGERED", "Starting")
-                run_once(runner)
+                run_once(runner, triggered_at, full=command == "RUN FULL")
                 logging.info("Analysis complete. Waiting for next trigger…")
             time.sleep(5)
     except KeyboardInterrupt:
-        logging.info("Monitoring stopped.")
+        logging.info(f"Monitoring stopped. Sheets: {sheets_report()}")
         runner.set_status("STOPPED", "Monitoring ended")
 
 if __name__ == "__main__":
@@ -0,0 +1,127 @@
+"""
+Tests for the incremental-run bookkeeping in app.py (first_row_to_read, stale_reason,
+plan_run, record_run). A run is simulated the way run_once slices the Data tab: read from
+first_row_to_read, skip to the next window with plan_run, and let the Lens window what was sent.
+
+    python -m pytest test_run_state.py
+"""
+
+import pytest
+
+import app
+
+HEADER = ["timestamp", "a1", "a2", "a3", "a4"]
+
+
+@pytest.fixture(autouse=True)
+def run_state_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "RUN_STATE_PATH", str(tmp_path / "run_state.json"))
+
+
+def data(n: int) -> list[list[str]]:
+    return [[f"{i / 30:.4f}", str(i), "0.1", "0.2", "0.3"] for i in range(n)]
+
+
+def windows_of(rows: list, window: int, step: int) -> list[list]:
+    """The windows the Lens cuts from `rows`: starts every `step` rows, full windows only."""
+    return [rows[start:start + window] for start in range(0, len(rows) - window + 1, step)]
+
+
+def config(window: int, step: int) -> dict:
+    return app.windowing({"window_size": window, "step_size": step}, HEADER)
+
+
+def run(state: dict, sheet: list, current: dict, max_windows: int | None = None) -> list[list]:
+    """One RUN against `sheet`; returns the windows analysed (all of them unless interrupted)."""
+    prev = state.get("sheet")
+    read_from = app.first_row_to_read(prev)
+    rows = sheet[read_from:]
+    if prev and app.stale_reason(prev, current, rows, read_from):
+        prev, read_from, rows = None, 0, sheet
+    first_window, new_rows = app.plan_run(prev, current, rows, read_from)
+    windows = windows_of(new_rows, current["window_size"], current["step_size"])[:max_windows]
+    if windows:
+        app.record_run(state, "sheet", current, first_window + len(windows), rows, read_from)
+    return windows
+
+
+WINDOWING = [(8, 8), (8, 3), (4, 10)]  # step equal to, less than and greater than the window
+IDS = ["step=window", "step<window", "step>window"]
+
+
+def test_first_run_reads_everything():
+    assert app.first_row_to_read(None) == 0
+
+
+@pytest.mark.parametrize("window,step", WINDOWING, ids=IDS)
+def test_appended_rows_continue_the_full_run(window, step):
+    current, state, sheet = config(window, step), {}, data(50)
+    analysed = run(state, sheet[:30], current)
+    analysed += run(state, sheet, current)
+    assert analysed == windows_of(sheet, window, step)
+    assert state["sheet"]["windows"] == len(analysed)
+
+
+@pytest.mark.parametrize("window,step", WINDOWING, ids=IDS)
+def test_continuation_starts_no_later_than_the_next_window(window, step):
+    current, state, sheet = config(window, step), {}, data(30)
+    run(state, sheet, current)
+    prev = state["sheet"]
+    read_from = app.first_row_to_read(prev)
+    assert read_from <= prev["windows"] * step
+    assert read_from <= prev["last_row"]  # the anchor row is re-read to detect edits
+    assert app.stale_reason(prev, current, sheet[read_from:], read_from) is None
+
+
+@pytest.mark.parametrize("window,step", WINDOWING, ids=IDS)
+def test_last_row_is_the_end_of_the_last_window(window, step):
+    current, state, sheet = config(window, step), {}, data(30)
+    windows = run(state, sheet, current)
+    prev = state["sheet"]
+    assert prev["last_row"] == (len(windows) - 1) * step + window - 1
+    assert prev["last_row_values"] == sheet[prev["last_row"]]
+
+
+@pytest.mark.parametrize("window,step", WINDOWING, ids=IDS)
+def test_interrupted_run_resumes_after_its_last_window(window, step):
+    current, state, sheet = config(window, step), {}, data(60)
+    analysed = run(state, sheet, current, max_windows=2)
+    assert state["sheet"]["windows"] == 2
+    analysed += run(state, sheet, current)
+    assert analysed == windows_of(sheet, window, step)
+
+
+@pytest.mark.parametrize("window,step", WINDOWING, ids=IDS)
+def test_edited_anchor_row_forces_a_full_run(window, step):
+    current, state, sheet = config(window, step), {}, data(30)
+    run(state, sheet, current)
+    prev = state["sheet"]
+    edited = [row[:] for row in sheet]
+    edited[prev["last_row"]][1] = "edited"
+    read_from = app.first_row_to_read(prev)
+    reason = app.stale_reason(prev, current, edited[read_from:], read_from)
+    assert reason == f"Data row {prev['last_row'] + 2} was edited or removed"
+    assert run(state, edited, current) == windows_of(edited, window, step)
+
+
+def test_removed_rows_force_a_full_run():
+    current, state, sheet = config(8, 8), {}, data(30)
+    run(state, sheet, current)
+    prev = state["sheet"]
+    read_from = app.first_row_to_read(prev)
+    shortened = sheet[:prev["last_row"]]
+    assert app.stale_reason(prev, current, shortened[read_from:], read_from) is not None
+
+
+def test_changed_windowing_forces_a_full_run():
+    state, sheet = {}, data(30)
+    run(state, sheet, config(8, 8))
+    prev = state["sheet"]
+    read_from = app.first_row_to_read(prev)
+    assert app.stale_reason(prev, config(8, 4), sheet[read_from:], read_from) == "step size changed"
+
+
+def test_run_state_survives_a_restart():
+    current, state = config(8, 3), {}
+    run(state, data(30), current)
+    assert app._load_run_state() == state
@@ -6,13 +6,20 @@ Streams RTSP or video files, detects alerts, and pushes notifications to Telegra
 
 import logging
 import os
-import requests
-import threading
+import sys
 from pprint import pformat
-from archetypeai.api_client import ArchetypeAI
 from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))  # shared helpers
+
+from alert_router import ALERT_ROUTES_PATH, load_router, make_alert
+from client_pool import get_client
+from evidence_buffer import start_recorder
+from multi_focus import MULTI_FOCUS_ALERT_INSTRUCTION, FocusAlerts, build_multi_focus, split_focuses
+from sse_supervisor import SupervisedSSE
+from worker_pool import DEFAULT_WORKERS, WorkerPool
+
 # ---------- Logging ----------
 logging.basicConfig(
     level=logging.INFO,
@@ -28,7 +35,6 @@ BANNER = r"""
 ██║ ╚████║███████╗╚███╔███╔╝   ██║   ╚██████╔╝██║ ╚████║    ██║  ██║██╗
 ╚═╝  ╚═══╝╚══════╝ ╚══╝╚══╝    ╚═╝    ╚═════╝ ╚═╝  ╚═══╝    ╚═╝  ╚═╝╚═╝
 """
-print(BANNER)
 
 # ---------- Lens Config ----------
 LENS_ID = "lns-fd669361822b07e2-bc718aa3fdf0b3b7"
@@ -49,29 +55,41 @@ DEFAULT_INSTRUCTION = (
 BOT_TOKEN = "YOUR_BOT_TOCKEN"
 CHAT_ID = "YOUR_CHAT_ID"
 
-def send_telegram_alert(message: str):
-    """Send a simple Telegram text alert."""
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    try:
-        requests.post(url, data={"chat_id": CHAT_ID, "text": message})
-        logging.info("✅ Telegram alert sent!")
-    except Exception as e:
-        logging.error(f"❌ Failed to send Telegram alert: {e}")
-
-send_telegram_alert("Bot started. Send /start to see commands.")
+# ---------- Alert routing ----------
+router = None         # built on first alert from alert_routes.json (or BOT_TOKEN / CHAT_ID)
+current_camera = ""   # RTSP URL or video file ID of the current session
+alert_channel = None  # set in worker processes: alerts go back to the bot process for delivery
+
+def route_alert(alert: dict) -> None:
+    """Queue an alert on every matching sink; returns immediately (see alert_router.py)."""
+    global router
+    if router is None:
+        router = load_router(ALERT_ROUTES_PATH, BOT_TOKEN, CHAT_ID)
+    router.route(alert)
+
+def send_alert(message: str, severity: str = "warning", focus: str = "", evidence: list[str] | None = None,
+               alert_id: str | None = None) -> None:
+    alert = make_alert(message, severity, current_camera, focus, evidence, alert_id)
+    if alert_channel is not None:
+        alert_channel.put(("alert", alert))
+    else:
+        route_alert(alert)
 
 # ---------- Globals ----------
-last_alert_state = False
-monitoring_thread = None
+# Session state lives in the worker process running the job (one job per worker)
+evidence_recorder = None  # local frame ring for the current RTSP session
 stop_flag = False
 current_client = None
 current_session_id = None
-last_args = {}
 
-# ---------- Session Handling ----------
-def session_fn(session_id, session_endpoint, client, args):
-    global last_alert_state, stop_flag
+# Bot process: monitoring jobs by number
+pool = None
+jobs = {}          # job id -> start_monitoring kwargs
+next_job_id = 1
 
+# ---------- Session Handling ----------
+def configure_session(client, session_id, args):
+    """Send the input stream, focus/instruction and output stream events to a session."""
     # --- Input stream
     if args["input_type"] == "rtsp":
         event = {
@@ -120,51 +138,67 @@ def session_fn(session_id, session_endpoint, client, args):
     response = client.lens.sessions.process_event(session_id, event)
     logging.info(f"Output stream response:\n{pformat(response, indent=4)}")
 
-    # --- SSE Reader
-    sse_reader = client.lens.sessions.create_sse_consumer(session_id, max_read_time_sec=args["max_run_time_sec"])
-    for event in sse_reader.read(block=True):
-        if stop_flag:
-            logging.info("🛑 Monitoring stopped.")
-            break
+def renew_session(client, session_id, args):
+    """Set up a replacement session and make /stop_monitoring target it."""
+    global current_session_id
+    configure_session(client, session_id, args)
+    current_session_id = session_id
 
+def session_fn(session_id, session_endpoint, client, args):
+    global evidence_recorder, current_camera
+
+    configure_session(client, session_id, args)
+
+    current_camera = args["rtsp_url"] or args["video_file_id"] or ""
+
+    # --- Evidence capture (RTSP only: file inputs are read server-side)
+    evidence_recorder = start_recorder(args["rtsp_url"]) if args["input_type"] == "rtsp" else None
+
+    # --- SSE Reader
+    alerts = FocusAlerts(args["focuses"], send_alert, evidence_recorder)  # a new session starts out of the alert state
+    # Supervised: reconnects dropped streams and renews the session if it dies server-side
+    sse_reader = SupervisedSSE(client, session_id, lens_id=LENS_ID, setup=lambda new_id: renew_session(client, new_id, args),
+                               max_read_time_sec=args["max_run_time_sec"], stop=lambda: stop_flag)
+    for event in sse_reader.events():
         logging.info(event)
 
-        # --- Alert detection
+        # --- Alert detection (demultiplexed per focus)
         if isinstance(event, dict) and event.get("type") == "inference.result":
             resp = event.get("event_data", {}).get("response", [])
             if resp:
-                text = resp[0]
-                is_alert = "alert:" in text.lower()
-
-                if is_alert and not last_alert_state:
-                    alert_text = text.split("Alert:", 1)[-1].strip()
-                    logging.info(f"🚨 Alert detected: {alert_text}")
-                    send_telegram_alert(f"Alert: {alert_text}")
-
-                last_alert_state = is_alert
-
-    sse_reader.close()
+                alerts.handle_response(resp[0])
+
+    if stop_flag:
+        logging.info("🛑 Monitoring stopped.")
+    logging.info(f"🔌 SSE: {sse_reader.report()}")
+    if evidence_recorder:
+        evidence_recorder.stop()
+        evidence_recorder = None
+    if router:
+        logging.info(f"📬 Alert delivery:\n{router.report()}")
+    if alerts.report():
+        logging.info(f"📊 {alerts.report()}")
 
 # ---------- Monitoring Control ----------
 def start_monitoring(api_key, input_type, rtsp_url, video_file_id, focus):
     """Start a new monitoring session."""
-    global stop_flag, current_client, current_session_id, last_args
+    global stop_flag, current_client
     stop_flag = False
 
+    focuses = split_focuses(focus) or ["Describe the video."]
     args = {
         "api_key": api_key,
         "rtsp_url": rtsp_url,
         "video_file_id": video_file_id,
         "input_type": input_type,
-        "focus": focus,
-        "instruction": DEFAULT_INSTRUCTION,
-        "max_run_time_sec": 600.0
+        "focus": build_multi_focus(focuses),
+        "focuses": focuses,
+        "instruction": DEFAULT_INSTRUCTION if len(focuses) == 1 else MULTI_FOCUS_ALERT_INSTRUCTION,
+        "max_run_time_sec": -1.0 if input_type == "rtsp" else 600.0  # cameras run until /stop_monitoring
     }
-    last_args = args.copy()
-
-    client = ArchetypeAI(api_key, api_endpoint=ArchetypeAI.get_default_endpoint())
+    client = get_client(api_key)  # reused by later jobs in this worker process
     current_client = client
-    send_telegram_alert(f"Monitoring started with focus: {focus}")
+    send_alert(f"Monitoring started with focus: {focus}", severity="info")
 
     def wrapper(session_id, session_endpoint, client, args):
         global current_session_id
@@ -175,7 +209,7 @@ def start_monitoring(api_key, input_type, rtsp_url, video_file_id, focus):
 
 def stop_monitoring():
     """Stop and destroy the current session properly."""
-    global stop_flag, current_client, current_session_id
+    global stop_flag
     stop_flag = True
     if current_client and current_session_id:
         try:
@@ -186,42 +220,44 @@ def stop_monitoring():
     else:
         logging.info("⚠️ No active session to stop.")
 
-def restart_with_new_focus(new_focus):
-    """Restart monitoring with updated focus."""
-    global monitoring_thread, last_args, stop_flag
-    if not monitoring_thread or not monitoring_thread.is_alive():
-        raise RuntimeError("No active session to restart.")
+# ---------- Worker Pool ----------
+def run_pool_job(job_id, job, events):
+    """Worker process entry point: run one monitoring job, sending alerts back over `events`."""
+    global alert_channel
+    alert_channel = events
+    start_monitoring(**job)
 
-    logging.info(f"Restarting with new focus: {new_focus}")
+def stop_pool_job(job_id):
     stop_monitoring()
-    monitoring_thread.join()
-
-    last_args["focus"] = new_focus
-    stop_flag = False
 
-    monitoring_thread = threading.Thread(
-        target=start_monitoring,
-        args=(last_args["api_key"], last_args["input_type"], last_args["rtsp_url"], last_args["video_file_id"], last_args["focus"]),
-        daemon=True
-    )
-    monitoring_thread.start()
+def on_pool_event(msg):
+    """Bot process: deliver alerts from workers and report jobs that end."""
+    kind = msg[0]
+    if kind == "alert":
+        route_alert(msg[1])
+    elif kind == "failed":
+        _, _, job_id, error = msg
+        jobs.pop(job_id, None)
+        send_alert(f"❌ Monitoring job #{job_id} failed: {error}", severity="info")
+    elif kind == "finished" and msg[2] not in pool.jobs():
+        jobs.pop(msg[2], None)
 
 # ---------- Telegram Commands ----------
+# Handlers only queue work for the pool, so they answer at once however many streams are running.
+def describe_job(job_id, job):
+    return f"#{job_id} {job['input_type']} {job['rtsp_url'] or job['video_file_id']} — {job['focus']}"
+
 async def start_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         "Commands:\n"
-        "/start_monitoring <api_key> <rtsp|video> <url_or_id> <focus>\n"
-        "/stop_monitoring\n"
-        "/change_focus <new focus>\n"
+        "/start_monitoring <api_key> <rtsp|video> <url_or_id> <focus>[; <focus>…]\n"
+        "/stop_monitoring [#job]\n"
+        "/change_focus [#job] <new focus>[; <focus>…]\n"
         "/status"
     )
 
 async def start_monitoring_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    global monitoring_thread
-    if monitoring_thread and monitoring_thread.is_alive():
-        await update.message.reply_text("⚠️ Already running. Use /stop_monitoring first.")
-        return
-
+    global next_job_id
     if len(context.args) < 4:
         await update.message.reply_text("Usage: /start_monitoring <api_key> <rtsp|video> <url_or_id> <focus>")
         return
@@ -230,34 +266,60 @@ async def start_monitoring_cmd(update: Update, context: ContextTypes.DEFAULT_TYP
     focus = " ".join(focus_words)
     rtsp_url, video_file_id = (url_or_id, None) if input_type == "rtsp" else (None, url_or_id)
 
-    monitoring_thread = threading.Thread(
-        target=start_monitoring,
-        args=(api_key, input_type, rtsp_url, video_file_id, focus),
-        daemon=True
-    )
-    monitoring_thread.start()
+    job_id, next_job_id = next_job_id, next_job_id + 1
+    jobs[job_id] = {"api_key": api_key, "input_type": input_type, "rtsp_url": rtsp_url,
+                    "video_file_id": video_file_id, "focus": focus}
+    pool.submit(job_id, jobs[job_id])
+    await update.message.reply_text(f"▶️ Job {describe_job(job_id, jobs[job_id])}")
+
+def parse_job_arg(args):
+    """Split an optional leading '#<job>' off the command arguments."""
+    if args and args[0].startswith("#") and args[0][1:].isdigit():
+        return int(args[0][1:]), args[1:]
+    return None, args
 
 async def stop_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    stop_monitoring()
-    await update.message.reply_text("🛑 Monitoring stopped.")
+    job_id, _ = parse_job_arg(context.args)
+    targets = [job_id] if job_id is not None else list(jobs)
+    stopped = [j for j in targets if pool.stop(j)]
+    for j in stopped:
+        jobs.pop(j, None)
+    if stopped:
+        await update.message.reply_text(f"🛑 Monitoring stopped: {', '.join(f'#{j}' for j in stopped)}")
+    else:
+        await update.message.reply_text("⚠️ No matching job.")
 
 async def status_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    running = monitoring_thread and monitoring_thread.is_alive()
-    await update.message.reply_text("✅ Running." if running else "❌ Not running.")
+    running = pool.jobs()
+    if not running:
+        await update.message.reply_text("❌ Not running.")
+        return
+    lines = [f"{describe_job(j, jobs[j])} [{info['state']}, pid {info['pid'] or '-'}]"
+             for j, info in sorted(running.items()) if j in jobs]
+    await update.message.reply_text("✅ Running:\n" + "\n".join(lines) + f"\n{pool.report()}")
 
 async def change_focus_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not context.args:
-        await update.message.reply_text("Usage: /change_focus <new_focus>")
+    job_id, focus_words = parse_job_arg(context.args)
+    if not focus_words:
+        await update.message.reply_text("Usage: /change_focus [#job] <new_focus>")
+        return
+    if job_id is None and jobs:
+        job_id = max(jobs)  # most recent job
+    new_focus = " ".join(focus_words)
+    if job_id not in jobs:
+        await update.message.reply_text("❌ Failed to change focus: no such job.")
         return
-    new_focus = " ".join(context.args)
-    try:
-        restart_with_new_focus(new_focus)
-        await update.message.reply_text(f"🔄 Focus updated: {new_focus}")
-    except Exception as e:
-        await update.message.reply_text(f"❌ Failed to change focus: {e}")
+    jobs[job_id] = {**jobs[job_id], "focus": new_focus}
+    pool.replace(job_id, jobs[job_id])
+    await update.message.reply_text(f"🔄 Focus updated: {describe_job(job_id, jobs[job_id])}")
 
 # ---------- Main ----------
 if __name__ == "__main__":
+    print(BANNER)
+    send_alert("Bot started. Send /start to see commands.", severity="info")
+    pool = WorkerPool(run_pool_job, stop_pool_job, on_event=on_pool_event,
+                      size=int(os.getenv("BOT_WORKERS", DEFAULT_WORKERS)))
+
     app = Application.builder().token(BOT_TOKEN).build()
 
     app.add_handler(CommandHandler("start", start_cmd))
@@ -268,3 +330,6 @@ if __name__ == "__main__":
 
     print("🤖 Telegram bot is running...")
     app.run_polling()
+    pool.close()
+    if router:
+        router.close()  # flush queued alerts before exiting
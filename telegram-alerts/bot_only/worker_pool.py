@@ -0,0 +1,338 @@
+"""
+Worker processes for the Telegram Activity Monitor Bot.
+The bot process only answers Telegram commands and delivers alerts. Every
+monitoring job runs in a worker process from a fixed pool, so SSE decoding and
+alert parsing never compete with the bot's event loop for the GIL.
+
+Jobs and stop commands reach a worker through its own inbox queue, one job per
+worker at a time; further jobs wait in the bot process until a worker is idle.
+Alerts and job status come back through a one-way pipe per worker, which the
+pool waits on with multiprocessing.connection.wait; a worker killed mid-send
+can only break its own pipe. A worker that dies is restarted on its own and
+its job is resubmitted (up to MAX_JOB_RESTARTS times) without touching the
+other workers.
+
+Usage (event-loop lag while CPU-heavy jobs run as threads vs worker processes):
+    python worker_pool.py --bench 4
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing as mp
+import multiprocessing.connection
+import os
+import queue
+import signal
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))  # shared helpers
+
+# ---------- Defaults ----------
+DEFAULT_WORKERS = 4
+MAX_JOB_RESTARTS = 3
+SUPERVISE_SEC = 1.0
+SHUTDOWN_SEC = 10.0
+
+
+# ---------- Worker process ----------
+class _EventSender:
+    """Queue-like `put()` over the worker's end of its pipe; safe to call from any worker thread."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._lock = threading.Lock()
+
+    def put(self, msg: tuple) -> None:
+        with self._lock:
+            self._conn.send(msg)
+
+
+def _worker_main(worker_id: int, inbox, conn, run_job, stop_job) -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the bot process decides when workers stop
+    events = _EventSender(conn)
+    jobs = queue.Queue()
+    state = {"current": None, "cancelled": set()}
+    lock = threading.Lock()
+
+    def control() -> None:
+        while True:
+            msg = inbox.get()
+            if msg is None or msg[0] == "start":
+                jobs.put(msg)
+                if msg is None:
+                    return
+            elif msg[0] == "stop":
+                with lock:
+                    running = state["current"] == msg[1]
+                    if not running:
+                        state["cancelled"].add(msg[1])  # stop overtook its start
+                if running:
+                    stop_job(msg[1])
+
+    threading.Thread(target=control, daemon=True).start()
+    while (msg := jobs.get()) is not None:
+        _, job_id, job = msg
+        with lock:
+            if job_id in state["cancelled"]:
+                state["cancelled"].discard(job_id)
+                events.put(("finished", worker_id, job_id, None))
+                continue
+            state["current"] = job_id
+        events.put(("started", worker_id, job_id, os.getpid()))
+        try:
+            run_job(job_id, job, events)
+            events.put(("finished", worker_id, job_id, None))
+        except Exception as e:
+            logging.exception(f"Worker {worker_id}: job {job_id} failed")
+            events.put(("failed", worker_id, job_id, repr(e)))
+        with lock:
+            state["current"] = None
+
+
+# ---------- Pool (bot process) ----------
+class WorkerPool:
+    """Runs `run_job(job_id, job, events)` in worker processes; `on_event(msg)` sees everything sent back.
+
+    `run_job` and `stop_job(job_id)` must be module-level functions (they are
+    pickled into spawned workers). Messages a job puts on `events` are tuples
+    whose first item names the kind, e.g. ("alert", alert_dict).
+    """
+
+    def __init__(self, run_job, stop_job, on_event=None, size: int = DEFAULT_WORKERS):
+        self.run_job = run_job
+        self.stop_job = stop_job
+        self.on_event = on_event
+        self.crashes = 0
+        self._ctx = mp.get_context("spawn")  # forking a process that runs threads is unsafe
+        self._workers = [None] * size       # {"proc", "inbox", "job_id"}
+        self._conns = set()                 # read ends still open, including dead workers' until drained
+        self._jobs = {}                     # job_id -> {"job", "state", "worker", "pid", "restarts"}
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        for i in range(size):
+            self._spawn(i)
+        self._threads = [threading.Thread(target=self._pump, daemon=True),
+                         threading.Thread(target=self._supervise, daemon=True)]
+        for t in self._threads:
+            t.start()
+
+    def _spawn(self, i: int) -> None:
+        inbox = self._ctx.Queue()
+        recv_conn, send_conn = self._ctx.Pipe(duplex=False)
+        proc = self._ctx.Process(target=_worker_main, name=f"monitor-worker-{i}", daemon=True,
+                                 args=(i, inbox, send_conn, self.run_job, self.stop_job))
+        proc.start()
+        send_conn.close()  # the worker holds the only write end, so its exit reads as EOF here
+        self._conns.add(recv_conn)
+        self._workers[i] = {"proc": proc, "inbox": inbox, "job_id": None}
+
+    def _dispatch(self) -> None:
+        """Hand queued jobs to idle workers (caller holds the lock)."""
+        for i, w in enumerate(self._workers):
+            if not self._pending:
+                return
+            if w["job_id"] is None and w["proc"].is_alive():
+                job_id = self._pending.popleft()
+                rec = self._jobs[job_id]
+                rec.update(state="starting", worker=i)
+                w["job_id"] = job_id
+                w["inbox"].put(("start", job_id, rec["job"]))
+
+    # ----- commands (return immediately) -----
+    def submit(self, job_id, job: dict) -> None:
+        with self._lock:
+            self._jobs[job_id] = {"job": job, "state": "queued", "worker": None, "pid": None, "restarts": 0}
+            self._pending.append(job_id)
+            self._dispatch()
+
+    def stop(self, job_id) -> bool:
+        with self._lock:
+            rec = self._jobs.get(job_id)
+            if rec is None:
+                return False
+            if rec["state"] == "queued":
+                self._pending.remove(job_id)
+                del self._jobs[job_id]
+            else:
+                rec["state"] = "stopping"
+                self._workers[rec["worker"]]["inbox"].put(("stop", job_id))
+        return True
+
+    def replace(self, job_id, job: dict) -> bool:
+        """Stop a job and start `job` under the same id once the old one has finished."""
+        with self._lock:
+            rec = self._jobs.get(job_id)
+            if rec is None:
+                return False
+            if rec["state"] == "queued":
+                rec["job"] = job
+                return True
+            rec["replacement"] = job
+        return self.stop(job_id)
+
+    def jobs(self) -> dict:
+        with self._lock:
+            return {job_id: {k: v for k, v in rec.items() if k != "replacement"} for job_id, rec in self._jobs.items()}
+
+    # ----- background threads -----
+    def _receive(self, timeout: float) -> list[tuple]:
+        with self._lock:
+            conns = list(self._conns)
+        msgs = []
+        for conn in mp.connection.wait(conns, timeout):
+            try:
+                msgs.append(conn.recv())
+                continue
+            except EOFError:
+                pass  # the worker exited and everything it sent has been read
+            except Exception as e:  # message cut off by a worker killed mid-send
+                logging.error(f"Worker pool: dropping a broken worker pipe: {e!r}")
+            with self._lock:
+                self._conns.discard(conn)
+            conn.close()
+        return msgs
+
+    def _pump(self) -> None:
+        while not self._closing.is_set():
+            for msg in self._receive(timeout=0.5):
+                self._handle(msg)
+
+    def _handle(self, msg: tuple) -> None:
+        kind = msg[0]
+        if kind in ("started", "finished", "failed"):
+            _, worker_id, job_id, detail = msg
+            with self._lock:
+                rec = self._jobs.get(job_id)
+                if kind == "started" and rec:
+                    rec["pid"] = detail
+                    if rec["state"] != "stopping":
+                        rec["state"] = "running"
+                elif kind != "started":
+                    if self._workers[worker_id]["job_id"] == job_id:
+                        self._workers[worker_id]["job_id"] = None
+                    if rec and rec.get("replacement"):
+                        self._jobs[job_id] = {"job": rec["replacement"], "state": "queued", "worker": None,
+                                              "pid": None, "restarts": 0}
+                        self._pending.append(job_id)
+                    elif rec:
+                        del self._jobs[job_id]
+                    self._dispatch()
+        if self.on_event:
+            try:
+                self.on_event(msg)
+            except Exception as e:
+                logging.error(f"Worker pool event handler failed on {kind}: {e}")
+
+    def _supervise(self) -> None:
+        while not self._closing.wait(SUPERVISE_SEC):
+            for i, w in enumerate(self._workers):
+                if w["proc"].is_alive() or self._closing.is_set():
+                    continue
+                self.crashes += 1
+                job_id = w["job_id"]
+                logging.error(f"Worker {i} (pid {w['proc'].pid}) died with exit code {w['proc'].exitcode}; restarting")
+                lost = None
+                with self._lock:
+                    self._spawn(i)
+                    rec = self._jobs.get(job_id) if job_id is not None else None
+                    if rec and rec["state"] != "stopping" and rec["restarts"] < MAX_JOB_RESTARTS:
+                        rec.update(state="queued", worker=None, pid=None, restarts=rec["restarts"] + 1)
+                        self._pending.appendleft(job_id)
+                    elif rec:
+                        del self._jobs[job_id]
+                        lost = job_id
+                    self._dispatch()
+                if lost is not None and self.on_event:
+                    self.on_event(("failed", i, lost, f"worker crashed {MAX_JOB_RESTARTS + 1} times"))
+
+    def close(self, timeout: float = SHUTDOWN_SEC) -> None:
+        """Stop every job, then the workers; workers that do not exit in time are terminated."""
+        with self._lock:
+            self._pending.clear()
+            for w in self._workers:
+                if w["job_id"] is not None:
+                    w["inbox"].put(("stop", w["job_id"]))
+                w["inbox"].put(None)
+        deadline = time.monotonic() + timeout
+        for w in self._workers:
+            w["proc"].join(max(0.0, deadline - time.monotonic()))
+            if w["proc"].is_alive():
+                w["proc"].terminate()
+        self._closing.set()
+        for t in self._threads:
+            t.join()
+        for conn in self._conns:
+            conn.close()
+
+    def report(self) -> str:
+        with self._lock:
+            busy = sum(w["job_id"] is not None for w in self._workers)
+            return f"{busy}/{len(self._workers)} workers busy, {len(self._pending)} jobs queued, {self.crashes} worker restarts"
+
+
+# ---------- Benchmark ----------
+def _bench_job(job_id, job: dict, events) -> None:
+    """CPU load shaped like a busy session: decode SSE events and parse the responses."""
+    from alert_parser import parse_alert
+
+    raw = json.dumps({"type": "inference.result", "event_data": {"response": [
+        "<scan> I see in this video: a parked car, a person near the gate, trees </scan> "
+        "Search result: person present. Alert: person standing at the gate"]}})
+    end = time.monotonic() + job["seconds"]
+    while time.monotonic() < end:
+        parse_alert(json.loads(raw)["event_data"]["response"][0])
+
+
+def _noop_stop(job_id) -> None:
+    pass
+
+
+async def _loop_lag(seconds: float, tick: float = 0.01) -> list[float]:
+    lags = []
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        start = time.perf_counter()
+        await asyncio.sleep(tick)
+        lags.append(1000 * (time.perf_counter() - start - tick))
+    return lags
+
+
+def _lag_summary(lags: list[float]) -> str:
+    q = statistics.quantiles(lags, n=20)
+    return f"p50 {statistics.median(lags):6.2f} ms, p95 {q[18]:6.2f} ms, max {max(lags):6.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bot event-loop lag with busy monitoring jobs.")
+    parser.add_argument("--bench", type=int, default=4, help="concurrent CPU-heavy jobs")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    opts = parser.parse_args()
+
+    print(f"idle:                 {_lag_summary(asyncio.run(_loop_lag(opts.seconds / 2)))}")
+
+    threads = [threading.Thread(target=_bench_job, args=(i, {"seconds": opts.seconds}, None), daemon=True)
+               for i in range(opts.bench)]
+    for t in threads:
+        t.start()
+    print(f"{opts.bench} jobs as threads:     {_lag_summary(asyncio.run(_loop_lag(opts.seconds - 0.5)))}")
+    for t in threads:
+        t.join()
+
+    started = threading.Event()
+    pool = WorkerPool(_bench_job, _noop_stop, on_event=lambda msg: msg[0] == "started" and started.set(),
+                      size=opts.bench)
+    for i in range(opts.bench):
+        pool.submit(i, {"seconds": opts.seconds})
+    started.wait()
+    print(f"{opts.bench} jobs as processes:   {_lag_summary(asyncio.run(_loop_lag(opts.seconds - 0.5)))}")
+    pool.close()
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,20 @@ Sends Telegram alerts when the Lens output contains “Alert: …”.
 
 import logging
 import os
-import requests
+import sys
 from pprint import pformat
 from archetypeai.api_client import ArchetypeAI
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))  # shared helpers
+
+from alert_router import ALERT_ROUTES_PATH, load_router, make_alert
+from evidence_buffer import start_recorder
+from lens_config import DEFAULT_INSTRUCTION, LENS_ID
+from multi_focus import (
+    FOCUS_SEPARATOR, MULTI_FOCUS_ALERT_INSTRUCTION, FocusAlerts, build_multi_focus, split_focuses,
+)
+from sse_supervisor import SupervisedSSE
+
 # ---------- Logging ----------
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
@@ -23,46 +33,28 @@ BANNER = r"""
 ██║ ╚████║███████╗╚███╔███╔╝   ██║   ╚██████╔╝██║ ╚████║    ██║  ██║██╗
 ╚═╝  ╚═══╝╚══════╝ ╚══╝╚══╝    ╚═╝    ╚═════╝ ╚═╝  ╚═══╝    ╚═╝  ╚═╝╚═╝
 """
-print(BANNER)
-
-# ---------- Lens Config ----------
-LENS_ID = "lns-fd669361822b07e2-bc718aa3fdf0b3b7"
-
-DEFAULT_INSTRUCTION = (
-    "STOP. FOLLOW THIS EXACT FORMAT: Step 1: Write <scan> I see in this video: "
-    "then list ALL detected objects, vehicles, people, animals, buildings, and their "
-    "visual or behavioral attributes (colors, shapes, positions, actions). Then close "
-    "with </scan>. Step 2: Write Search result: and analyze if the item or event being "
-    "searched for is present in your scan. Step 3: If the searched-for item is not found, "
-    "write: No alerts: short description of what was detected, max 15 words. "
-    "If the searched-for item is present, it is VERY IMPORTANT THAT YOU WRITE THIS: "
-    "Alert: short description of what was detected, max 15 words ONLY return one of the above. "
-    "Do not describe anything else."
-)
 
 # ---------- Telegram Config ----------
 BOT_TOKEN = "YOUR_BOT_TOCKEN"
 CHAT_ID = "YOUR_CHAT_ID"
 
-def send_telegram_alert(message: str) -> None:
-    """Send a Telegram text alert (best-effort)."""
-    if not BOT_TOKEN or "YOUR_TELEGRAM_BOT_TOKEN" in BOT_TOKEN:
-        logging.warning("⚠️ Telegram BOT token not set; skipping alert send.")
-        return
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    try:
-        requests.post(url, data={"chat_id": CHAT_ID, "text": message}, timeout=10)
-        logging.info("✅ Telegram alert sent!")
-    except Exception as e:
-        logging.error(f"❌ Failed to send Telegram alert: {e}")
+# ---------- Alert routing ----------
+router = None        # built on first alert from alert_routes.json (or BOT_TOKEN / CHAT_ID)
+current_camera = ""  # RTSP URL or video file ID of the current session
 
-# ---------- State ----------
-last_alert_state = False  # toggles when we first see an “Alert: …” line
+def send_alert(message: str, severity: str = "warning", focus: str = "", evidence: list[str] | None = None,
+               alert_id: str | None = None) -> None:
+    """Queue an alert on every matching sink; returns immediately (see alert_router.py)."""
+    global router
+    if router is None:
+        router = load_router(ALERT_ROUTES_PATH, BOT_TOKEN, CHAT_ID)
+    router.route(make_alert(message, severity, current_camera, focus, evidence, alert_id))
 
-# ---------- Session Handling ----------
-def session_fn(session_id, session_endpoint, client: ArchetypeAI, args: dict) -> None:
-    global last_alert_state
+# ---------- State ----------
+evidence_recorder = None  # local frame ring for the current RTSP session
 
+def configure_session(client: ArchetypeAI, session_id: str, args: dict) -> None:
+    """Send the input stream, focus/instruction and output stream events to a session."""
     # Input stream (RTSP or already-uploaded video file ID)
     if args["input_type"] == "rtsp":
         event = {
@@ -111,29 +103,43 @@ def session_fn(session_id, session_endpoint, client: ArchetypeAI, args: dict) ->
     resp = client.lens.sessions.process_event(session_id, event)
     logging.info(f"Output stream response:\n{pformat(resp, indent=4)}")
 
+def session_fn(session_id, session_endpoint, client: ArchetypeAI, args: dict) -> None:
+    global evidence_recorder, current_camera
+
+    configure_session(client, session_id, args)
+
+    current_camera = args["rtsp_url"] or args["video_file_id"] or ""
+
+    # --- Evidence capture (RTSP only: file inputs are read server-side)
+    evidence_recorder = start_recorder(args["rtsp_url"]) if args["input_type"] == "rtsp" else None
+
     # --- SSE Reader
-    sse_reader = client.lens.sessions.create_sse_consumer(session_id, max_read_time_sec=args["max_run_time_sec"])
-    for event in sse_reader.read(block=True):
+    alerts = FocusAlerts(args["focuses"], send_alert, evidence_recorder)  # a new session starts out of the alert state
+    # Supervised: reconnects dropped streams and renews the session if it dies server-side
+    sse_reader = SupervisedSSE(client, session_id, lens_id=LENS_ID,
+                               setup=lambda new_id: configure_session(client, new_id, args),
+                               max_read_time_sec=args["max_run_time_sec"])
+    for event in sse_reader.events():
         logging.info(event)
 
-        # --- Alert detection
+        # --- Alert detection (demultiplexed per focus)
         if isinstance(event, dict) and event.get("type") == "inference.result":
             resp_list = event.get("event_data", {}).get("response", [])
             if resp_list:
-                text = resp_list[0]
-                is_alert = "alert:" in text.lower()
-
-                if is_alert and not last_alert_state:
-                    alert_text = text.split("Alert:", 1)[-1].strip()
-                    logging.info(f"🚨 Alert detected (state changed): {alert_text}")
-                    send_telegram_alert(f"🚨 Alert: {alert_text}")
-
-                last_alert_state = is_alert
+                alerts.handle_response(resp_list[0])
 
-    sse_reader.close()
+    logging.info(f"🔌 SSE: {sse_reader.report()}")
+    if evidence_recorder:
+        evidence_recorder.stop()
+        evidence_recorder = None
+    if router:
+        logging.info(f"📬 Alert delivery:\n{router.report()}")
+    if alerts.report():
+        logging.info(f"📊 {alerts.report()}")
 
 # ---------- Main ----------
 def main():
+    print(BANNER)
     print("=== Smart Monitor Setup ===")
     api_key = os.getenv("ATAI_API_KEY", "").strip() or input("Enter your API Key: ").strip()
     if not api_key:
@@ -153,23 +159,26 @@ def main():
         if not video_file_id:
             print("Video file ID is required for video input."); return
 
-    focus = input("Enter focus (what to look for): ").strip() or "Describe the video."
+    focuses = split_focuses(input(f"Enter focus (what to look for; separate several with '{FOCUS_SEPARATOR}'): ")) or ["Describe the video."]
 
     args = {
         "api_key": api_key,
         "rtsp_url": rtsp_url,
         "video_file_id": video_file_id,
         "input_type": input_type,
-        "focus": focus,
-        "instruction": DEFAULT_INSTRUCTION,
-        "max_run_time_sec": 600.0,
+        "focus": build_multi_focus(focuses),
+        "focuses": focuses,
+        "instruction": DEFAULT_INSTRUCTION if len(focuses) == 1 else MULTI_FOCUS_ALERT_INSTRUCTION,
+        "max_run_time_sec": -1.0 if input_type == "rtsp" else 600.0,  # cameras run until stopped
     }
 
     client = ArchetypeAI(api_key, api_endpoint=ArchetypeAI.get_default_endpoint())
     logging.info("▶️ Starting monitoring session…")
-    send_telegram_alert("▶️ Smart monitoring started…")
+    send_alert("▶️ Smart monitoring started…", severity="info")
 
     client.lens.create_and_run_session(LENS_ID, session_fn, auto_destroy=True, client=client, args=args)
+    if router:
+        router.close()  # flush queued alerts before exiting
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,343 @@
+"""
+Instruction / max_new_tokens evaluation for the Smart Monitor.
+Replays a labelled, already-uploaded video through one session per
+(instruction variant, max_new_tokens) setting, and reports alert precision/recall
+next to output length and latency per window, so the cheapest instruction that
+keeps detection quality can be chosen.
+
+Labels are a JSON list of alert intervals in video seconds:
+    [{"start": 12.0, "end": 20.0}, {"start": 95.5, "end": 101.0}]
+
+Every response is recorded to JSONL, so runs can be re-scored offline (new
+labels, parser changes) without calling the API again:
+    python eval_instructions.py --file-id clip.mp4 --focus "person at the door" --labels labels.json
+    python eval_instructions.py --rescore eval_responses.jsonl --labels labels.json
+
+Latency per window is the gap between consecutive results, so settings run one
+session at a time by default; with --parallel above 1 sessions compete on the same
+account and latency is not reported.
+
+Pass --stand-in to run the sweep offline against a local Lens stand-in that answers
+from the labels, writes longer responses for the <scan> instructions, cuts them at
+max_new_tokens words and takes --stand-in-ms-per-token per word written:
+    python eval_instructions.py --stand-in --focus "person at the door" --labels labels.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from archetypeai.api_client import ArchetypeAI
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "common"))  # shared helpers
+
+from alert_parser import parse_alert
+from lens_config import DEFAULT_INSTRUCTION, LENS_ID
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# ---------- Defaults ----------
+INSTRUCTION_VARIANTS = {
+    "default": DEFAULT_INSTRUCTION,
+    "no-scan": (
+        "Decide if the item or event being searched for is present in the video. "
+        "If it is present, write: Alert: short description of what was detected, max 15 words. "
+        "Otherwise write: No alerts: short description of what was detected, max 15 words. "
+        "Return only that one line."
+    ),
+    "terse": "If the searched-for item is present write 'Alert: <max 8 words>', otherwise write 'No alerts: <max 8 words>'.",
+}
+DEFAULT_MAX_NEW_TOKENS = "256,64,32"
+DEFAULT_PARALLEL = 1   # one session at a time, so per-window latency is not skewed by competing sessions
+DEFAULT_TIMEOUT_SEC = 600.0
+DEFAULT_RECORD_PATH = "eval_responses.jsonl"
+STEP_SIZE = 60   # same video_file_reader config as app.py
+WINDOW_SIZE = 1
+DEFAULT_STAND_IN_SECONDS = 120.0
+DEFAULT_STAND_IN_MS_PER_TOKEN = 5.0
+STAND_IN_FPS = 30.0
+STAND_IN_MISS_EVERY = 7   # every 7th window is answered wrongly, so precision/recall are not trivially 1.0
+
+
+# ---------- Recording ----------
+def run_setting_fn(session_id: str, session_endpoint: str, client: ArchetypeAI, args: dict) -> list[dict]:
+    """Run one setting over the whole video and return one record per window."""
+    client.lens.sessions.process_event(session_id, {
+        "type": "input_stream.set",
+        "event_data": {
+            "stream_type": "video_file_reader",
+            "stream_config": {"file_id": args["video_file_id"], "step_size": STEP_SIZE, "window_size": WINDOW_SIZE},
+        }
+    })
+    client.lens.sessions.process_event(session_id, {
+        "type": "session.modify",
+        "event_data": {"focus": args["focus"], "max_new_tokens": args["max_new_tokens"], "instruction": args["instruction"]},
+    })
+    client.lens.sessions.process_event(session_id, {
+        "type": "output_stream.set",
+        "event_data": {"stream_type": "server_side_events_writer", "stream_config": {}}
+    })
+
+    records = []
+    last = time.monotonic()
+    sse_reader = client.lens.sessions.create_sse_consumer(session_id, max_read_time_sec=args["timeout_sec"])
+    try:
+        for event in sse_reader.read(block=True):
+            if not isinstance(event, dict):
+                continue
+            if event.get("type") == "sse.stream.end":
+                break
+            if event.get("type") == "inference.result":
+                ed = event.get("event_data", {})
+                resp = ed.get("response") or []
+                now = time.monotonic()
+                records.append({
+                    "variant": args["variant"],
+                    "max_new_tokens": args["max_new_tokens"],
+                    "ts": ed.get("query_metadata", {}).get("sensor_timestamp"),
+                    "response": resp[0] if resp else "",
+                    "latency_sec": now - last if args["measure_latency"] else None,
+                })
+                last = now
+    finally:
+        sse_reader.close()
+    return records
+
+
+def record_sweep(client: ArchetypeAI, video_file_id: str, focus: str, variants: list[str],
+                 max_new_tokens: list[int], parallel: int, timeout_sec: float) -> list[dict]:
+    def run(variant: str, tokens: int) -> list[dict]:
+        args = {"video_file_id": video_file_id, "focus": focus, "variant": variant,
+                "instruction": INSTRUCTION_VARIANTS[variant], "max_new_tokens": tokens, "timeout_sec": timeout_sec,
+                "measure_latency": parallel == 1}
+        try:
+            return client.lens.create_and_run_session(LENS_ID, run_setting_fn, auto_destroy=True, client=client, args=args)
+        except Exception as e:
+            logging.error(f"{variant}/{tokens} failed: {e}")
+            return []
+
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        futures = [pool.submit(run, v, t) for v in variants for t in max_new_tokens]
+        return [r for f in futures for r in f.result()]
+
+
+# ---------- Scoring ----------
+def is_labelled_alert(ts, intervals: list[dict]) -> bool:
+    try:
+        t = float(ts)
+    except (TypeError, ValueError):
+        return False
+    return any(iv["start"] <= t <= iv["end"] for iv in intervals)
+
+
+def score(records: list[dict], intervals: list[dict]) -> list[dict]:
+    """Per-setting precision/recall, output length and latency."""
+    groups = {}
+    for r in records:
+        groups.setdefault((r["variant"], r["max_new_tokens"]), []).append(r)
+
+    rows = []
+    for (variant, tokens), recs in groups.items():
+        tp = fp = fn = unparsed = 0
+        for r in recs:
+            parsed = parse_alert(r["response"])
+            unparsed += parsed.is_alert is None
+            predicted, actual = bool(parsed.is_alert), is_labelled_alert(r["ts"], intervals)
+            tp += predicted and actual
+            fp += predicted and not actual
+            fn += actual and not predicted
+        chars = [len(r["response"]) for r in recs]
+        latencies = [r["latency_sec"] for r in recs[1:] if r.get("latency_sec") is not None]  # first includes start-up
+        rows.append({
+            "variant": variant,
+            "max_new_tokens": tokens,
+            "windows": len(recs),
+            "precision": tp / (tp + fp) if tp + fp else None,
+            "recall": tp / (tp + fn) if tp + fn else None,
+            "unparsed": unparsed,
+            "mean_chars": statistics.mean(chars),
+            "mean_words": statistics.mean(len(r["response"].split()) for r in recs),
+            "latency_sec": statistics.median(latencies) if latencies else None,
+        })
+    return sorted(rows, key=lambda r: (r["variant"], -r["max_new_tokens"]))
+
+
+def cheapest(rows: list[dict], min_precision: float, min_recall: float) -> dict | None:
+    ok = [r for r in rows if (r["precision"] or 0) >= min_precision and (r["recall"] or 0) >= min_recall]
+    return min(ok, key=lambda r: (r["mean_chars"], r["max_new_tokens"]), default=None)
+
+
+def _fmt(value: float | None, width: int) -> str:
+    return f"{value:{width}.2f}" if value is not None else "-".rjust(width)
+
+
+def print_report(rows: list[dict], best: dict | None) -> None:
+    print(f"\n{'variant':>10} {'tokens':>6} {'windows':>7} {'prec':>6} {'recall':>6} {'unparsed':>8} "
+          f"{'chars':>6} {'words':>6} {'s/win':>6}")
+    for r in rows:
+        print(f"{r['variant']:>10} {r['max_new_tokens']:>6} {r['windows']:>7} {_fmt(r['precision'], 6)} "
+              f"{_fmt(r['recall'], 6)} {r['unparsed']:>8} {r['mean_chars']:>6.0f} {r['mean_words']:>6.1f} "
+              f"{_fmt(r['latency_sec'], 6)}")
+    if best:
+        print(f"\nCheapest meeting the targets: {best['variant']} with max_new_tokens={best['max_new_tokens']}")
+    else:
+        print("\nNo setting met the precision/recall targets.")
+
+
+# ---------- Local Lens stand-in ----------
+class _StandInLens(BaseHTTPRequestHandler):
+    """Just enough of the Lens session API for a sweep over a video_file_reader session.
+    Each window's answer comes from the labels (with every STAND_IN_MISS_EVERY-th window
+    wrong); <scan> instructions get a scan before the verdict, the response is cut at
+    max_new_tokens words, and each word written takes ms_per_token."""
+
+    seconds = DEFAULT_STAND_IN_SECONDS
+    ms_per_token = DEFAULT_STAND_IN_MS_PER_TOKEN
+    intervals: list = []
+    sessions: dict = {}
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.endswith("/sessions/create"):
+            session_id = f"lsn-{uuid.uuid4().hex[:12]}"
+            with self.lock:
+                self.sessions[session_id] = {}
+            self._reply({"session_id": session_id, "session_endpoint": "http://stand-in"})
+        elif self.path.endswith("/sessions/events/process"):
+            request = json.loads(body)
+            with self.lock:
+                session = self.sessions.setdefault(request["session_id"], {})
+                if request["event"]["type"] == "session.modify":
+                    session.update(request["event"].get("event_data", {}))
+            self._reply({"status": "ok"})
+        elif self.path.endswith("/sessions/destroy"):
+            with self.lock:
+                self.sessions.pop(json.loads(body)["session_id"], None)
+            self._reply({"session_status": "SESSION_STATUS_DESTROYED"})
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        match = re.search(r"/lens/sessions/consumer/([^/?]+)", self.path)
+        if not match:
+            self.send_error(404); return
+        with self.lock:
+            session = dict(self.sessions.get(match.group(1), {}))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        window_sec = STEP_SIZE / STAND_IN_FPS
+        for i in range(int(self.seconds / window_sec)):
+            ts = i * window_sec
+            words = self._answer(session, ts, wrong=i % STAND_IN_MISS_EVERY == STAND_IN_MISS_EVERY - 1)
+            words = words[:session.get("max_new_tokens", 256)]
+            time.sleep(len(words) * self.ms_per_token / 1000)
+            self._send_event({"type": "inference.result",
+                              "event_data": {"response": [" ".join(words)], "query_metadata": {"sensor_timestamp": ts}}})
+        self._send_event({"type": "sse.stream.end", "event_data": {}})
+
+    def _answer(self, session: dict, ts: float, wrong: bool) -> list[str]:
+        present = is_labelled_alert(ts, self.intervals) != wrong
+        focus = session.get("focus", "the item")
+        verdict = f"Alert: {focus} detected." if present else f"No alerts: no {focus} in view."
+        if "<scan>" not in session.get("instruction", ""):
+            return verdict.split()
+        scan = ("<scan> I see in this video: a porch with a grey door, a parked silver car, two potted "
+                "plants, a doormat, a lamp beside the door and a quiet street in daylight. </scan>")
+        found = "The searched-for item is present." if present else "The searched-for item is not present."
+        return f"{scan} Search result: {found} {verdict}".split()
+
+    def _send_event(self, event: dict) -> None:
+        self.wfile.write(f"event: message\ndata: {json.dumps(event)}\n\n".encode())
+        self.wfile.flush()
+
+
+def start_stand_in(intervals: list[dict], seconds: float, ms_per_token: float) -> tuple[ThreadingHTTPServer, str]:
+    _StandInLens.intervals = intervals
+    _StandInLens.seconds = seconds
+    _StandInLens.ms_per_token = ms_per_token
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInLens)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+# ---------- Main ----------
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate instruction variants and max_new_tokens settings.")
+    parser.add_argument("--labels", required=True, help="JSON list of {start, end} alert intervals (video seconds)")
+    parser.add_argument("--rescore", help="re-score a recorded JSONL instead of running sessions")
+    parser.add_argument("--file-id", help="already-uploaded video file ID")
+    parser.add_argument("--focus", required=True, help="what to look for, as given to app.py")
+    parser.add_argument("--variants", default=",".join(INSTRUCTION_VARIANTS))
+    parser.add_argument("--max-new-tokens", default=DEFAULT_MAX_NEW_TOKENS)
+    parser.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT_SEC)
+    parser.add_argument("--min-precision", type=float, default=0.9)
+    parser.add_argument("--min-recall", type=float, default=0.9)
+    parser.add_argument("--record", default=DEFAULT_RECORD_PATH)
+    parser.add_argument("--api-endpoint", default=ArchetypeAI.get_default_endpoint())
+    parser.add_argument("--stand-in", action="store_true", help="run against a local Lens stand-in instead of the API")
+    parser.add_argument("--stand-in-seconds", type=float, default=DEFAULT_STAND_IN_SECONDS,
+                        help="length of the stand-in's video")
+    parser.add_argument("--stand-in-ms-per-token", type=float, default=DEFAULT_STAND_IN_MS_PER_TOKEN)
+    opts = parser.parse_args()
+
+    with open(opts.labels) as f:
+        intervals = json.load(f)
+
+    if opts.rescore:
+        with open(opts.rescore) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    else:
+        if opts.stand_in:
+            _, opts.api_endpoint = start_stand_in(intervals, opts.stand_in_seconds, opts.stand_in_ms_per_token)
+            opts.file_id = opts.file_id or "stand-in.mp4"
+            print(f"Lens stand-in at {opts.api_endpoint}, {opts.stand_in_seconds:.0f} s of video")
+        if not opts.file_id:
+            print("Error: --file-id is required unless --rescore or --stand-in is given."); return
+        variants = [v.strip() for v in opts.variants.split(",")]
+        unknown = [v for v in variants if v not in INSTRUCTION_VARIANTS]
+        if unknown:
+            print(f"Error: unknown variant(s): {', '.join(unknown)}"); return
+        api_key = "stand-in" if opts.stand_in else (
+            os.getenv("ATAI_API_KEY", "").strip() or input("Enter your API Key: ").strip())
+        if not api_key:
+            print("API key is required."); return
+
+        client = ArchetypeAI(api_key, api_endpoint=opts.api_endpoint)
+        tokens = [int(t) for t in opts.max_new_tokens.split(",")]
+        print(f"Running {len(variants) * len(tokens)} settings ({opts.parallel} in parallel)…")
+        if opts.parallel > 1:
+            print("Latency is not measured: parallel sessions compete on the same account.")
+        records = record_sweep(client, opts.file_id, opts.focus, variants, tokens, opts.parallel, opts.timeout)
+        with open(opts.record, "w") as f:
+            for r in records:
+                f.write(json.dumps(r) + "\n")
+        print(f"Responses recorded to {opts.record}")
+
+    rows = score(records, intervals)
+    print_report(rows, cheapest(rows, opts.min_precision, opts.min_recall))
+
+if __name__ == "__main__":
+    main()
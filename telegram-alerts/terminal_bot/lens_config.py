@@ -0,0 +1,18 @@
+"""
+Lens ID and default instruction shared by app.py and eval_instructions.py.
+"""
+
+# ---------- Lens Config ----------
+LENS_ID = "lns-fd669361822b07e2-bc718aa3fdf0b3b7"
+
+DEFAULT_INSTRUCTION = (
+    "STOP. FOLLOW THIS EXACT FORMAT: Step 1: Write <scan> I see in this video: "
+    "then list ALL detected objects, vehicles, people, animals, buildings, and their "
+    "visual or behavioral attributes (colors, shapes, positions, actions). Then close "
+    "with </scan>. Step 2: Write Search result: and analyze if the item or event being "
+    "searched for is present in your scan. Step 3: If the searched-for item is not found, "
+    "write: No alerts: short description of what was detected, max 15 words. "
+    "If the searched-for item is present, it is VERY IMPORTANT THAT YOU WRITE THIS: "
+    "Alert: short description of what was detected, max 15 words ONLY return one of the above. "
+    "Do not describe anything else."
+)